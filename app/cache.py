@@ -0,0 +1,62 @@
+# app/cache.py — small in-process caches (single event loop; no locking needed).
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """Bounded least-recently-used mapping with hit/miss counters; entries optionally expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._expires: dict[Hashable, float] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        if self.ttl is not None and self._expires[key] <= time.monotonic():
+            del self._data[key], self._expires[key]
+            self.expired += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if self.ttl is not None:
+            self._expires[key] = time.monotonic() + self.ttl
+        while len(self._data) > self.maxsize:
+            old, _ = self._data.popitem(last=False)
+            self._expires.pop(old, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._expires.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
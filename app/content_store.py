@@ -0,0 +1,229 @@
+# app/content_store.py — compressed, deduplicated storage for superseded document versions.
+# The latest version of each URL keeps its full text in documents.content_markdown (lz4 TOAST). When a newer
+# version is stored, older ones are split into content-defined blocks (a block ends after a line whose hash
+# hits a mask, so an edit only changes the blocks around it), each block is zlib-compressed and stored once in
+# content_blocks keyed by sha256, and the document row keeps just the ordered block hashes. A quarterly
+# re-crawl of the same letter then costs only the blocks that changed. Read any version with document_markdown().
+# python -m app.content_store report                       (table sizes and dedup/compression ratios, JSON)
+# python -m app.content_store compact [--batch 200] [--vacuum]   (convert existing superseded rows; before/after)
+import argparse
+import asyncio
+import hashlib
+import json
+import zlib
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db import SessionLocal, engine
+
+# Block sizes in characters: ~64 lines past the minimum on average, hard cut at the maximum.
+_MIN_BLOCK = 4096
+_MAX_BLOCK = 65536
+_BOUNDARY_MASK = 63
+# Advisory lock key: writers referencing blocks hold it shared, gc_blocks exclusively, so a block can't be
+# collected between a writer finding it already stored and committing the document that uses it.
+_BLOCKS_LOCK = 0x626C6B73
+
+
+def split_blocks(markdown: str) -> list[str]:
+    """Content-defined blocks of at most _MAX_BLOCK characters whose concatenation is exactly `markdown`."""
+    blocks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for line in markdown.splitlines(keepends=True):
+        if current and size + len(line) > _MAX_BLOCK:
+            blocks.append("".join(current))
+            current, size = [], 0
+        while len(line) > _MAX_BLOCK:  # one huge line (minified text): cut it at fixed offsets
+            blocks.append(line[:_MAX_BLOCK])
+            line = line[_MAX_BLOCK:]
+        if not line:
+            continue
+        current.append(line)
+        size += len(line)
+        if size >= _MAX_BLOCK or (size >= _MIN_BLOCK and zlib.crc32(line.encode()) & _BOUNDARY_MASK == 0):
+            blocks.append("".join(current))
+            current, size = [], 0
+    if current:
+        blocks.append("".join(current))
+    return blocks
+
+
+def _encode(blocks: list[str]) -> list[tuple[bytes, bytes, int]]:
+    """(sha256, zlib data, raw bytes) per block; CPU work, run off the event loop for large documents."""
+    out = []
+    for b in blocks:
+        raw = b.encode("utf-8")
+        out.append((hashlib.sha256(raw).digest(), zlib.compress(raw, 6), len(raw)))
+    return out
+
+
+def _decode(blocks: dict[bytes, bytes]) -> dict[bytes, str]:
+    return {h: zlib.decompress(data).decode("utf-8") for h, data in blocks.items()}
+
+
+async def _store_blocks(session: AsyncSession, markdown: str) -> list[bytes]:
+    """Write the blocks of `markdown` not stored yet; returns its block hashes in order."""
+    await session.execute(text("SELECT pg_advisory_xact_lock_shared(:k)"), {"k": _BLOCKS_LOCK})
+    blocks = split_blocks(markdown)
+    encoded = _encode(blocks) if len(markdown) < 50_000 else await asyncio.to_thread(_encode, blocks)
+    hashes = [h for h, _, _ in encoded]
+    existing = set((await session.execute(
+        text("SELECT hash FROM content_blocks WHERE hash = ANY(:h)"), {"h": list(set(hashes))},
+    )).scalars())
+    new = {h: (data, n) for h, data, n in encoded if h not in existing}
+    if new:
+        await session.execute(text("""
+          INSERT INTO content_blocks(hash, data, raw_bytes)
+          SELECT * FROM unnest(CAST(:h AS bytea[]), CAST(:d AS bytea[]), CAST(:n AS int[]))
+          ON CONFLICT (hash) DO NOTHING
+        """), {"h": list(new), "d": [d for d, _ in new.values()], "n": [n for _, n in new.values()]})
+    return hashes
+
+
+async def archive_superseded(session: AsyncSession, url: str, latest_id: int) -> int:
+    """Move the full text of url's versions other than latest_id into blocks. Caller commits; returns rows."""
+    rows = (await session.execute(text("""
+      SELECT id, content_markdown FROM documents
+      WHERE url = :url AND id <> :latest AND content_markdown IS NOT NULL
+    """), {"url": url, "latest": latest_id})).all()
+    for doc_id, markdown in rows:
+        hashes = await _store_blocks(session, markdown)
+        await session.execute(text("""
+          UPDATE documents SET content_blocks = :h, content_markdown = NULL WHERE id = :id
+        """), {"h": hashes, "id": doc_id})
+    return len(rows)
+
+
+async def unarchive(session: AsyncSession, document_id: int) -> None:
+    """Restore the full text of an archived version (it became the latest again). Caller commits."""
+    markdown = await document_markdown(session, document_id)
+    await session.execute(text("""
+      UPDATE documents SET content_markdown = :md, content_blocks = NULL
+      WHERE id = :id AND content_markdown IS NULL
+    """), {"md": markdown, "id": document_id})
+
+
+async def gc_blocks(session: AsyncSession, after: bytes = b"", batch: int = 1000) -> tuple[bytes | None, int, int]:
+    """
+    Delete the unreferenced blocks among the next `batch` hashes after `after`. Commits.
+    Returns (cursor for the next call or None when done, blocks deleted, bytes deleted).
+    """
+    await session.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _BLOCKS_LOCK})
+    cursor, n, size = (await session.execute(text("""
+      WITH scanned AS (
+        SELECT hash FROM content_blocks WHERE hash > :after ORDER BY hash LIMIT :batch
+      ), deleted AS (
+        DELETE FROM content_blocks b USING scanned s
+        WHERE b.hash = s.hash AND NOT EXISTS (SELECT 1 FROM documents d WHERE d.content_blocks @> ARRAY[b.hash])
+        RETURNING octet_length(b.data) AS size
+      )
+      SELECT (SELECT max(hash) FROM scanned), (SELECT count(*) FROM deleted), (SELECT COALESCE(sum(size), 0) FROM deleted)
+    """), {"after": after, "batch": batch})).one()
+    await session.commit()
+    return cursor, n, size
+
+
+async def document_markdowns(session: AsyncSession, document_ids: list[int]) -> dict[int, str]:
+    """Full text of each document (latest or archived version), by id; unknown ids are left out."""
+    rows = (await session.execute(text("""
+      SELECT id, content_markdown, content_blocks FROM documents WHERE id = ANY(:ids)
+    """), {"ids": list(document_ids)})).all()
+    wanted = {h for _, md, hashes in rows if md is None for h in hashes}
+    blocks: dict[bytes, str] = {}
+    if wanted:
+        stored = dict((await session.execute(
+            text("SELECT hash, data FROM content_blocks WHERE hash = ANY(:h)"), {"h": list(wanted)},
+        )).all())
+        blocks = _decode(stored) if len(stored) < 16 else await asyncio.to_thread(_decode, stored)
+    return {doc_id: md if md is not None else "".join(blocks[h] for h in hashes) for doc_id, md, hashes in rows}
+
+
+async def document_markdown(session: AsyncSession, document_id: int) -> str | None:
+    return (await document_markdowns(session, [document_id])).get(document_id)
+
+
+# --- Tooling: size report and compaction of rows stored before 013_content_blocks.sql ---
+
+async def storage_report(session: AsyncSession) -> dict:
+    """On-disk table sizes (heap + TOAST + indexes) and the logical bytes they represent."""
+    sizes = (await session.execute(text("""
+      SELECT relname, pg_total_relation_size(oid) AS total, pg_relation_size(oid) AS heap,
+             COALESCE(pg_total_relation_size(NULLIF(reltoastrelid, 0)), 0) AS toast
+      FROM pg_class WHERE relname IN ('documents', 'content_blocks', 'chunks') AND relkind = 'r'
+    """))).mappings().all()
+    docs = (await session.execute(text("""
+      SELECT count(*) AS versions,
+             count(*) FILTER (WHERE content_markdown IS NOT NULL) AS full_text,
+             count(*) FILTER (WHERE content_blocks IS NOT NULL) AS archived,
+             COALESCE(sum(octet_length(content_markdown)), 0) AS full_text_bytes,
+             COALESCE(sum(pg_column_size(content_markdown)), 0) AS full_text_stored_bytes
+      FROM documents
+    """))).mappings().one()
+    blocks = (await session.execute(text("""
+      SELECT count(*) AS blocks, COALESCE(sum(raw_bytes), 0) AS raw_bytes,
+             COALESCE(sum(octet_length(data)), 0) AS stored_bytes
+      FROM content_blocks
+    """))).mappings().one()
+    # Text the archived versions would take stored in full (every reference to a block counts).
+    archived_bytes = (await session.execute(text("""
+      SELECT COALESCE(sum(b.raw_bytes), 0)
+      FROM documents d CROSS JOIN LATERAL unnest(d.content_blocks) AS h(hash)
+      JOIN content_blocks b ON b.hash = h.hash
+    """))).scalar_one()
+    stored = docs["full_text_stored_bytes"] + blocks["stored_bytes"]
+    logical = docs["full_text_bytes"] + archived_bytes
+    return {
+        "tables": {r["relname"]: {"total": r["total"], "heap": r["heap"], "toast": r["toast"]} for r in sizes},
+        "documents": dict(docs),
+        "content_blocks": {**dict(blocks), "archived_text_bytes": archived_bytes},
+        "text_bytes": logical,
+        "text_stored_bytes": stored,
+        "ratio": round(logical / stored, 2) if stored else None,
+    }
+
+
+async def compact(session: AsyncSession, batch: int = 200) -> int:
+    """Archive every superseded version still stored in full, committing per batch; returns rows converted."""
+    total = 0
+    while True:
+        rows = (await session.execute(text("""
+          SELECT DISTINCT d.url, l.id
+          FROM documents d
+          JOIN documents l ON l.url = d.url AND l.is_latest
+          WHERE NOT d.is_latest AND d.content_markdown IS NOT NULL
+          LIMIT :batch
+        """), {"batch": batch})).all()
+        if not rows:
+            return total
+        for url, latest in rows:
+            total += await archive_superseded(session, url, latest)
+        await session.commit()
+
+
+async def _main(args) -> None:
+    async with SessionLocal() as session:
+        if args.command == "report":
+            print(json.dumps(await storage_report(session), indent=2, default=str))
+            return
+        before = await storage_report(session)
+        archived = await compact(session, args.batch)
+    if args.vacuum:
+        # Plain VACUUM makes the freed TOAST space reusable; only VACUUM FULL (exclusive lock) returns it to the OS.
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for table in ("documents", "content_blocks"):
+                await conn.execute(text(f"VACUUM {'FULL ' if args.vacuum == 'full' else ''}ANALYZE {table}"))
+    async with SessionLocal() as session:
+        after = await storage_report(session)
+    print(json.dumps({"archived": archived, "before": before, "after": after}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("command", choices=["report", "compact"])
+    ap.add_argument("--batch", type=int, default=200, help="URLs per transaction when compacting")
+    ap.add_argument("--vacuum", nargs="?", const="plain", choices=["plain", "full"],
+                    help="VACUUM after compacting (`--vacuum full` rewrites the tables under an exclusive lock)")
+    asyncio.run(_main(ap.parse_args()))
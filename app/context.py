@@ -0,0 +1,109 @@
+# app/context.py — RAG context packing for LLM prompts (newsletter, quarterly report).
+# Ranked search matches -> drop near-duplicates (word-shingle containment: chunk overlap, the same article
+# stored at several content_hash versions) -> merge adjacent chunks of one document (removing the
+# chunker's block overlap) -> pack best-first into CONTEXT_MAX_TOKENS of the generation model's tokenizer.
+import re
+from functools import lru_cache
+
+import tiktoken
+
+from .settings import settings
+
+_WORD = re.compile(r"\w+")
+_SHINGLE = 5  # words per shingle
+
+
+@lru_cache(maxsize=1)
+def _tokenizer() -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(settings.openai_model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def _shingles(text: str) -> set[int]:
+    # Only compared within one build_context call, so the process-salted built-in hash is fine.
+    words = _WORD.findall(text.lower())
+    return {hash(tuple(words[i:i + _SHINGLE])) for i in range(max(1, len(words) - _SHINGLE + 1))} if words else set()
+
+
+def _near_duplicate(a: set[int], b: set[int]) -> bool:
+    # Containment rather than Jaccard, so a chunk mostly repeated inside a longer one also counts.
+    if not a or not b:
+        return a == b
+    return len(a & b) / min(len(a), len(b)) >= settings.context_dedup_threshold
+
+
+def _join_overlapping(a: str, b: str) -> str:
+    """a + b without the leading blocks of b that repeat the trailing blocks of a (chunk overlap)."""
+    a_blocks, b_blocks = a.split("\n\n"), b.split("\n\n")
+    for k in range(min(len(a_blocks), len(b_blocks)) - 1, 0, -1):
+        if a_blocks[-k:] == b_blocks[:k]:
+            return "\n\n".join(a_blocks + b_blocks[k:])
+    return a + "\n\n" + b
+
+
+def format_snippet(m: dict) -> str:
+    return f"- URL: {m['url']}\n  score: {m.get('score', '')}\n  excerpt: {m['content']}"
+
+
+def build_context(matches: list[dict], max_tokens: int | None = None) -> tuple[str, dict]:
+    """
+    Pack ranked matches (url, content, score; document_id/chunk_index enable merging) into prompt context.
+    Returns (context, stats); stats compares against pasting every match verbatim:
+    {matches, duplicates_dropped, chunks_merged, snippets, over_budget_dropped, tokens_naive, tokens, tokens_saved}.
+    """
+    max_tokens = max_tokens or settings.context_max_tokens
+    enc = _tokenizer()
+    naive = "\n\n".join(format_snippet(m) for m in matches)
+    stats = {"matches": len(matches), "duplicates_dropped": 0, "chunks_merged": 0}
+
+    # 1) Near-duplicates: keep the best-ranked copy.
+    kept: list[tuple[int, dict]] = []
+    seen: list[set[int]] = []
+    for rank, m in enumerate(matches):
+        sh = _shingles(m["content"])
+        if any(_near_duplicate(sh, s) for s in seen):
+            stats["duplicates_dropped"] += 1
+            continue
+        seen.append(sh)
+        kept.append((rank, m))
+
+    # 2) Adjacent chunks of one document become one snippet, ranked by its best chunk.
+    groups: list[dict] = []
+    by_doc: dict = {}
+    for rank, m in sorted(kept, key=lambda x: (str(x[1].get("document_id")), x[1].get("chunk_index", 0))):
+        doc, idx = m.get("document_id"), m.get("chunk_index")
+        prev = by_doc.get(doc) if doc is not None and idx is not None else None
+        if prev is not None and prev["last_index"] == idx - 1:
+            prev["content"] = _join_overlapping(prev["content"], m["content"])
+            prev["last_index"] = idx
+            prev["rank"] = min(prev["rank"], rank)
+            prev["score"] = max(prev["score"], m.get("score") or 0)
+            stats["chunks_merged"] += 1
+            continue
+        g = {"url": m["url"], "content": m["content"], "score": m.get("score") or 0, "rank": rank, "last_index": idx}
+        groups.append(g)
+        if doc is not None:
+            by_doc[doc] = g
+    groups.sort(key=lambda g: g["rank"])
+
+    # 3) Best-first into the token budget; a snippet that doesn't fit is skipped, smaller ones may still fit.
+    parts: list[str] = []
+    used = 0
+    stats["over_budget_dropped"] = 0
+    for g in groups:
+        text = format_snippet(g)
+        n = len(enc.encode(text, disallowed_special=())) + 1
+        if used + n > max_tokens:
+            stats["over_budget_dropped"] += 1
+            continue
+        parts.append(text)
+        used += n
+    context = "\n\n".join(parts)
+
+    stats["snippets"] = len(parts)
+    stats["tokens_naive"] = len(enc.encode(naive, disallowed_special=()))
+    stats["tokens"] = len(enc.encode(context, disallowed_special=()))
+    stats["tokens_saved"] = stats["tokens_naive"] - stats["tokens"]
+    return context, stats
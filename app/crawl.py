@@ -1,13 +1,14 @@
 # app/crawl.py — calls Crawl4AI Docker container HTTP API; returns normalized content.
 # PDFs: Crawl4AI Docker API fails (dict/logger) with PDF strategies; we use local pypdf extraction.
 import hashlib
-import io
-import re
+import tempfile
 from urllib.parse import urlparse
 
 import httpx
-from pypdf import PdfReader
 
+from .http_client import get_client
+from .metrics import timed
+from .pdf import PdfRejected, extract_pdf
 from .settings import settings
 
 def sha256_text(s: str) -> str:
@@ -37,73 +38,126 @@ def _pdf_headers_for(url: str) -> dict:
     }
 
 
-async def _crawl_pdf_local(url: str) -> dict:
+def _conditional_headers(validators: dict | None) -> dict:
+    """If-None-Match / If-Modified-Since from a previous crawl's validators."""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _validators_from(headers) -> dict:
+    """ETag / Last-Modified from response headers (httpx.Headers or a plain dict from Crawl4AI)."""
+    h = {str(k).lower(): v for k, v in (headers or {}).items()}
+    return {"etag": h.get("etag"), "last_modified": h.get("last-modified")}
+
+
+def _not_modified(url: str, validators: dict) -> dict:
+    return {
+        "url": url,
+        "title": None,
+        "markdown": "",
+        "content_hash": validators.get("content_hash"),
+        "not_modified": True,
+        "http_status": 304,
+        "etag": validators.get("etag"),
+        "last_modified": validators.get("last_modified"),
+    }
+
+
+async def _download_to(resp: httpx.Response, f) -> int:
+    """Stream a response body into file f, enforcing PDF_MAX_BYTES. Returns bytes written."""
+    declared = resp.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > settings.pdf_max_bytes:
+        raise PdfRejected(f"PDF is {int(declared)} bytes; limit is {settings.pdf_max_bytes}")
+    size = 0
+    async for block in resp.aiter_bytes(1 << 16):
+        size += len(block)
+        if size > settings.pdf_max_bytes:
+            raise PdfRejected(f"PDF exceeds {settings.pdf_max_bytes} bytes")
+        f.write(block)
+    f.flush()
+    return size
+
+
+async def _crawl_pdf_local(url: str, validators: dict | None = None) -> dict:
     """
     Fetch PDF and extract text with pypdf (Crawl4AI Docker PDF API has dict/logger bugs).
-    Returns same shape as crawl_url: {url, title, markdown, content_hash}.
+    The body streams to a temp file and is parsed in the PDF process pool (app/pdf.py).
+    Sends a conditional GET when validators are known; 304 skips download and parsing.
+    Returns same shape as crawl_url.
     """
-    headers = _pdf_headers_for(url)
-    async with httpx.AsyncClient(timeout=120.0, follow_redirects=True, headers=headers) as client:
-        resp = await client.get(url)
-        # Some hosts (e.g. dadavidson.com) return 403 for non-browser; surface clear error
-        if resp.status_code == 403:
-            raise httpx.HTTPStatusError(
-                "PDF URL returned 403 Forbidden; host may require a browser. Try a public PDF (e.g. https://arxiv.org/pdf/2310.06825.pdf) to validate.",
-                request=resp.request,
-                response=resp,
-            )
-        resp.raise_for_status()
-        raw = resp.content
-    if not raw:
-        return {"url": url, "title": None, "markdown": "", "content_hash": sha256_text("")}
-    reader = PdfReader(io.BytesIO(raw))
-    parts = []
-    for page in reader.pages:
-        try:
-            t = page.extract_text()
-            if t:
-                parts.append(t.strip())
-        except Exception:
-            continue
-    # Optional: use PDF metadata as title
-    title = None
-    try:
-        meta = reader.metadata
-        if meta and meta.get("/Title"):
-            title = meta.get("/Title")
-    except Exception:
-        pass
-    if not title and parts:
-        # First non-empty line as fallback title
-        first = parts[0][:200] if parts[0] else ""
-        first = re.sub(r"\s+", " ", first).strip()
-        if first:
-            title = first
-    markdown = "\n\n".join(parts).strip()
+    headers = {**_pdf_headers_for(url), **_conditional_headers(validators)}
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+        async with get_client().stream("GET", url, headers=headers, follow_redirects=True) as resp:
+            if resp.status_code == 304 and validators:
+                return _not_modified(url, validators)
+            # Some hosts (e.g. dadavidson.com) return 403 for non-browser; surface clear error
+            if resp.status_code == 403:
+                raise httpx.HTTPStatusError(
+                    "PDF URL returned 403 Forbidden; host may require a browser. Try a public PDF (e.g. https://arxiv.org/pdf/2310.06825.pdf) to validate.",
+                    request=resp.request,
+                    response=resp,
+                )
+            resp.raise_for_status()
+            http_status = resp.status_code
+            fresh = _validators_from(resp.headers)
+            size = await _download_to(resp, f)
+        if not size:
+            return {"url": url, "title": None, "markdown": "", "content_hash": sha256_text(""), "http_status": http_status, **fresh}
+        extracted = await extract_pdf(f.name)
+    markdown = extracted["markdown"]
     return {
         "url": url,
-        "title": title,
+        "title": extracted["title"],
         "markdown": markdown,
         "content_hash": sha256_text(markdown),
+        "http_status": http_status,
+        **fresh,
     }
 
 
-async def crawl_url(url: str) -> dict:
+async def _origin_not_modified(url: str, validators: dict | None) -> bool:
+    """
+    Cheap conditional GET against the origin before paying for a Crawl4AI render.
+    Only tried when a previous crawl captured ETag/Last-Modified; any failure means "maybe changed".
+    """
+    cond = _conditional_headers(validators)
+    if not cond:
+        return False
+    headers = {"User-Agent": _pdf_headers_for(url)["User-Agent"], **cond}
+    try:
+        async with get_client().stream("GET", url, headers=headers, follow_redirects=True, timeout=15.0) as resp:
+            # Body is never read: a 200 just closes the stream and we fall through to Crawl4AI.
+            return resp.status_code == 304
+    except httpx.HTTPError:
+        return False
+
+
+@timed("crawl")
+async def crawl_url(url: str, validators: dict | None = None) -> dict:
     """
     Crawl a single URL. PDFs: local pypdf extraction (Crawl4AI PDF API broken in Docker).
-    HTML: Crawl4AI Docker API (POST /crawl). Returns: {url, title, markdown, content_hash}
+    HTML: Crawl4AI Docker API (POST /crawl).
+    validators: {etag, last_modified, content_hash} from the previous crawl; enables conditional requests.
+    Returns: {url, title, markdown, content_hash, etag, last_modified, http_status}, plus
+    not_modified=True (and empty markdown) when the origin answered 304.
     """
     if _is_pdf_url(url):
-        return await _crawl_pdf_local(url)
+        return await _crawl_pdf_local(url, validators)
+    if await _origin_not_modified(url, validators):
+        return _not_modified(url, validators)
 
     base = settings.crawl4ai_base_url.rstrip("/")
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        resp = await client.post(
-            f"{base}/crawl",
-            json={"urls": [url]},
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    resp = await get_client().post(
+        f"{base}/crawl",
+        json={"urls": [url]},
+    )
+    resp.raise_for_status()
+    data = resp.json()
 
     results = data.get("results") or []
     if not results:
@@ -133,4 +187,6 @@ async def crawl_url(url: str) -> dict:
         "title": r.get("title"),
         "markdown": md,
         "content_hash": sha256_text(md),
+        "http_status": r.get("status_code"),
+        **_validators_from(r.get("response_headers")),
     }
@@ -1,9 +1,35 @@
+import struct
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from .settings import settings
 
 engine = create_async_engine(settings.database_url, pool_pre_ping=True)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
+
+# pgvector binary wire format: uint16 dim, uint16 unused, dim x float32 (big-endian).
+# Lets params/COPY send list[float] as 4 bytes per dim instead of decimal text, and decodes results to lists.
+def _encode_vector(v) -> bytes:
+    return struct.pack(f">HH{len(v)}f", len(v), 0, *v)
+
+
+def _decode_vector(b: bytes) -> list[float]:
+    dim, _ = struct.unpack_from(">HH", b)
+    return list(struct.unpack_from(f">{dim}f", b, 4))
+
+
+async def _set_vector_codec(conn) -> None:
+    await conn.set_type_codec(
+        "vector", schema="public", encoder=_encode_vector, decoder=_decode_vector, format="binary"
+    )
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _register_vector_codec(dbapi_connection, connection_record):
+    dbapi_connection.run_async(_set_vector_codec)
+
+
 async def get_session() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
@@ -0,0 +1,86 @@
+# app/embed_cache.py — content-addressed embedding cache: (embed model, sha256 of text) -> vector.
+# In-process LRU in front of the Postgres embedding_cache table; embed_texts consults it before OpenAI.
+import hashlib
+import logging
+from array import array
+
+from sqlalchemy import text
+
+from .cache import LRUCache
+from .db import SessionLocal
+from .settings import settings
+
+log = logging.getLogger(__name__)
+
+# Vectors are held as float32 arrays (~12 KB each at 3072 dims) instead of lists of Python floats (~100 KB).
+_lru = LRUCache(settings.embed_cache_size)
+_counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "db_errors": 0}
+
+
+def text_hash(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+
+async def get_many(hashes: list[str]) -> dict[str, list[float]]:
+    """Return cached vectors for the given text hashes (memory first, then Postgres)."""
+    model = settings.openai_embed_model
+    found: dict[str, list[float]] = {}
+    missing: list[str] = []
+    for h in hashes:
+        vec = _lru.get((model, h))
+        if vec is not None:
+            found[h] = vec.tolist()
+        else:
+            missing.append(h)
+    _counters["memory_hits"] += len(found)
+
+    if missing:
+        try:
+            async with SessionLocal() as session:
+                rows = (await session.execute(text("""
+                    SELECT text_hash, embedding
+                    FROM embedding_cache
+                    WHERE model = :m AND text_hash = ANY(:hs)
+                """), {"m": model, "hs": missing})).all()
+        except Exception:
+            # Cache is an optimisation; never fail embedding because of it.
+            log.exception("embedding cache lookup failed")
+            _counters["db_errors"] += 1
+            rows = []
+        for h, vec in rows:
+            _lru.set((model, h), array("f", vec))
+            found[h] = vec
+        _counters["db_hits"] += len(rows)
+    _counters["misses"] += len(hashes) - len(found)
+    return found
+
+
+async def put_many(items: dict[str, list[float]]) -> None:
+    """Store freshly computed vectors in both tiers."""
+    if not items:
+        return
+    model = settings.openai_embed_model
+    for h, vec in items.items():
+        _lru.set((model, h), array("f", vec))
+    try:
+        async with SessionLocal() as session:
+            await session.execute(text("""
+                INSERT INTO embedding_cache(model, text_hash, embedding)
+                VALUES (:m, :h, CAST(:e AS vector))
+                ON CONFLICT (model, text_hash) DO NOTHING
+            """), [{"m": model, "h": h, "e": vec} for h, vec in items.items()])
+            await session.commit()
+    except Exception:
+        log.exception("embedding cache write failed")
+        _counters["db_errors"] += 1
+
+
+def stats() -> dict:
+    lookups = _counters["memory_hits"] + _counters["db_hits"] + _counters["misses"]
+    hits = _counters["memory_hits"] + _counters["db_hits"]
+    return {
+        "model": settings.openai_embed_model,
+        **_counters,
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+        "lru": _lru.stats(),
+    }
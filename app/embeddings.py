@@ -1,15 +1,96 @@
-from openai import OpenAI
+# app/embeddings.py — async OpenAI embeddings: token-budgeted batches sent concurrently through openai_gateway.
+import asyncio
+
+import tiktoken
+
+from . import embed_cache, openai_gateway
+from .metrics import timed
 from .settings import settings
 
-_client = OpenAI(api_key=settings.openai_api_key)
+# Embedding share of the gateway's OPENAI_CONCURRENCY, so a large ingest leaves room for model calls.
+_semaphore = asyncio.Semaphore(settings.embed_concurrency)
+
+# OpenAI embedding models reject inputs longer than this many tokens.
+MAX_INPUT_TOKENS = 8191
+
 
-async def embed_texts(texts: list[str]) -> list[list[float]]:
+def tokenizer() -> tiktoken.Encoding:
+    """Tokenizer of the embedding model (cl100k_base if tiktoken doesn't know the model)."""
+    try:
+        return tiktoken.encoding_for_model(settings.openai_embed_model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def _batches(texts: list[str]) -> list[list[tuple[int, str]]]:
     """
-    Returns embeddings for each input string.
-    Note: OpenAI SDK call is synchronous; for strict async you can wrap in a thread executor.
+    Split texts into [(input_index, text), ...] batches that stay under the per-request
+    token and input-count budgets. Over-long inputs are truncated to MAX_INPUT_TOKENS.
     """
-    resp = _client.embeddings.create(
+    enc = tokenizer()
+    batches: list[list[tuple[int, str]]] = []
+    current: list[tuple[int, str]] = []
+    current_tokens = 0
+    for i, t in enumerate(texts):
+        tokens = enc.encode(t, disallowed_special=())
+        if len(tokens) > MAX_INPUT_TOKENS:
+            tokens = tokens[:MAX_INPUT_TOKENS]
+            t = enc.decode(tokens)
+        n = max(1, len(tokens))
+        if current and (
+            current_tokens + n > settings.embed_batch_max_tokens
+            or len(current) >= settings.embed_batch_max_inputs
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append((i, t))
+        current_tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _embed_batch(batch: list[tuple[int, str]]) -> list[list[float]]:
+    resp = await openai_gateway.create_embeddings(
         model=settings.openai_embed_model,
-        input=texts,
+        input=[t for _, t in batch],
+        limit=_semaphore,
+        max_retries=settings.embed_max_retries,
     )
-    return [d.embedding for d in resp.data]
+    # API returns items with .index into the request input; don't rely on list order.
+    return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+
+async def _embed_uncached(texts: list[str]) -> list[list[float]]:
+    # Tokenising a large document is CPU work; keep it off the event loop.
+    batches = _batches(texts) if len(texts) <= 32 else await asyncio.to_thread(_batches, texts)
+    results = await asyncio.gather(*(_embed_batch(b) for b in batches))
+    out: list[list[float]] = [[] for _ in texts]
+    for batch, vectors in zip(batches, results):
+        for (i, _), vec in zip(batch, vectors):
+            out[i] = vec
+    return out
+
+
+@timed("embed")
+async def embed_texts(texts: list[str], *, use_cache: bool = True) -> list[list[float]]:
+    """
+    Returns embeddings for each input string, in input order.
+    Texts already seen (same model + sha256) come from the embedding cache; the rest are
+    sent as concurrent batches (up to EMBED_CONCURRENCY requests in flight process-wide)
+    without blocking the event loop.
+    """
+    if not texts:
+        return []
+    if not use_cache or not settings.embed_cache_enabled:
+        return await _embed_uncached(texts)
+
+    hashes = [embed_cache.text_hash(t) for t in texts]
+    cached = await embed_cache.get_many(list(dict.fromkeys(hashes)))
+    # Embed each distinct uncached text once, even if it repeats in the input.
+    todo = {h: t for h, t in zip(hashes, texts) if h not in cached}
+    if todo:
+        fresh = dict(zip(todo, await _embed_uncached(list(todo.values()))))
+        await embed_cache.put_many(fresh)
+        cached.update(fresh)
+    return [cached[h] for h in hashes]
@@ -0,0 +1,38 @@
+# app/http_client.py — application-lifetime pooled httpx client shared by all crawl paths.
+# Opened in the FastAPI lifespan (and lazily by workers/scripts), closed on shutdown; keeps TCP/TLS
+# connections alive per host instead of a new handshake per URL.
+import httpx
+
+from .settings import settings
+
+_client: httpx.AsyncClient | None = None
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.http2,
+        timeout=httpx.Timeout(120.0, connect=15.0),
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+    return _client
+
+
+async def startup() -> None:
+    get_client()
+
+
+async def shutdown() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
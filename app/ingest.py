@@ -1,21 +1,165 @@
-from typing import List
+# app/ingest.py — markdown-aware chunking packed to a token budget (embed model tokenizer).
+# Documents are scanned once into structural blocks (headings, paragraphs, tables, code fences), then
+# packed greedily into chunks of at most CHUNK_MAX_TOKENS. Packing restarts at every heading of level
+# <= CHUNK_HEADING_LEVEL, so chunk boundaries inside a section depend only on that section: an unchanged
+# section yields identical chunks (and embedding cache hits) across re-crawls.
+import re
+from typing import Iterator, List
+
+from .embeddings import tokenizer
 from .settings import settings
 
-def chunk_text(text: str, chunk_size: int | None = None, overlap: int | None = None) -> List[str]:
-    chunk_size = chunk_size or settings.chunk_size
-    overlap = overlap or settings.chunk_overlap
+_HEADING = re.compile(r"#{1,6}\s")
+_FENCE = re.compile(r"(```|~~~)")
+_TABLE_SEP = re.compile(r"\|?\s*:?-{3,}")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
 
-    text = (text or "").strip()
-    if not text:
-        return []
 
-    chunks = []
-    i = 0
+def _lines(text: str) -> Iterator[str]:
+    """Lines of text without materialising a list of them."""
+    start = 0
     n = len(text)
-    while i < n:
-        j = min(i + chunk_size, n)
-        chunks.append(text[i:j])
-        if j == n:
-            break
-        i = max(0, j - overlap)
-    return chunks
+    while start < n:
+        end = text.find("\n", start)
+        if end < 0:
+            end = n
+        yield text[start:end].rstrip("\r")
+        start = end + 1
+
+
+def iter_blocks(text: str) -> Iterator[tuple[str, str]]:
+    """
+    Yield (kind, text) structural blocks in document order. kind: heading<level> (e.g. "heading2"),
+    table, code or paragraph. Blank lines separate paragraphs; tables and fences are never split here.
+    """
+    buf: list[str] = []
+    kind = None
+    fence = None
+    for line in _lines(text):
+        stripped = line.lstrip()
+        if fence is not None:
+            buf.append(line)
+            if stripped.startswith(fence):
+                yield "code", "\n".join(buf)
+                buf, kind, fence = [], None, None
+            continue
+        m = _FENCE.match(stripped)
+        is_table = stripped.startswith("|")
+        if m or _HEADING.match(stripped) or not stripped or (kind == "table") != is_table:
+            if buf:
+                yield kind, "\n".join(buf)
+                buf, kind = [], None
+        if not stripped:
+            continue
+        if m:
+            fence = m.group(1)
+            buf, kind = [line], "code"
+        elif _HEADING.match(stripped):
+            yield f"heading{len(stripped) - len(stripped.lstrip('#'))}", stripped
+        else:
+            buf.append(line)
+            kind = "table" if is_table else "paragraph"
+    if buf:
+        yield kind, "\n".join(buf)
+
+
+def _split_block(kind: str, text: str, max_tokens: int) -> Iterator[tuple[str, int]]:
+    """Split one over-budget block into (text, tokens) pieces of <= max_tokens, on rows/lines/sentences."""
+    enc = tokenizer()
+    header = ""
+    if kind == "table":
+        rows = text.split("\n")
+        # Repeat the header (and |---| separator) on every piece so each is a readable table.
+        n_head = 2 if len(rows) > 1 and _TABLE_SEP.match(rows[1].strip()) else 1
+        header, parts, sep = "\n".join(rows[:n_head]), rows[n_head:], "\n"
+    elif kind == "code":
+        parts, sep = text.split("\n"), "\n"
+    else:
+        parts, sep = _SENTENCE_END.split(text), " "
+    head_tokens = len(enc.encode(header, disallowed_special=())) + 1 if header else 0
+
+    current: list[str] = []
+    current_tokens = head_tokens
+    for part in parts:
+        ids = enc.encode(part, disallowed_special=())
+        if head_tokens + len(ids) > max_tokens:
+            # A single row/line/sentence over budget: fall back to fixed token windows.
+            if current:
+                yield sep.join(([header] if header else []) + current), current_tokens
+                current, current_tokens = [], head_tokens
+            step = max(1, max_tokens - head_tokens)
+            for i in range(0, len(ids), step):
+                window = ids[i:i + step]
+                yield (header + "\n" if header else "") + enc.decode(window), head_tokens + len(window)
+            continue
+        if current and current_tokens + len(ids) + 1 > max_tokens:
+            yield sep.join(([header] if header else []) + current), current_tokens
+            current, current_tokens = [], head_tokens
+        current.append(part)
+        current_tokens += len(ids) + 1
+    if current:
+        yield sep.join(([header] if header else []) + current), current_tokens
+
+
+def iter_chunks(
+    text: str,
+    max_tokens: int | None = None,
+    overlap_tokens: int | None = None,
+    heading_level: int | None = None,
+) -> Iterator[str]:
+    """
+    Stream chunks of markdown `text`, each at most ~max_tokens embed-model tokens. Blocks are only cut
+    when a single block exceeds the budget. Consecutive chunks of the same section share trailing whole
+    blocks up to overlap_tokens. Linear in document size: every block is tokenised once.
+    """
+    max_tokens = max_tokens or settings.chunk_max_tokens
+    overlap_tokens = settings.chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+    heading_level = heading_level or settings.chunk_heading_level
+    enc = tokenizer()
+
+    current: list[tuple[str, int, bool]] = []  # (block text, tokens, is heading)
+    current_tokens = 0
+
+    def carry() -> list[tuple[str, int, bool]]:
+        # Trailing whole blocks of the chunk just emitted, within the overlap budget.
+        kept, total = [], 0
+        for block in reversed(current):
+            if total + block[1] > overlap_tokens:
+                break
+            kept.append(block)
+            total += block[1]
+        kept.reverse()
+        # Carrying the entire chunk would repeat it verbatim.
+        return kept if len(kept) < len(current) else []
+
+    for kind, block in iter_blocks(text or ""):
+        is_heading = kind.startswith("heading")
+        if is_heading and int(kind[7:]) <= heading_level and current:
+            yield "\n\n".join(b for b, _, _ in current)
+            current, current_tokens = [], 0
+        n = len(enc.encode(block, disallowed_special=())) + 1  # + separator
+        # Right after a heading, size the first split so the heading isn't left alone in a chunk.
+        budget = max_tokens - current_tokens if current and all(h for _, _, h in current) else max_tokens
+        pieces = _split_block(kind, block, budget) if n > budget else [(block, n)]
+        for piece, piece_tokens in pieces:
+            if current and current_tokens + piece_tokens > max_tokens:
+                # A heading ending the chunk moves forward with the text it introduces.
+                trailing = current.pop() if len(current) > 1 and current[-1][2] else None
+                yield "\n\n".join(b for b, _, _ in current)
+                current = carry() if trailing is None else [trailing]
+                current_tokens = sum(t for _, t, _ in current)
+                # Overlap must still leave room for the new piece.
+                while current and current_tokens + piece_tokens > max_tokens:
+                    current_tokens -= current.pop(0)[1]
+            current.append((piece, piece_tokens, is_heading))
+            current_tokens += piece_tokens
+    if current:
+        yield "\n\n".join(b for b, _, _ in current)
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int | None = None,
+    overlap_tokens: int | None = None,
+) -> List[str]:
+    return list(iter_chunks(text, max_tokens, overlap_tokens))
@@ -0,0 +1,210 @@
+# app/jobs.py — durable background jobs in Postgres (jobs table), claimed with FOR UPDATE SKIP LOCKED.
+# Workers run inside the API process (JOBS_INPROCESS_WORKERS) and/or standalone: python -m app.worker
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+
+from .db import SessionLocal
+from .metrics import stage
+from .newsletter import RunNotFound, generate_newsletter_run
+from .pipeline import IngestError, ingest_url
+from .retention import run_retention
+from .settings import settings
+
+log = logging.getLogger(__name__)
+
+# Errors that will fail the same way on retry; the job fails immediately.
+_PERMANENT_ERRORS = (IngestError, RunNotFound)
+
+# Set by enqueue() so in-process workers pick new jobs up without waiting for the next poll.
+_wakeup = asyncio.Event()
+
+
+async def enqueue(kind: str, payload: dict, *, max_attempts: int | None = None) -> int:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    async with SessionLocal() as session:
+        job_id = (await session.execute(text("""
+            INSERT INTO jobs(kind, payload, max_attempts)
+            VALUES (:kind, :payload, :max_attempts)
+            RETURNING id
+        """), {
+            "kind": kind,
+            "payload": json.dumps(payload),
+            "max_attempts": max_attempts or settings.jobs_max_attempts,
+        })).scalar_one()
+        await session.commit()
+    _wakeup.set()
+    return job_id
+
+
+async def get_job(job_id: int) -> dict | None:
+    async with SessionLocal() as session:
+        row = (await session.execute(text("""
+            SELECT id, kind, payload, status, progress, result, error, attempts, max_attempts,
+                   run_after, locked_by, created_at, updated_at, finished_at
+            FROM jobs WHERE id = :id
+        """), {"id": job_id})).mappings().first()
+    if not row:
+        return None
+    job = dict(row)
+    for k in ("payload", "progress", "result"):
+        if isinstance(job[k], str):
+            job[k] = json.loads(job[k])
+    return job
+
+
+async def _claim(worker_id: str) -> dict | None:
+    async with SessionLocal() as session:
+        row = (await session.execute(text("""
+            UPDATE jobs
+            SET status = 'running', locked_by = :w, locked_at = NOW(), attempts = attempts + 1, updated_at = NOW()
+            WHERE id = (
+              SELECT id FROM jobs
+              WHERE status = 'queued' AND run_after <= NOW()
+              ORDER BY run_after, id
+              FOR UPDATE SKIP LOCKED
+              LIMIT 1
+            )
+            RETURNING id, kind, payload, attempts, max_attempts
+        """), {"w": worker_id})).mappings().first()
+        await session.commit()
+    if not row:
+        return None
+    job = dict(row)
+    if isinstance(job["payload"], str):
+        job["payload"] = json.loads(job["payload"])
+    return job
+
+
+async def _requeue_stale() -> int:
+    """
+    Jobs whose worker stopped heartbeating (crash, redeploy) go back to the queue, unless that was their
+    last attempt: a job that kills its worker every time (OOM, native crash) fails instead of looping.
+    """
+    async with SessionLocal() as session:
+        n = (await session.execute(text("""
+            UPDATE jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                error = CASE WHEN attempts >= max_attempts THEN 'worker lost (no heartbeat)' ELSE error END,
+                finished_at = CASE WHEN attempts >= max_attempts THEN NOW() ELSE finished_at END,
+                locked_by = NULL, locked_at = NULL, updated_at = NOW()
+            WHERE status = 'running' AND locked_at < NOW() - make_interval(secs => :t)
+        """), {"t": float(settings.jobs_lock_timeout)})).rowcount
+        await session.commit()
+    return n
+
+
+async def _update(job_id: int, sql: str, params: dict) -> None:
+    async with SessionLocal() as session:
+        await session.execute(text(sql), {"id": job_id, **params})
+        await session.commit()
+
+
+async def _heartbeat(job_id: int) -> None:
+    while True:
+        await asyncio.sleep(settings.jobs_heartbeat_interval)
+        await _update(job_id, "UPDATE jobs SET locked_at = NOW() WHERE id = :id AND status = 'running'", {})
+
+
+async def _run_one(job: dict) -> None:
+    job_id = job["id"]
+
+    async def progress(p: dict) -> None:
+        await _update(job_id, "UPDATE jobs SET progress = :p, updated_at = NOW() WHERE id = :id", {"p": json.dumps(p)})
+
+    hb = asyncio.create_task(_heartbeat(job_id))
+    try:
+        with stage(f"job_{job['kind']}"):
+            result = await HANDLERS[job["kind"]](job["payload"], progress)
+    except asyncio.CancelledError:
+        # Worker shutting down mid-job: hand it straight back instead of waiting for the lock timeout.
+        await _update(job_id, """
+            UPDATE jobs SET status = 'queued', attempts = attempts - 1, locked_by = NULL, locked_at = NULL,
+                   updated_at = NOW()
+            WHERE id = :id
+        """, {})
+        raise
+    except Exception as e:
+        err = f"{type(e).__name__}: {e}"
+        if isinstance(e, _PERMANENT_ERRORS) or job["attempts"] >= job["max_attempts"]:
+            log.warning("job %s (%s) failed: %s", job_id, job["kind"], err)
+            await _update(job_id, """
+                UPDATE jobs SET status = 'failed', error = :err, locked_by = NULL, locked_at = NULL,
+                       updated_at = NOW(), finished_at = NOW()
+                WHERE id = :id
+            """, {"err": err})
+        else:
+            # Exponential backoff before the next attempt.
+            await _update(job_id, """
+                UPDATE jobs SET status = 'queued', error = :err, locked_by = NULL, locked_at = NULL,
+                       run_after = NOW() + make_interval(secs => :delay), updated_at = NOW()
+                WHERE id = :id
+            """, {"err": err, "delay": float(min(2 ** job["attempts"] * 5, 600))})
+        return
+    finally:
+        hb.cancel()
+    await _update(job_id, """
+        UPDATE jobs SET status = 'succeeded', result = :r, error = NULL, locked_by = NULL, locked_at = NULL,
+               updated_at = NOW(), finished_at = NOW()
+        WHERE id = :id
+    """, {"r": json.dumps(result, default=str)})
+
+
+async def run_worker(name: str, stop: asyncio.Event) -> None:
+    """Claim and run jobs one at a time until `stop` is set."""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{name}"
+    log.info("job worker %s started", worker_id)
+    while not stop.is_set():
+        try:
+            await _requeue_stale()
+            job = await _claim(worker_id)
+        except Exception:
+            log.exception("job worker %s: claim failed", worker_id)
+            job = None
+        if job is None:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.jobs_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        try:
+            await _run_one(job)
+        except Exception:
+            # Bookkeeping failed (e.g. DB blip); the stale-lock sweep will re-queue the job.
+            log.exception("job worker %s: job %s bookkeeping failed", worker_id, job["id"])
+    log.info("job worker %s stopped", worker_id)
+
+
+# --- Handlers: kind -> async (payload, progress) -> JSON-serialisable result ---
+
+async def _crawl_job(payload: dict, progress) -> dict:
+    async with SessionLocal() as session:
+        return await ingest_url(session, payload["url"], payload.get("source_id"))
+
+
+async def _newsletter_generate_job(payload: dict, progress) -> dict:
+    async with SessionLocal() as session:
+        return await generate_newsletter_run(session, payload["run_id"], force=payload.get("force", False), progress=progress)
+
+
+async def _retention_job(payload: dict, progress) -> dict:
+    return await run_retention(
+        days=payload.get("days"),
+        delete_documents=payload.get("delete_documents"),
+        dry_run=payload.get("dry_run", False),
+        progress=progress,
+    )
+
+
+HANDLERS: dict[str, Callable[[dict, Callable[[dict], Awaitable[None]]], Awaitable[dict]]] = {
+    "crawl": _crawl_job,
+    "newsletter_generate": _newsletter_generate_job,
+    "retention": _retention_job,
+}
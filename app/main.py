@@ -1,21 +1,48 @@
 # app/main.py — FastAPI app entry; served via uvicorn in Docker (see Dockerfile + docker-compose api service).
-from fastapi import Body, FastAPI, Depends, Form, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Literal
+
+from fastapi import Body, FastAPI, Depends, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from .db import get_session
-from .crawl import crawl_url
-import httpx
-from .ingest import chunk_text
-from .embeddings import embed_texts
-from .search import similarity_search
-from .reports import build_quarterly_report_markdown
+from .db import SessionLocal, get_session
+from .jobs import enqueue, get_job, run_worker
+from .retention import run_retention
+from .scheduler import run_scheduler
+from .pipeline import IngestError, crawl_batch, ingest_url
+from .settings import settings
+from . import embed_cache, http_client, metrics, openai_gateway, paging, pdf, query_cache
+from .search import SearchFilters, search_chunks
+from .reports import build_quarterly_report_markdown, stream_quarterly_report_markdown
 from .openai_websearch import OpenAIWebSearchClient
-from .newsletter import build_newsletter_markdown
-
-app = FastAPI(title="Scraper/Aggregator MVP")
+from .newsletter import RunNotFound, generate_newsletter_run as run_newsletter_generation, stream_newsletter_run
+from .upload import UploadError, ingest_uploads, iter_multipart, iter_ndjson, multipart_boundary
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In-process job workers; more capacity = more `python -m app.worker` processes.
+    await http_client.startup()
+    stop = asyncio.Event()
+    workers = [asyncio.create_task(run_worker(f"api-{i}", stop)) for i in range(settings.jobs_inprocess_workers)]
+    if settings.scheduler_enabled:
+        workers.append(asyncio.create_task(run_scheduler(stop)))
+    yield
+    stop.set()
+    for w in workers:
+        w.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await http_client.shutdown()
+    await openai_gateway.shutdown()
+    pdf.shutdown()
+
+
+app = FastAPI(title="Scraper/Aggregator MVP", lifespan=lifespan)
 
 # Allow Vite dev server (and other origins) to call API
 app.add_middleware(
@@ -31,24 +58,52 @@ websearch = OpenAIWebSearchClient()
 class SourceIn(BaseModel):
     name: str
     base_url: HttpUrl
+    crawl_interval_seconds: int = Field(86400, ge=60)  # a shorter interval would drain the shared crawl budget
+    max_urls_per_run: int = 50
+    enabled: bool = True
 
 class CrawlIn(BaseModel):
     url: HttpUrl
     source_id: int | None = None
 
+class CrawlBatchIn(BaseModel):
+    urls: list[HttpUrl]
+    source_id: int | None = None
+
+class RetentionIn(BaseModel):
+    days: float | None = None  # default RETENTION_DAYS
+    delete_documents: bool | None = None  # default RETENTION_DELETE_DOCUMENTS
+    dry_run: bool = False
+
 class DiscoverIn(BaseModel):
     query: str
     instructions: str | None = None
     web_search_options: dict | None = None
 
+SearchMode = Literal["vector", "hybrid", "lexical"]
+
+class SearchFiltersIn(BaseModel):
+    created_after: datetime | None = None  # documents.created_at, inclusive
+    created_before: datetime | None = None  # exclusive
+    source_ids: list[int] | None = None
+    url_prefixes: list[str] | None = None
+    document_ids: list[int] | None = None
+
+    def to_filters(self) -> SearchFilters | None:
+        return SearchFilters.from_dict(self.model_dump())
+
 class QueryIn(BaseModel):
     query: str
     top_k: int = 10
+    mode: SearchMode | None = None  # default SEARCH_MODE
+    filters: SearchFiltersIn | None = None
 
 class ReportIn(BaseModel):
     quarter_label: str
     query: str = "top themes"
     top_k: int = 25
+    mode: SearchMode | None = None
+    filters: SearchFiltersIn | None = None
 
 
 class NewsletterTemplateIn(BaseModel):
@@ -59,10 +114,16 @@ class NewsletterTemplateIn(BaseModel):
     use_web_search: bool = True
 
 
+class RagFiltersIn(SearchFiltersIn):
+    # Restrict retrieval to the template's source_urls and the run's extra_source_urls (as URL prefixes).
+    template_sources_only: bool = False
+
+
 class NewsletterRunIn(BaseModel):
     label: str
     prompt_override: str | None = None
     extra_source_urls: list[str] = []
+    rag_filters: RagFiltersIn | None = None
 
 
 class NewsletterRunUpdate(BaseModel):
@@ -70,6 +131,7 @@ class NewsletterRunUpdate(BaseModel):
     prompt_override: str | None = None
     extra_source_urls: list[str] | None = None
     feedback: str | None = None
+    rag_filters: RagFiltersIn | None = None
 
 
 # Default prompt for /test-websearch: equities newsletter in style of prior quarters.
@@ -108,13 +170,56 @@ class TestWebSearchIn(BaseModel):
 async def health():
     return {"ok": True}
 
+@app.get("/embeddings/cache-stats")
+async def embedding_cache_stats():
+    return embed_cache.stats()
+
+@app.get("/search/cache-stats")
+async def search_cache_stats():
+    return query_cache.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    # Per-process: in-process job workers and the scheduler report here; `python -m app.worker` has its own.
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+@app.get("/sources")
+async def list_sources(session: AsyncSession = Depends(get_session)):
+    rows = (await session.execute(text("""
+        SELECT id, name, base_url, enabled, crawl_interval_seconds, max_urls_per_run,
+               next_crawl_at, last_crawled_at, created_at
+        FROM sources ORDER BY id
+    """))).mappings().all()
+    return {"sources": [dict(r) for r in rows]}
+
 @app.post("/sources")
 async def create_source(payload: SourceIn, session: AsyncSession = Depends(get_session)):
-    q = text("INSERT INTO sources(name, base_url) VALUES (:n, :u) RETURNING id")
-    sid = (await session.execute(q, {"n": payload.name, "u": str(payload.base_url)})).scalar_one()
+    q = text("""
+        INSERT INTO sources(name, base_url, enabled, crawl_interval_seconds, max_urls_per_run)
+        VALUES (:n, :u, :enabled, :interval, :max_urls)
+        RETURNING id
+    """)
+    sid = (await session.execute(q, {
+        "n": payload.name,
+        "u": str(payload.base_url),
+        "enabled": payload.enabled,
+        "interval": payload.crawl_interval_seconds,
+        "max_urls": payload.max_urls_per_run,
+    })).scalar_one()
     await session.commit()
     return {"id": sid}
 
+# Make a source due now; the scheduler picks it up on its next reload (SCHEDULER_RELOAD_INTERVAL).
+@app.post("/sources/{source_id}/refresh")
+async def refresh_source_now(source_id: int, session: AsyncSession = Depends(get_session)):
+    r = (await session.execute(text("""
+        UPDATE sources SET next_crawl_at = NOW() WHERE id = :id RETURNING id
+    """), {"id": source_id})).scalar_one_or_none()
+    await session.commit()
+    if not r:
+        raise HTTPException(404, "Source not found")
+    return {"id": source_id, "due": True}
+
 @app.post("/discover")
 async def discover(payload: DiscoverIn):
     instructions = payload.instructions or (
@@ -124,77 +229,73 @@ async def discover(payload: DiscoverIn):
         "Prefer primary sources (official reports, PDFs, investor letters). "
         "Include URLs."
     )
-    r = websearch.search(payload.query, instructions=instructions, web_search_options=payload.web_search_options)
+    r = await websearch.search(payload.query, instructions=instructions, web_search_options=payload.web_search_options)
     # NOTE: parsing URLs from the answer is intentionally left to a follow-up step
     # (you'll likely want a structured extraction pass + dedupe logic).
     return {"answer_markdown": r.answer_markdown, "raw": r.raw_response}
 
 # Crawl a URL via Crawl4AI Docker container; store doc + chunks + embeddings.
+# ?background=true enqueues a job instead and returns 202 {job_id}; poll GET /jobs/{job_id}.
 @app.post("/crawl")
-async def crawl(payload: CrawlIn, session: AsyncSession = Depends(get_session)):
-    await session.execute(text("""
-      INSERT INTO crawl_runs(source_id, url, status)
-      VALUES (:sid, :url, 'started')
-    """), {"sid": payload.source_id, "url": str(payload.url)})
-    await session.commit()
-
+async def crawl(payload: CrawlIn, background: bool = False, session: AsyncSession = Depends(get_session)):
+    if background:
+        job_id = await enqueue("crawl", {"url": str(payload.url), "source_id": payload.source_id})
+        return JSONResponse({"job_id": job_id, "status": "queued"}, status_code=202)
     try:
-        data = await crawl_url(str(payload.url))
-    except httpx.HTTPStatusError as e:
-        err_msg = str(e.response.status_code) + " " + (e.response.reason_phrase or "")
-        if e.response.status_code == 403:
-            err_msg = "PDF URL returned 403 Forbidden; host may require a browser. Try a public PDF (e.g. https://arxiv.org/pdf/2310.06825.pdf) to validate."
-        await session.execute(text("""
-          INSERT INTO crawl_runs(source_id, url, status, error)
-          VALUES (:sid, :url, 'failed', :err)
-        """), {"sid": payload.source_id, "url": str(payload.url), "err": err_msg})
-        await session.commit()
-        raise HTTPException(400, err_msg)
-    if not data["markdown"]:
-        await session.execute(text("""
-          INSERT INTO crawl_runs(source_id, url, status, error)
-          VALUES (:sid, :url, 'failed', :err)
-        """), {"sid": payload.source_id, "url": data["url"], "err": "No content extracted"})
-        await session.commit()
-        raise HTTPException(400, "No content extracted.")
+        return await ingest_url(session, str(payload.url), payload.source_id)
+    except IngestError as e:
+        raise HTTPException(400, str(e))
 
-    ins_doc = text("""
-      INSERT INTO documents(source_id, url, title, content_markdown, content_hash)
-      VALUES (:sid, :url, :title, :md, :h)
-      ON CONFLICT (url, content_hash) DO NOTHING
-      RETURNING id
-    """)
-    doc_id = (await session.execute(ins_doc, {
-        "sid": payload.source_id,
-        "url": data["url"],
-        "title": data["title"],
-        "md": data["markdown"],
-        "h": data["content_hash"],
-    })).scalar_one_or_none()
-
-    if doc_id is None:
-        doc_id = (await session.execute(
-            text("SELECT id FROM documents WHERE url=:url AND content_hash=:h ORDER BY id DESC LIMIT 1"),
-            {"url": data["url"], "h": data["content_hash"]}
-        )).scalar_one()
-
-    chunks = chunk_text(data["markdown"])
-    vectors = await embed_texts(chunks)
-
-    for idx, (ch, vec) in enumerate(zip(chunks, vectors)):
-        vec_literal = "[" + ",".join(str(x) for x in vec) + "]"
-        await session.execute(text("""
-          INSERT INTO chunks(document_id, url, chunk_index, content, embedding)
-          VALUES (:did, :url, :i, :c, CAST(:e AS vector))
-          ON CONFLICT (document_id, chunk_index) DO NOTHING
-        """), {"did": doc_id, "url": data["url"], "i": idx, "c": ch, "e": vec_literal})
+# Crawl many URLs with bounded concurrency + per-host politeness; streams NDJSON progress lines, then a summary.
+@app.post("/crawl/batch")
+async def crawl_batch_endpoint(payload: CrawlBatchIn):
+    import json
+    if len(payload.urls) > settings.crawl_batch_max_urls:
+        raise HTTPException(400, f"At most {settings.crawl_batch_max_urls} URLs per batch.")
 
-    await session.execute(text("""
-      INSERT INTO crawl_runs(source_id, url, status)
-      VALUES (:sid, :url, 'success')
-    """), {"sid": payload.source_id, "url": data["url"]})
-    await session.commit()
-    return {"document_id": doc_id, "chunks": len(chunks)}
+    async def lines():
+        yield json.dumps({"event": "accepted", "total": len(set(map(str, payload.urls)))}) + "\n"
+        async for r in crawl_batch([str(u) for u in payload.urls], payload.source_id):
+            yield json.dumps(r) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for endpoints that keep reading the request body while responding. The base class
+    watches for disconnects by consuming receive(), which would swallow body chunks; here the body
+    reader sees the disconnect instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+# Bulk ingestion of local files: NDJSON lines ({"url", "title"?, "markdown" | "pdf_base64"}) or multipart file
+# parts (PDF / markdown; URL = url_prefix + filename unless a "url" field precedes the file). Documents are
+# ingested while the body is still uploading; NDJSON results stream back as each finishes, then a summary.
+@app.post("/ingest/upload")
+async def ingest_upload(request: Request, source_id: int | None = None, url_prefix: str = "upload://"):
+    import json
+    content_type = request.headers.get("content-type", "")
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == "multipart/form-data":
+        try:
+            multipart_boundary(content_type)
+        except UploadError as e:
+            raise HTTPException(400, str(e))
+        docs = iter_multipart(request.stream(), content_type, url_prefix)
+    elif media_type in ("application/x-ndjson", "application/jsonl", "application/json-lines"):
+        docs = iter_ndjson(request.stream(), url_prefix)
+    else:
+        raise HTTPException(415, "Send multipart/form-data or application/x-ndjson.")
+
+    async def lines():
+        async for r in ingest_uploads(docs, source_id):
+            yield json.dumps(r) + "\n"
+
+    return _DuplexStreamingResponse(lines(), media_type="application/x-ndjson")
 
 # Test OpenAI web search with newsletter prompt (default) or custom query/instructions.
 @app.post("/test-websearch")
@@ -210,7 +311,7 @@ async def test_websearch(payload: TestWebSearchIn | None = Body(None)):
             "style, format, and level of detail as the previous reports. Include MSCI ACWI and "
             "S&P 500 returns and key narrative points."
         )
-    r = websearch.search(query, instructions=instructions)
+    r = await websearch.search(query, instructions=instructions)
     return {"answer_markdown": r.answer_markdown, "raw": r.raw_response}
 
 # Same as /test-websearch but accepts form data so multi-line query/instructions work without JSON escaping.
@@ -233,32 +334,135 @@ async def test_websearch_form(
             "style, format, and level of detail as the previous reports. Include MSCI ACWI and "
             "S&P 500 returns and key narrative points."
         )
-    r = websearch.search(q, instructions=inst)
+    r = await websearch.search(q, instructions=inst)
     return {"answer_markdown": r.answer_markdown, "raw": r.raw_response}
 
 @app.post("/query")
 async def query(payload: QueryIn, session: AsyncSession = Depends(get_session)):
-    qvec = (await embed_texts([payload.query]))[0]
-    rows = await similarity_search(session, qvec, limit=payload.top_k)
+    filters = payload.filters.to_filters() if payload.filters else None
+    rows = await search_chunks(session, payload.query, limit=payload.top_k, mode=payload.mode, filters=filters)
     return {"matches": rows}
 
 @app.post("/report")
 async def report(payload: ReportIn, session: AsyncSession = Depends(get_session)):
-    qvec = (await embed_texts([payload.query]))[0]
-    matches = await similarity_search(session, qvec, limit=payload.top_k)
-    md = build_quarterly_report_markdown(payload.quarter_label, matches)
-    return {"report_markdown": md, "sources_used": list({m["url"] for m in matches})}
+    filters = payload.filters.to_filters() if payload.filters else None
+    matches = await search_chunks(session, payload.query, limit=payload.top_k, mode=payload.mode, filters=filters)
+    context: dict = {}
+    md = await build_quarterly_report_markdown(payload.quarter_label, matches, context)
+    return {"report_markdown": md, "sources_used": list({m["url"] for m in matches}), "context": context}
+
+
+def _sse(event: dict) -> str:
+    """One Server-Sent Event: `event` names it, the rest is the JSON data line."""
+    import json
+    name = event.get("event", "message")
+    data = {k: v for k, v in event.items() if k != "event"}
+    return f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _sse_response(events) -> StreamingResponse:
+    async def body():
+        try:
+            async for e in events:
+                yield _sse(e)
+        except Exception as e:
+            # Headers are already sent; report the failure in-band.
+            yield _sse({"event": "error", "detail": f"{type(e).__name__}: {e}"})
+
+    # X-Accel-Buffering: stop nginx-style proxies from buffering the stream.
+    return StreamingResponse(body(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+@app.post("/report/stream")
+async def report_stream(payload: ReportIn):
+    """SSE variant of /report: `sources`, then `delta` events ({"text"}), then `done` with report_markdown."""
+    async def events():
+        async with SessionLocal() as session:
+            filters = payload.filters.to_filters() if payload.filters else None
+            matches = await search_chunks(session, payload.query, limit=payload.top_k, mode=payload.mode, filters=filters)
+        sources = list({m["url"] for m in matches})
+        yield {"event": "sources", "sources_used": sources}
+        parts = []
+        context: dict = {}
+        async for delta in stream_quarterly_report_markdown(payload.quarter_label, matches, context):
+            parts.append(delta)
+            yield {"event": "delta", "text": delta}
+        yield {"event": "done", "report_markdown": "".join(parts), "sources_used": sources, "context": context}
+
+    return _sse_response(events())
 
 
 # --- Newsletter templates and runs ---
 
+# List/detail projections: ?fields=a,b (or "all"); lists default to the summary columns and page by keyset
+# (?cursor= from the previous page's next_cursor). See app/paging.py.
+TEMPLATE_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "use_web_search": "use_web_search",
+    "source_url_count": "jsonb_array_length(source_urls)",
+    "created_at": "created_at",
+    "system_prompt": "system_prompt",
+    "source_urls": "source_urls",
+    "example_content": "example_content",
+}
+TEMPLATE_SUMMARY = ["name", "use_web_search", "source_url_count", "created_at"]
+
+RUN_LIST_FIELDS = {
+    "id": "id",
+    "template_id": "template_id",
+    "label": "label",
+    "has_report": "report_markdown IS NOT NULL",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "prompt_override": "prompt_override",
+    "extra_source_urls": "extra_source_urls",
+    "rag_filters": "rag_filters",
+    "feedback": "feedback",
+}
+RUN_SUMMARY = ["template_id", "label", "has_report", "created_at", "updated_at"]
+
+RUN_FIELDS = {
+    "id": "r.id",
+    "template_id": "r.template_id",
+    "label": "r.label",
+    "prompt_override": "r.prompt_override",
+    "extra_source_urls": "r.extra_source_urls",
+    "rag_filters": "r.rag_filters",
+    "feedback": "r.feedback",
+    "report_markdown": "r.report_markdown",
+    "created_at": "r.created_at",
+    "updated_at": "r.updated_at",
+    "template_name": "t.name",
+    "system_prompt": "t.system_prompt",
+    "example_content": "t.example_content",
+    "use_web_search": "t.use_web_search",
+}
+
+
 @app.get("/newsletter-templates")
-async def list_newsletter_templates(session: AsyncSession = Depends(get_session)):
-    rows = (await session.execute(text("""
-        SELECT id, name, system_prompt, source_urls, example_content, use_web_search, created_at
-        FROM newsletter_templates ORDER BY created_at DESC
-    """))).mappings().all()
-    return {"templates": [dict(r) for r in rows]}
+async def list_newsletter_templates(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    fields: str | None = None,
+    session: AsyncSession = Depends(get_session),
+):
+    columns = paging.select_list(fields, TEMPLATE_FIELDS, TEMPLATE_SUMMARY, always=("id", "created_at"))
+    where, params = "", {"limit": limit + 1}
+    if cursor:
+        params["c_at"], params["c_id"] = paging.decode_cursor(cursor)
+        where = "WHERE (created_at, id) < (:c_at, :c_id)"
+    rows = (await session.execute(text(f"""
+        SELECT {columns}
+        FROM newsletter_templates {where}
+        ORDER BY created_at DESC, id DESC LIMIT :limit
+    """), params)).mappings().all()
+    templates, next_cursor = paging.page([dict(r) for r in rows], limit, "created_at")
+    return paging.etag_json(request, {"templates": templates, "next_cursor": next_cursor})
 
 
 @app.post("/newsletter-templates")
@@ -323,12 +527,26 @@ async def delete_newsletter_template(template_id: int, session: AsyncSession = D
 
 
 @app.get("/newsletter-templates/{template_id}/runs")
-async def list_newsletter_runs(template_id: int, session: AsyncSession = Depends(get_session)):
-    rows = (await session.execute(text("""
-        SELECT id, template_id, label, prompt_override, extra_source_urls, feedback, report_markdown IS NOT NULL AS has_report, created_at, updated_at
-        FROM newsletter_runs WHERE template_id = :tid ORDER BY updated_at DESC
-    """), {"tid": template_id})).mappings().all()
-    return {"runs": [dict(r) for r in rows]}
+async def list_newsletter_runs(
+    template_id: int,
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    fields: str | None = None,
+    session: AsyncSession = Depends(get_session),
+):
+    columns = paging.select_list(fields, RUN_LIST_FIELDS, RUN_SUMMARY, always=("id", "updated_at"))
+    where, params = "template_id = :tid", {"tid": template_id, "limit": limit + 1}
+    if cursor:
+        params["c_at"], params["c_id"] = paging.decode_cursor(cursor)
+        where += " AND (updated_at, id) < (:c_at, :c_id)"
+    rows = (await session.execute(text(f"""
+        SELECT {columns}
+        FROM newsletter_runs WHERE {where}
+        ORDER BY updated_at DESC, id DESC LIMIT :limit
+    """), params)).mappings().all()
+    runs, next_cursor = paging.page([dict(r) for r in rows], limit, "updated_at")
+    return paging.etag_json(request, {"runs": runs, "next_cursor": next_cursor})
 
 
 @app.post("/newsletter-templates/{template_id}/runs")
@@ -339,25 +557,25 @@ async def create_newsletter_run(template_id: int, payload: NewsletterRunIn, sess
     if not t:
         raise HTTPException(404, "Template not found")
     q = text("""
-        INSERT INTO newsletter_runs(template_id, label, prompt_override, extra_source_urls)
-        VALUES (:tid, :label, :prompt_override, :extra_source_urls)
-        RETURNING id, template_id, label, prompt_override, extra_source_urls, created_at, updated_at
+        INSERT INTO newsletter_runs(template_id, label, prompt_override, extra_source_urls, rag_filters)
+        VALUES (:tid, :label, :prompt_override, :extra_source_urls, :rag_filters)
+        RETURNING id, template_id, label, prompt_override, extra_source_urls, rag_filters, created_at, updated_at
     """)
     row = (await session.execute(q, {
         "tid": template_id,
         "label": payload.label,
         "prompt_override": payload.prompt_override,
         "extra_source_urls": json.dumps(payload.extra_source_urls),
+        "rag_filters": payload.rag_filters.model_dump_json(exclude_none=True) if payload.rag_filters else "{}",
     })).mappings().one()
     await session.commit()
     return dict(row)
 
 
-@app.get("/newsletter-runs/{run_id}")
-async def get_newsletter_run(run_id: int, session: AsyncSession = Depends(get_session)):
-    row = (await session.execute(text("""
-        SELECT r.id, r.template_id, r.label, r.prompt_override, r.extra_source_urls, r.feedback, r.report_markdown, r.created_at, r.updated_at,
-               t.name AS template_name, t.system_prompt, t.example_content, t.use_web_search
+async def _fetch_newsletter_run(session: AsyncSession, run_id: int, fields: str | None = None) -> dict:
+    columns = paging.select_list(fields or "all", RUN_FIELDS, [])
+    row = (await session.execute(text(f"""
+        SELECT {columns}
         FROM newsletter_runs r
         JOIN newsletter_templates t ON t.id = r.template_id
         WHERE r.id = :id
@@ -367,6 +585,11 @@ async def get_newsletter_run(run_id: int, session: AsyncSession = Depends(get_se
     return dict(row)
 
 
+@app.get("/newsletter-runs/{run_id}")
+async def get_newsletter_run(run_id: int, request: Request, fields: str | None = None, session: AsyncSession = Depends(get_session)):
+    return paging.etag_json(request, await _fetch_newsletter_run(session, run_id, fields))
+
+
 @app.put("/newsletter-runs/{run_id}")
 async def update_newsletter_run(run_id: int, payload: NewsletterRunUpdate, session: AsyncSession = Depends(get_session)):
     import json
@@ -387,11 +610,14 @@ async def update_newsletter_run(run_id: int, payload: NewsletterRunUpdate, sessi
     if payload.feedback is not None:
         updates.append("feedback = :feedback")
         params["feedback"] = payload.feedback
+    if payload.rag_filters is not None:
+        updates.append("rag_filters = :rag_filters")
+        params["rag_filters"] = payload.rag_filters.model_dump_json(exclude_none=True)
     if updates:
         updates.append("updated_at = NOW()")
         await session.execute(text(f"UPDATE newsletter_runs SET {', '.join(updates)} WHERE id = :id"), params)
         await session.commit()
-    return await get_newsletter_run(run_id, session)
+    return await _fetch_newsletter_run(session, run_id)
 
 
 @app.delete("/newsletter-runs/{run_id}")
@@ -404,60 +630,62 @@ async def delete_newsletter_run(run_id: int, session: AsyncSession = Depends(get
 
 
 @app.post("/newsletter-runs/{run_id}/generate")
-async def generate_newsletter_run(run_id: int, session: AsyncSession = Depends(get_session)):
-    """Optionally crawl extra_source_urls, then build newsletter from template + RAG + optional web search."""
-    import json
-    row = (await session.execute(text("""
-        SELECT r.id, r.template_id, r.label, r.prompt_override, r.extra_source_urls, r.feedback,
-               t.system_prompt, t.example_content, t.use_web_search
-        FROM newsletter_runs r
-        JOIN newsletter_templates t ON t.id = r.template_id
-        WHERE r.id = :id
-    """), {"id": run_id})).mappings().first()
-    if not row:
+async def generate_newsletter_run(run_id: int, background: bool = False, force: bool = False, session: AsyncSession = Depends(get_session)):
+    """Optionally crawl extra_source_urls, then build newsletter from template + RAG + optional web search.
+    Stages whose inputs are unchanged since the last generate are reused; ?force=true recomputes them all.
+    ?background=true enqueues a job and returns 202 {job_id}; poll GET /jobs/{job_id}."""
+    if background:
+        exists = (await session.execute(text("SELECT id FROM newsletter_runs WHERE id = :id"), {"id": run_id})).scalar_one_or_none()
+        if not exists:
+            raise HTTPException(404, "Run not found")
+        job_id = await enqueue("newsletter_generate", {"run_id": run_id, "force": force})
+        return JSONResponse({"job_id": job_id, "status": "queued"}, status_code=202)
+    try:
+        return await run_newsletter_generation(session, run_id, force=force)
+    except RunNotFound:
         raise HTTPException(404, "Run not found")
-    extra_urls = json.loads(row["extra_source_urls"]) if isinstance(row["extra_source_urls"], str) else (row["extra_source_urls"] or [])
-    # Crawl any extra URLs so they enter RAG (source_id=None)
-    for url in extra_urls:
-        if not url or not str(url).strip().startswith(("http://", "https://")):
-            continue
-        try:
-            data = await crawl_url(str(url).strip())
-            if data.get("markdown"):
-                doc_id = (await session.execute(text("""
-                    INSERT INTO documents(source_id, url, title, content_markdown, content_hash)
-                    VALUES (NULL, :url, :title, :md, :h)
-                    ON CONFLICT (url, content_hash) DO NOTHING RETURNING id
-                """), {"url": data["url"], "title": data["title"], "md": data["markdown"], "h": data["content_hash"]})).scalar_one_or_none()
-                if doc_id is None:
-                    doc_id = (await session.execute(
-                        text("SELECT id FROM documents WHERE url=:url AND content_hash=:h ORDER BY id DESC LIMIT 1"),
-                        {"url": data["url"], "h": data["content_hash"]}
-                    )).scalar_one()
-                chunks = chunk_text(data["markdown"])
-                vectors = await embed_texts(chunks)
-                for idx, (ch, vec) in enumerate(zip(chunks, vectors)):
-                    vec_literal = "[" + ",".join(str(x) for x in vec) + "]"
-                    await session.execute(text("""
-                        INSERT INTO chunks(document_id, url, chunk_index, content, embedding)
-                        VALUES (:did, :url, :i, :c, CAST(:e AS vector))
-                        ON CONFLICT (document_id, chunk_index) DO NOTHING
-                    """), {"did": doc_id, "url": data["url"], "i": idx, "c": ch, "e": vec_literal})
-        except Exception:
-            pass  # continue with other URLs and RAG
-    await session.commit()
 
-    md = await build_newsletter_markdown(
-        session,
-        system_prompt=row["system_prompt"],
-        example_content=row.get("example_content"),
-        run_label=row["label"],
-        prompt_override=row.get("prompt_override"),
-        feedback=row.get("feedback"),
-        use_web_search=row["use_web_search"],
-    )
-    await session.execute(text("""
-        UPDATE newsletter_runs SET report_markdown = :md, updated_at = NOW() WHERE id = :id
-    """), {"md": md, "id": run_id})
-    await session.commit()
-    return {"report_markdown": md}
+
+@app.post("/newsletter-runs/{run_id}/generate/stream")
+async def generate_newsletter_run_stream(run_id: int, force: bool = False):
+    """SSE variant of generate: `stage` events, `delta` events ({"text"}), then `done` once report_markdown
+    is saved. A client disconnect cancels generation and leaves the stored report unchanged."""
+    # Sessions are opened here rather than injected so no connection is held for the length of the stream.
+    async with SessionLocal() as session:
+        exists = (await session.execute(text("SELECT id FROM newsletter_runs WHERE id = :id"), {"id": run_id})).scalar_one_or_none()
+    if not exists:
+        raise HTTPException(404, "Run not found")
+
+    async def events():
+        async with SessionLocal() as session:
+            try:
+                async for e in stream_newsletter_run(session, run_id, force=force):
+                    yield e
+            except RunNotFound:
+                # Deleted between the check above and the start of generation.
+                yield {"event": "error", "detail": "Run not found"}
+
+    return _sse_response(events())
+
+
+# --- Background jobs ---
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: int):
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+# --- Maintenance ---
+
+# Delete chunks/embeddings (and optionally rows) of document versions superseded more than `days` ago.
+# ?background=true enqueues a "retention" job instead and returns 202 {job_id}; poll GET /jobs/{job_id}.
+@app.post("/retention/run")
+async def retention_run(payload: RetentionIn | None = Body(None), background: bool = False):
+    payload = payload or RetentionIn()
+    if background:
+        job_id = await enqueue("retention", payload.model_dump())
+        return JSONResponse({"job_id": job_id, "status": "queued"}, status_code=202)
+    return await run_retention(days=payload.days, delete_documents=payload.delete_documents, dry_run=payload.dry_run)
@@ -0,0 +1,156 @@
+# app/metrics.py — Prometheus metrics (GET /metrics) and optional OpenTelemetry spans per pipeline stage.
+# stage("crawl") around a block (or @timed("crawl") on a coroutine function) records its latency in
+# scraper_stage_seconds{stage,outcome}, tracks scraper_stage_in_flight{stage} and, with OTEL_ENABLED and
+# opentelemetry-api installed, opens a span. Label children are resolved once per stage, so the hot-path
+# cost is a perf_counter pair, a gauge inc/dec and one histogram observe.
+import asyncio
+import functools
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+
+from .settings import settings
+
+try:
+    from opentelemetry import trace as _otel_trace
+except ImportError:  # tracing is optional
+    _otel_trace = None
+
+# Seconds; stages range from cached search (ms) to PDF extraction and model calls (minutes).
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+STAGE_SECONDS = Histogram(
+    "scraper_stage_seconds", "Pipeline stage latency", ["stage", "outcome"], buckets=_BUCKETS,
+)
+STAGE_IN_FLIGHT = Gauge("scraper_stage_in_flight", "Pipeline stage calls in progress", ["stage"])
+OPENAI_TOKENS = Counter(
+    "scraper_openai_tokens", "OpenAI tokens reported in response usage", ["operation", "model", "type"],
+)
+OPENAI_RETRIES = Counter("scraper_openai_retries", "OpenAI requests retried after 429/5xx", ["operation"])
+OPENAI_COALESCED = Counter(
+    "scraper_openai_coalesced", "OpenAI calls answered by an identical request already in flight", ["operation"],
+)
+CRAWL_RESULTS = Counter("scraper_crawl_results", "Crawl outcomes recorded in crawl_runs", ["status"])
+RUN_STAGE_CACHE = Counter(
+    "scraper_newsletter_stage_cache", "Newsletter run stages reused from stored artifacts or recomputed", ["stage", "result"],
+)
+
+_tracer = (
+    _otel_trace.get_tracer("scraper-aggregator")
+    if settings.otel_enabled and _otel_trace is not None else None
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _children(name: str):
+    return (
+        STAGE_IN_FLIGHT.labels(name),
+        STAGE_SECONDS.labels(name, "ok"),
+        STAGE_SECONDS.labels(name, "error"),
+        STAGE_SECONDS.labels(name, "cancelled"),
+    )
+
+
+@contextmanager
+def stage(name: str, **attributes) -> Iterator[None]:
+    """Time the enclosed block as pipeline stage `name`; attributes are only used as span attributes."""
+    in_flight, ok, error, cancelled = _children(name)
+    span = _tracer.start_as_current_span(name, attributes=attributes or None) if _tracer else nullcontext()
+    in_flight.inc()
+    t0 = time.perf_counter()
+    outcome = ok
+    try:
+        with span:
+            yield
+    except (asyncio.CancelledError, GeneratorExit):
+        # GeneratorExit: a streaming consumer stopped early (client disconnected).
+        outcome = cancelled
+        raise
+    except BaseException:
+        outcome = error
+        raise
+    finally:
+        outcome.observe(time.perf_counter() - t0)
+        in_flight.dec()
+
+
+def timed(name: str):
+    """Decorator form of stage() for coroutine functions."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with stage(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_usage(operation: str, model: str, usage) -> None:
+    """Count tokens from an OpenAI usage object (Responses: input/output; embeddings: prompt)."""
+    if usage is None:
+        return
+    for attr, kind in (("input_tokens", "input"), ("prompt_tokens", "input"), ("output_tokens", "output")):
+        n = getattr(usage, attr, None)
+        if n:
+            OPENAI_TOKENS.labels(operation, model, kind).inc(n)
+    cached = getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", None)
+    if cached:
+        OPENAI_TOKENS.labels(operation, model, "cached_input").inc(cached)
+    reasoning = getattr(getattr(usage, "output_tokens_details", None), "reasoning_tokens", None)
+    if reasoning:
+        OPENAI_TOKENS.labels(operation, model, "reasoning").inc(reasoning)
+
+
+def count_retry(operation: str) -> None:
+    OPENAI_RETRIES.labels(operation).inc()
+
+
+def count_coalesced(operation: str) -> None:
+    OPENAI_COALESCED.labels(operation).inc()
+
+
+def count_crawl(status: str) -> None:
+    CRAWL_RESULTS.labels(status).inc()
+
+
+def count_stage_cache(stage_name: str, result: str) -> None:
+    RUN_STAGE_CACHE.labels(stage_name, result).inc()
+
+
+class _CacheCollector:
+    """Embedding and query cache counters, read from the caches' own stats() at scrape time."""
+
+    def describe(self):
+        # Skips the registration-time collect(), which would import the caches during app startup.
+        return []
+
+    def collect(self):
+        # Imported here: both modules import embeddings, which imports this module.
+        from . import embed_cache, query_cache
+
+        emb = embed_cache.stats()
+        lookups = CounterMetricFamily("scraper_embed_cache_lookups", "Embedding cache lookups", labels=["result"])
+        for result in ("memory_hits", "db_hits", "misses"):
+            lookups.add_metric([result], emb.get(result, 0))
+        yield lookups
+
+        q = query_cache.stats()
+        for name, s in (("query_embeddings", q["query_embeddings"]), ("query_results", q["results"])):
+            c = CounterMetricFamily(f"scraper_{name}_cache_lookups", f"{name} cache lookups", labels=["result"])
+            c.add_metric(["hit"], s["hits"])
+            c.add_metric(["miss"], s["misses"])
+            yield c
+            size = GaugeMetricFamily(f"scraper_{name}_cache_entries", f"{name} cache entries")
+            size.add_metric([], s["size"])
+            yield size
+
+
+REGISTRY.register(_CacheCollector())
+
+
+def render() -> bytes:
+    """Text exposition of the default registry, for GET /metrics."""
+    return generate_latest()
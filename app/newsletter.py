@@ -1,50 +1,80 @@
 # app/newsletter.py — newsletter generation: template system prompt + RAG + optional web search.
-from openai import OpenAI
+# Stages overlap: the web search starts immediately, extra URLs are ingested concurrently while it runs,
+# then retrieval, and the final model call waits for both. Per-stage timings are returned with the result.
+# stream_newsletter_run is the streaming variant (SSE endpoint): stage events, then output text deltas.
+# Runs regenerate incrementally: each stage's output is stored per run (run_artifacts.py) and reused while its
+# inputs are unchanged, so a feedback edit re-runs only prompt assembly and the model call; force=True redoes all.
+import asyncio
+import json
+import logging
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
 
+from sqlalchemy import text
+
+from . import metrics, openai_gateway, query_cache, run_artifacts
 from .settings import settings
-from .embeddings import embed_texts
-from .search import similarity_search
+from .context import build_context
+from .search import SearchFilters, search_chunks
+from .pipeline import crawl_batch
 from .openai_websearch import OpenAIWebSearchClient
 
-_client = OpenAI(api_key=settings.openai_api_key)
+log = logging.getLogger(__name__)
+
 _websearch = OpenAIWebSearchClient()
 
+RAG_TOP_K = 25
 
-async def build_newsletter_markdown(
-    session,
+
+class RunNotFound(LookupError):
+    """The newsletter run doesn't exist (404). Distinct from KeyError/IndexError bugs, which are LookupErrors too."""
+
+
+async def _timed(timings: dict | None, stage: str, aw: Awaitable):
+    t0 = time.perf_counter()
+    try:
+        return await aw
+    finally:
+        if timings is not None:
+            timings[stage] = round((time.perf_counter() - t0) * 1000)
+
+
+async def _generate(system: str, user_prompt: str) -> str:
+    resp = await openai_gateway.create_response(
+        "newsletter",
+        model=settings.openai_model,
+        instructions=system,
+        input=user_prompt,
+    )
+    return getattr(resp, "output_text", "") or ""
+
+
+def _rag_query(run_label: str) -> str:
+    return f"quarterly market review {run_label}"
+
+
+def _web_search_args(run_label: str) -> tuple[str, str]:
+    """(query, instructions) of the run's web search."""
+    return (
+        f"Q4 2025 and Q1 2026 market commentary, equities, fixed income, {run_label}",
+        "Find recent quarterly market commentary and key metrics (index returns, Fed, etc.). "
+        "Be concise; prefer primary sources.",
+    )
+
+
+def assemble_newsletter_prompt(
     *,
     system_prompt: str,
     example_content: str | None,
     run_label: str,
-    prompt_override: str | None = None,
-    feedback: str | None = None,
-    rag_top_k: int = 25,
-    rag_query: str | None = None,
-    use_web_search: bool = True,
-    web_search_query: str | None = None,
-    web_search_instructions: str | None = None,
-) -> str:
-    """
-    Build newsletter body: system_prompt (+ prompt_override) + example + RAG context + optional web search.
-    """
-    query_embed = rag_query or f"quarterly market review {run_label}"
-    qvec = (await embed_texts([query_embed]))[0]
-    matches = await similarity_search(session, qvec, limit=rag_top_k)
-    rag_context = "\n\n".join(
-        f"- URL: {m['url']}\n  score: {m.get('score', '')}\n  excerpt: {m['content']}"
-        for m in matches
-    )
-
-    web_md = ""
-    if use_web_search:
-        q = web_search_query or f"Q4 2025 and Q1 2026 market commentary, equities, fixed income, {run_label}"
-        inst = web_search_instructions or (
-            "Find recent quarterly market commentary and key metrics (index returns, Fed, etc.). "
-            "Be concise; prefer primary sources."
-        )
-        r = _websearch.search(q, instructions=inst)
-        web_md = (r.answer_markdown or "").strip()
-
+    prompt_override: str | None,
+    feedback: str | None,
+    rag_context: str,
+    web_md: str,
+) -> tuple[str, str]:
+    """(instructions, input) from the template, run fields and the packed context."""
     user_prompt = f"Create a newsletter for: **{run_label}**.\n\n"
     if prompt_override and prompt_override.strip():
         user_prompt += f"Additional instructions for this run:\n{prompt_override.strip()}\n\n"
@@ -65,9 +95,245 @@ async def build_newsletter_markdown(
         system += example_content.strip()
         system += "\n--- END EXAMPLE ---"
 
-    resp = _client.responses.create(
-        model=settings.openai_model,
-        instructions=system,
-        input=user_prompt,
+    return system, user_prompt
+
+
+@dataclass
+class _Prepared:
+    system: str
+    user_prompt: str
+    fingerprint: str  # of the prompt (and generation model)
+    report: str | None  # stored report generated from this same prompt, reused unless force
+    meta: dict  # {"extra_urls": ingest counts, "context": context packing stats, "cache": stage -> hit/partial/miss}
+
+
+def _crawl_reusable(entry: dict | None, now: float) -> bool:
+    return entry is not None and entry["status"] != "failed" and now - entry["at"] < settings.newsletter_stage_ttl
+
+
+async def _prepare_run(
+    session,
+    run_id: int,
+    report: Callable[..., Awaitable[None]],
+    timings: dict,
+    force: bool = False,
+) -> _Prepared:
+    """
+    Load the run, crawl its extra_source_urls and build the prompt, reusing the run's stored stage
+    artifacts whose inputs are unchanged (none with force) and storing the ones recomputed.
+    Raises RunNotFound if the run doesn't exist.
+    """
+    row = (await session.execute(text("""
+        SELECT r.id, r.template_id, r.label, r.prompt_override, r.extra_source_urls, r.feedback, r.rag_filters,
+               r.report_markdown, t.system_prompt, t.example_content, t.use_web_search, t.source_urls
+        FROM newsletter_runs r
+        JOIN newsletter_templates t ON t.id = r.template_id
+        WHERE r.id = :id
+    """), {"id": run_id})).mappings().first()
+    if not row:
+        raise RunNotFound("Run not found")
+    extra_urls = json.loads(row["extra_source_urls"]) if isinstance(row["extra_source_urls"], str) else (row["extra_source_urls"] or [])
+    extra_urls = [str(u).strip() for u in extra_urls if u and str(u).strip().startswith(("http://", "https://"))]
+    extra_urls = list(dict.fromkeys(extra_urls))
+    artifacts = {} if force else await run_artifacts.load(session, run_id)
+    # Don't hold this session's connection idle while crawling; extra URLs use their own sessions.
+    await session.commit()
+
+    rag_filters = json.loads(row["rag_filters"]) if isinstance(row["rag_filters"], str) else dict(row["rag_filters"] or {})
+    if rag_filters.pop("template_sources_only", False):
+        template_urls = json.loads(row["source_urls"]) if isinstance(row["source_urls"], str) else (row["source_urls"] or [])
+        rag_filters["url_prefixes"] = (rag_filters.get("url_prefixes") or []) + [str(u).strip() for u in template_urls if u] + extra_urls
+    filters = SearchFilters.from_dict(rag_filters)
+
+    cache: dict[str, str] = {}
+
+    def note(stage: str, result: str) -> None:
+        cache[stage] = result
+        metrics.count_stage_cache(stage, result)
+
+    # The web search doesn't depend on the corpus: start it now so it overlaps ingestion and retrieval.
+    web_args = _web_search_args(row["label"])
+    web_fp = run_artifacts.fingerprint(settings.openai_model, *web_args)
+    web_cached = None
+    web_task = None
+    if row["use_web_search"]:
+        web_cached = run_artifacts.fresh(artifacts.get("web_search"), web_fp, settings.newsletter_stage_ttl)
+        note("web_search", "hit" if web_cached is not None else "miss")
+        if web_cached is None:
+            web_task = asyncio.create_task(_timed(timings, "web_search_ms", _websearch.search(web_args[0], instructions=web_args[1])))
+    try:
+        # Extra URLs are crawled concurrently (crawl_batch limits) so they enter RAG (source_id=None).
+        # URLs crawled for this run within NEWSLETTER_STAGE_TTL are skipped; failed ones are retried.
+        # Unchanged URLs (304 / same content hash) cost one conditional request, no re-embedding.
+        ingest = {"succeeded": 0, "unchanged": 0, "failed": 0, "cached": 0}
+        if extra_urls:
+            crawled = dict(((artifacts.get("crawl") or {}).get("data") or {}).get("urls") or {})
+            now = time.time()
+            stale = [u for u in extra_urls if not _crawl_reusable(crawled.get(u), now)]
+            ingest["cached"] = len(extra_urls) - len(stale)
+            note("crawl", "miss" if len(stale) == len(extra_urls) else "partial" if stale else "hit")
+            if stale:
+                t0 = time.perf_counter()
+                done = 0
+                await report(stage="crawl", done=0, total=len(stale))
+                # aclosing: if we're cancelled mid-batch, crawl_batch cancels its in-flight URLs right away.
+                async with aclosing(crawl_batch(stale)) as results:
+                    async for r in results:
+                        if r["event"] == "summary":
+                            ingest.update({k: r[k] for k in ("succeeded", "unchanged", "failed")})
+                            continue
+                        done += 1
+                        crawled[r["url"]] = {"status": r["status"], "document_id": r.get("document_id"), "at": now}
+                        await report(stage="crawl", done=done, total=len(stale), url=r["url"], status=r["status"])
+                timings["ingest_ms"] = round((time.perf_counter() - t0) * 1000)
+            crawl_fp = run_artifacts.fingerprint(extra_urls)
+            if stale or (artifacts.get("crawl") or {}).get("fingerprint") != crawl_fp:
+                await run_artifacts.save(session, run_id, "crawl", crawl_fp, {
+                    "urls": {u: crawled[u] for u in extra_urls if u in crawled},
+                })
+
+        # Retrieval depends on the corpus too: any ingest (this run's or another) bumps the generation.
+        await report(stage="retrieve")
+        rag_query = _rag_query(row["label"])
+        retrieval_fp = run_artifacts.fingerprint(
+            settings.openai_embed_model, await query_cache.corpus_generation(session),
+            settings.search_mode, rag_query, RAG_TOP_K, repr(filters),
+        )
+        matches = None
+        hit = run_artifacts.fresh(artifacts.get("retrieval"), retrieval_fp)
+        if hit is not None:
+            matches = await run_artifacts.load_matches(session, hit["matches"])
+        note("retrieval", "hit" if matches is not None else "miss")
+        if matches is None:
+            matches = await _timed(timings, "retrieval_ms", search_chunks(session, rag_query, limit=RAG_TOP_K, filters=filters))
+            await run_artifacts.save(session, run_id, "retrieval", retrieval_fp, {
+                "matches": [{"id": m["id"], "score": m.get("score")} for m in matches],
+            })
+
+        web_md = ""
+        if web_cached is not None:
+            web_md = web_cached["answer_markdown"]
+        elif web_task is not None:
+            result = await web_task
+            web_md = (result.answer_markdown or "").strip()
+            await run_artifacts.save(session, run_id, "web_search", web_fp, {
+                "query": web_args[0],
+                "instructions": web_args[1],
+                "answer_markdown": web_md,
+                "raw_response": result.raw_response,
+            })
+    finally:
+        if web_task is not None and not web_task.done():
+            web_task.cancel()
+
+    rag_context, context_stats = build_context(matches)
+    system, user_prompt = assemble_newsletter_prompt(
+        system_prompt=row["system_prompt"],
+        example_content=row.get("example_content"),
+        run_label=row["label"],
+        prompt_override=row.get("prompt_override"),
+        feedback=row.get("feedback"),
+        rag_context=rag_context,
+        web_md=web_md,
     )
-    return getattr(resp, "output_text", "") or ""
+    prompt_fp = run_artifacts.fingerprint(settings.openai_model, system, user_prompt)
+    if run_artifacts.fresh(artifacts.get("prompt"), prompt_fp) is None:
+        await run_artifacts.save(session, run_id, "prompt", prompt_fp, {"instructions": system, "input": user_prompt})
+    cached_report = None
+    if row["report_markdown"] is not None and run_artifacts.fresh(artifacts.get("report"), prompt_fp) is not None:
+        cached_report = row["report_markdown"]
+    note("report", "hit" if cached_report is not None else "miss")
+    # Release the connection for the length of the model call.
+    await session.commit()
+    log.info("newsletter run %s: context %s, cache %s", run_id, context_stats, cache)
+    return _Prepared(system, user_prompt, prompt_fp, cached_report, {"extra_urls": ingest, "context": context_stats, "cache": cache})
+
+
+async def _save_report(session, run_id: int, md: str, prompt_fp: str) -> None:
+    await session.execute(text("""
+        UPDATE newsletter_runs SET report_markdown = :md, updated_at = NOW() WHERE id = :id
+    """), {"md": md, "id": run_id})
+    await run_artifacts.save(session, run_id, "report", prompt_fp, {"model": settings.openai_model, "chars": len(md)})
+    await session.commit()
+
+
+async def generate_newsletter_run(
+    session,
+    run_id: int,
+    *,
+    force: bool = False,
+    progress: Callable[[dict], Awaitable[None]] | None = None,
+) -> dict:
+    """
+    Crawl the run's extra_source_urls, build the newsletter and persist report_markdown.
+    Stages whose inputs are unchanged since the last generate are reused (the model call too, when the
+    prompt is identical); force=True recomputes everything.
+    Shared by POST /newsletter-runs/{id}/generate and the newsletter_generate job.
+    Raises RunNotFound if the run doesn't exist.
+    """
+    async def report(**p):
+        if progress is not None:
+            await progress(p)
+
+    started = time.perf_counter()
+    timings: dict[str, int] = {}
+    prepared = await _prepare_run(session, run_id, report, timings, force)
+    md = prepared.report
+    if md is None:
+        await report(stage="generate")
+        md = await _timed(timings, "generate_ms", _generate(prepared.system, prepared.user_prompt))
+        await _save_report(session, run_id, md, prepared.fingerprint)
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000)
+    return {"report_markdown": md, "timings_ms": timings, **prepared.meta}
+
+
+async def stream_newsletter_run(session, run_id: int, *, force: bool = False) -> AsyncIterator[dict]:
+    """
+    Streaming generate_newsletter_run: yields {"event": "stage", ...} while preparing, {"event": "delta",
+    "text"} per output token batch, then {"event": "done", report_markdown, timings_ms, extra_urls, context, cache}
+    after persisting (no deltas when the stored report is reused). If the consumer stops early (client
+    disconnected), in-flight work is cancelled and no report is persisted. Raises RunNotFound if the run
+    doesn't exist.
+    """
+    started = time.perf_counter()
+    timings: dict[str, int] = {}
+    events: asyncio.Queue[dict] = asyncio.Queue()
+
+    async def report(**p):
+        await events.put({"event": "stage", **p})
+
+    prepare = asyncio.create_task(_prepare_run(session, run_id, report, timings, force))
+    try:
+        # Relay stage events until preparation finishes.
+        while not prepare.done() or not events.empty():
+            get = asyncio.ensure_future(events.get())
+            await asyncio.wait({get, prepare}, return_when=asyncio.FIRST_COMPLETED)
+            if get.done():
+                yield get.result()
+            else:
+                get.cancel()
+        prepared = prepare.result()
+
+        md = prepared.report
+        if md is None:
+            yield {"event": "stage", "stage": "generate"}
+            t0 = time.perf_counter()
+            parts: list[str] = []
+            async for delta in openai_gateway.stream_output_text(
+                "newsletter",
+                model=settings.openai_model,
+                instructions=prepared.system,
+                input=prepared.user_prompt,
+            ):
+                if not parts:
+                    timings["first_token_ms"] = round((time.perf_counter() - started) * 1000)
+                parts.append(delta)
+                yield {"event": "delta", "text": delta}
+            timings["generate_ms"] = round((time.perf_counter() - t0) * 1000)
+            md = "".join(parts)
+            await _save_report(session, run_id, md, prepared.fingerprint)
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000)
+        yield {"event": "done", "report_markdown": md, "timings_ms": timings, **prepared.meta}
+    finally:
+        if not prepare.done():
+            prepare.cancel()
@@ -0,0 +1,227 @@
+# app/openai_gateway.py — the process's one way to call OpenAI (embeddings, responses, web search, streams).
+# A single AsyncOpenAI client over a pooled httpx connection pool; every request passes per-process token
+# buckets for requests and tokens per minute (OPENAI_RPM / OPENAI_TPM, 0 = off) and a cap on requests in
+# flight (OPENAI_CONCURRENCY), and is retried with backoff on 429/5xx/connection errors. Identical
+# non-streaming calls made while one is already in flight share its result instead of paying twice.
+import asyncio
+import hashlib
+import json
+import random
+from contextlib import AsyncExitStack, nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import httpx
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError
+
+from .metrics import count_coalesced, count_retry, record_usage, stage
+from .ratelimit import TokenBucket
+from .settings import settings
+
+_client: AsyncOpenAI | None = None
+_semaphore = asyncio.Semaphore(settings.openai_concurrency)
+_requests = TokenBucket.per_minute(settings.openai_rpm) if settings.openai_rpm > 0 else None
+# Burst of 1/10 of the minute budget so one large embedding batch can start without a long wait.
+_tokens = TokenBucket.per_minute(settings.openai_tpm, settings.openai_tpm / 10) if settings.openai_tpm > 0 else None
+_inflight: dict[str, asyncio.Future] = {}
+
+# Stage names predate the gateway (metrics.py); keep them so dashboards don't change.
+_STAGES = {"embeddings": "embed_request", "web_search": "web_search"}
+
+
+def client() -> AsyncOpenAI:
+    """Shared client; SDK retries are off because the gateway's retries also go through the limits."""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            max_retries=0,
+            timeout=settings.openai_timeout,
+            http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_connections,
+            )),
+        )
+    return _client
+
+
+async def shutdown() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _stage_name(operation: str) -> str:
+    return _STAGES.get(operation, f"llm_{operation}")
+
+
+def _estimate_tokens(kwargs: dict) -> int:
+    # ~4 characters per token; good enough to pace TPM, corrected from usage once the response arrives.
+    text = sum(len(json.dumps(kwargs.get(k), default=str)) for k in ("input", "instructions") if kwargs.get(k))
+    return text // 4 + (kwargs.get("max_output_tokens") or 0)
+
+
+def _used_tokens(usage) -> int:
+    if usage is None:
+        return 0
+    return getattr(usage, "total_tokens", None) or (
+        (getattr(usage, "input_tokens", 0) or getattr(usage, "prompt_tokens", 0) or 0)
+        + (getattr(usage, "output_tokens", 0) or 0)
+    )
+
+
+async def _admit(estimate: int) -> None:
+    if _requests is not None:
+        await _requests.acquire()
+    if _tokens is not None and estimate:
+        await _tokens.acquire(estimate)
+
+
+def _settle(estimate: int, usage) -> None:
+    """Charge (or refund) the difference between the estimate and the tokens the response reports."""
+    if _tokens is not None and usage is not None:
+        _tokens.consume(_used_tokens(usage) - estimate)
+
+
+def _retry_delay(attempt: int, err: Exception) -> float:
+    retry_after = None
+    if isinstance(err, APIStatusError):
+        retry_after = err.response.headers.get("retry-after")
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), 60.0)
+    except ValueError:
+        pass
+    return min(2 ** attempt, 30.0) + random.uniform(0, 1)
+
+
+def _is_retryable(err: Exception) -> bool:
+    if isinstance(err, (RateLimitError, APIConnectionError)):
+        return True
+    return isinstance(err, APIStatusError) and err.status_code >= 500
+
+
+async def _with_retries(
+    operation: str,
+    call: Callable[[], Awaitable[Any]],
+    estimate: int,
+    *,
+    limit: asyncio.Semaphore | None = None,
+    max_retries: int | None = None,
+):
+    max_retries = settings.openai_max_retries if max_retries is None else max_retries
+    attempt = 0
+    while True:
+        with stage("openai_queue"):
+            await _admit(estimate)
+        try:
+            # Slots are held per attempt, not across the backoff sleep.
+            async with limit or nullcontext(), _semaphore:
+                with stage(_stage_name(operation)):
+                    return await call()
+        except Exception as e:
+            if not _is_retryable(e) or attempt >= max_retries:
+                raise
+            count_retry(operation)
+            await asyncio.sleep(_retry_delay(attempt, e))
+            attempt += 1
+
+
+def _key(kind: str, kwargs: dict) -> str:
+    return hashlib.sha256(json.dumps([kind, kwargs], sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _consume_exception(fut: asyncio.Future) -> None:
+    # Every waiter may have been cancelled; don't let an unobserved failure log "never retrieved".
+    if not fut.cancelled():
+        fut.exception()
+
+
+async def _coalesced(operation: str, key: str, make: Callable[[], Awaitable[Any]]):
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(make())
+        _inflight[key] = fut
+        fut.add_done_callback(lambda f: _inflight.pop(key, None) if _inflight.get(key) is f else None)
+        fut.add_done_callback(_consume_exception)
+    else:
+        count_coalesced(operation)
+    # shield: one caller giving up must not cancel the request the others are waiting on.
+    return await asyncio.shield(fut)
+
+
+async def create_embeddings(
+    *,
+    model: str,
+    input: list[str],
+    limit: asyncio.Semaphore | None = None,
+    max_retries: int | None = None,
+):
+    """embeddings.create through the limits; `limit` is an extra per-caller cap (EMBED_CONCURRENCY)."""
+    kwargs = {"model": model, "input": input}
+    estimate = _estimate_tokens(kwargs)
+
+    async def make():
+        resp = await _with_retries(
+            "embeddings", lambda: client().embeddings.create(**kwargs), estimate, limit=limit, max_retries=max_retries,
+        )
+        _settle(estimate, resp.usage)
+        record_usage("embeddings", model, resp.usage)
+        return resp
+
+    return await _coalesced("embeddings", _key("embeddings", kwargs), make)
+
+
+async def create_response(operation: str, **kwargs):
+    """responses.create through the limits; operation labels metrics (report, newsletter, web_search)."""
+    estimate = _estimate_tokens(kwargs)
+
+    async def make():
+        resp = await _with_retries(operation, lambda: client().responses.create(**kwargs), estimate)
+        usage = getattr(resp, "usage", None)
+        _settle(estimate, usage)
+        record_usage(operation, kwargs.get("model", ""), usage)
+        return resp
+
+    return await _coalesced(operation, _key("responses", kwargs), make)
+
+
+async def stream_output_text(operation: str, **kwargs) -> AsyncIterator[str]:
+    """
+    Responses API in streaming mode: yields output text deltas as they arrive.
+    Opening the stream is retried like any call; once text has been yielded it is not (the caller has
+    forwarded it). The concurrency slot is held until the stream ends. Closing the generator early
+    (client disconnected) exits the stream context, which aborts the request. Streams are not coalesced.
+    """
+    estimate = _estimate_tokens(kwargs)
+    attempt = 0
+    with stage(_stage_name(operation)):
+        while True:
+            with stage("openai_queue"):
+                await _admit(estimate)
+            stack = AsyncExitStack()
+            try:
+                await stack.enter_async_context(_semaphore)
+                stream = await stack.enter_async_context(client().responses.stream(**kwargs))
+            except BaseException as e:
+                await stack.aclose()
+                if not isinstance(e, Exception) or not _is_retryable(e) or attempt >= settings.openai_max_retries:
+                    raise
+                count_retry(operation)
+                await asyncio.sleep(_retry_delay(attempt, e))
+                attempt += 1
+                continue
+            break
+        async with stack:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.completed":
+                    usage = getattr(event.response, "usage", None)
+                    _settle(estimate, usage)
+                    record_usage(operation, kwargs.get("model", ""), usage)
+                elif event.type == "response.failed":
+                    err = getattr(event.response, "error", None)
+                    raise RuntimeError(f"Response failed: {getattr(err, 'message', None) or 'unknown error'}")
+                elif event.type == "error":
+                    raise RuntimeError(f"Response stream error: {event.message}")
@@ -0,0 +1,69 @@
+# app/paging.py — helpers for list/detail endpoints: keyset cursors, ?fields= projections, ETag revalidation.
+# Cursors are opaque (base64url of the last row's sort key and id), so a page is an index range scan
+# however deep it is. Responses carry a weak ETag over the JSON body with Cache-Control: no-cache: browsers
+# revalidate with If-None-Match and an unchanged page or run comes back as an empty 304.
+import base64
+import hashlib
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    raw = json.dumps([sort_value.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(400, "Invalid cursor.") from e
+
+
+def select_list(fields: str | None, columns: dict[str, str], default: list[str], always: tuple[str, ...] = ("id",)) -> str:
+    """
+    SQL select list for ?fields=a,b ("all" for every column; default when omitted). columns maps output
+    names to SQL expressions; `always` (id, the sort key) are included so rows stay addressable and pageable.
+    """
+    if fields is None:
+        names = default
+    elif fields.strip() == "all":
+        names = list(columns)
+    else:
+        names = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [n for n in names if n not in columns]
+        if unknown:
+            raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(columns)}.")
+    return ", ".join(f"{columns[n]} AS {n}" for n in dict.fromkeys([*always, *names]))
+
+
+def page(rows: list[dict], limit: int, sort_key: str) -> tuple[list[dict], str | None]:
+    """Rows fetched with LIMIT limit + 1 -> (this page, cursor of the next page or None)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][sort_key], rows[-1]["id"])
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored.
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def etag_json(request: Request, content) -> Response:
+    """JSONResponse with an ETag over its body, or 304 Not Modified when If-None-Match has that tag."""
+    response = JSONResponse(jsonable_encoder(content))
+    etag = 'W/"' + hashlib.sha256(response.body).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
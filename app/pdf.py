@@ -0,0 +1,95 @@
+# app/pdf.py — PDF text extraction in a process pool, off the event loop.
+# Workers read the PDF from a temp file page by page (pypdf parses lazily), so neither the API process
+# nor the worker holds the whole download in memory.
+import asyncio
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pypdf import PdfReader
+
+from .metrics import timed
+from .settings import settings
+
+_executor: ProcessPoolExecutor | None = None
+
+
+class PdfRejected(Exception):
+    """PDF exceeded a size/time guard; message is safe to return to the client."""
+
+
+def _extract(path: str, max_pages: int) -> dict:
+    """Runs in a pool worker. Returns {title, markdown, pages, truncated}."""
+    reader = PdfReader(path)
+    parts = []
+    total = len(reader.pages)
+    for i in range(min(total, max_pages)):
+        try:
+            t = reader.pages[i].extract_text()
+            if t:
+                parts.append(t.strip())
+        except Exception:
+            continue
+    # Optional: use PDF metadata as title
+    title = None
+    try:
+        meta = reader.metadata
+        if meta and meta.get("/Title"):
+            title = str(meta.get("/Title"))
+    except Exception:
+        pass
+    if not title and parts:
+        # First non-empty line as fallback title
+        first = parts[0][:200] if parts[0] else ""
+        first = re.sub(r"\s+", " ", first).strip()
+        if first:
+            title = first
+    return {
+        "title": title,
+        "markdown": "\n\n".join(parts).strip(),
+        "pages": min(total, max_pages),
+        "truncated": total > max_pages,
+    }
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs an event loop and DB pool is unsafe.
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.pdf_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+@timed("pdf_extract")
+async def extract_pdf(path: str) -> dict:
+    """
+    Extract text from a PDF file in the process pool, bounded by PDF_TIMEOUT seconds and
+    PDF_MAX_PAGES pages. A timed-out extraction keeps running in its worker until it hits
+    the page cap, but the caller is released immediately. A worker that dies (e.g. OOM) breaks
+    the pool: the document is rejected and the next call starts a fresh pool.
+    """
+    global _executor
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    fut = loop.run_in_executor(executor, _extract, path, settings.pdf_max_pages)
+    try:
+        return await asyncio.wait_for(fut, timeout=settings.pdf_timeout)
+    except asyncio.TimeoutError:
+        raise PdfRejected(f"PDF extraction timed out after {settings.pdf_timeout:g}s")
+    except BrokenProcessPool:
+        # Concurrent extractions fail together; only the first one replaces the pool.
+        if _executor is executor:
+            executor.shutdown(wait=False)
+            _executor = None
+        raise PdfRejected("PDF extraction worker crashed (document too large or malformed)")
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,213 @@
+# app/pipeline.py — crawl (or upload) -> chunk/embed -> store for one URL, and bounded-concurrency batches of URLs.
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from urllib.parse import urlparse
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .crawl import crawl_url, sha256_text
+from .db import SessionLocal
+from .pdf import PdfRejected
+from .query_cache import bump_corpus_generation
+from .settings import settings
+from .store import get_url_validators, ingest_crawled, record_crawl_run, save_url_validators
+
+PDF_403_MESSAGE = (
+    "PDF URL returned 403 Forbidden; host may require a browser. "
+    "Try a public PDF (e.g. https://arxiv.org/pdf/2310.06825.pdf) to validate."
+)
+
+
+class IngestError(Exception):
+    """Crawl produced nothing storable; message is safe to return to the client."""
+
+
+async def ingest_url(
+    session: AsyncSession,
+    url: str,
+    source_id: int | None = None,
+    *,
+    fetch_slot=None,
+) -> dict:
+    """
+    Crawl one URL and store document + chunks, with crawl_runs audit rows. Commits.
+    Uses the URL's stored validators for a conditional fetch; a 304 or a content hash equal to
+    the last stored version records an 'unchanged' run and skips chunking/embedding entirely.
+    fetch_slot: optional async context manager held only around the fetch (batch politeness).
+    Returns {url, status: success|unchanged, document_id, chunks}.
+    Raises IngestError (after recording a 'failed' run) when the URL can't be ingested.
+    """
+    validators = await get_url_validators(session, url)
+    if validators and validators["document_id"] is None:
+        validators = None  # stored version was deleted; fetch unconditionally
+    await record_crawl_run(session, source_id=source_id, url=url, status="started")
+    await session.commit()
+
+    try:
+        if fetch_slot is None:
+            data = await crawl_url(url, validators)
+        else:
+            async with fetch_slot:
+                data = await crawl_url(url, validators)
+    except httpx.HTTPStatusError as e:
+        err_msg = str(e.response.status_code) + " " + (e.response.reason_phrase or "")
+        if e.response.status_code == 403:
+            err_msg = PDF_403_MESSAGE
+        await record_crawl_run(session, source_id=source_id, url=url, status="failed", error=err_msg, http_status=e.response.status_code)
+        await session.commit()
+        raise IngestError(err_msg) from e
+    except PdfRejected as e:
+        await record_crawl_run(session, source_id=source_id, url=url, status="failed", error=str(e))
+        await session.commit()
+        raise IngestError(str(e)) from e
+
+    return await _store(session, url, data, validators, source_id)
+
+
+async def ingest_content(
+    session: AsyncSession,
+    url: str,
+    *,
+    title: str | None,
+    markdown: str,
+    source_id: int | None = None,
+) -> dict:
+    """
+    Store already-fetched content (uploads) under `url` through the same path as a crawl: a content hash
+    equal to the URL's last stored version is 'unchanged' and skips chunking/embedding. Commits.
+    Returns {url, status: success|unchanged, document_id, chunks}; raises IngestError on empty content.
+    """
+    validators = await get_url_validators(session, url)
+    if validators and validators["document_id"] is None:
+        validators = None
+    markdown = markdown.strip()
+    data = {"url": url, "title": title, "markdown": markdown, "content_hash": sha256_text(markdown)}
+    return await _store(session, url, data, validators, source_id)
+
+
+async def _store(
+    session: AsyncSession,
+    url: str,
+    data: dict,
+    validators: dict | None,
+    source_id: int | None,
+) -> dict:
+    """Shared tail of ingest_url / ingest_content: unchanged short-circuit, else chunk, embed and store."""
+    unchanged = data.get("not_modified") or (
+        validators is not None and data["markdown"] and data["content_hash"] == validators.get("content_hash")
+    )
+    if unchanged:
+        await save_url_validators(
+            session, url,
+            etag=data.get("etag"), last_modified=data.get("last_modified"),
+            content_hash=None, document_id=None, changed=False,
+        )
+        await record_crawl_run(session, source_id=source_id, url=url, status="unchanged", http_status=data.get("http_status"))
+        await session.commit()
+        return {"url": data["url"], "status": "unchanged", "document_id": validators.get("document_id"), "chunks": 0}
+
+    if not data["markdown"]:
+        await record_crawl_run(session, source_id=source_id, url=data["url"], status="failed", error="No content extracted", http_status=data.get("http_status"))
+        await session.commit()
+        raise IngestError("No content extracted.")
+
+    result = await ingest_crawled(session, data, source_id)
+    await save_url_validators(
+        session, url,
+        etag=data.get("etag"), last_modified=data.get("last_modified"),
+        content_hash=data["content_hash"], document_id=result["document_id"], changed=True,
+    )
+    await record_crawl_run(session, source_id=source_id, url=data["url"], status="success", http_status=data.get("http_status"))
+    await session.commit()
+    if result["chunks"]:
+        # After the commit, so a search can't cache the new generation without these chunks.
+        await bump_corpus_generation(session)
+    return {"url": data["url"], "status": "success", **result}
+
+
+class HostLimiter:
+    """
+    Per-host politeness: at most `concurrency` fetches in flight per host and at least
+    `delay` seconds between fetch starts on the same host.
+    """
+
+    def __init__(self, concurrency: int, delay: float):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._sems: dict[str, asyncio.Semaphore] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._next_start: dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = (urlparse(url).hostname or "").lower()
+        if host not in self._sems:
+            self._sems[host] = asyncio.Semaphore(self.concurrency)
+            self._locks[host] = asyncio.Lock()
+        async with self._sems[host]:
+            async with self._locks[host]:
+                wait = self._next_start.get(host, 0.0) - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start[host] = time.monotonic() + self.delay
+            yield
+
+
+async def crawl_batch(urls: list[str], source_id: int | None = None) -> AsyncIterator[dict]:
+    """
+    Ingest many URLs, yielding one result dict per URL as it finishes, then a summary.
+    Only the fetch stage is bounded by CRAWL_CONCURRENCY and per-host limits; embedding
+    (EMBED_CONCURRENCY) and DB writes run outside that slot, so stages overlap across URLs.
+    """
+    fetch_sem = asyncio.Semaphore(settings.crawl_concurrency)
+    # URLs in flight across all stages: enough for fetches to overlap embed/write of earlier URLs
+    # without every URL grabbing a DB connection up front.
+    inflight = asyncio.Semaphore(settings.crawl_concurrency * 2)
+    hosts = HostLimiter(settings.crawl_per_host_concurrency, settings.crawl_per_host_delay)
+    started = time.perf_counter()
+
+    @asynccontextmanager
+    async def fetch_slot(url: str):
+        # Host slot first so a URL waiting out a host delay doesn't hold a global slot.
+        async with hosts.slot(url), fetch_sem:
+            yield
+
+    async def one(url: str) -> dict:
+        async with inflight:
+            t0 = time.perf_counter()
+            out = {"event": "result", "url": url}
+            try:
+                async with SessionLocal() as session:
+                    r = await ingest_url(session, url, source_id, fetch_slot=fetch_slot(url))
+                out.update(status=r["status"], document_id=r["document_id"], chunks=r["chunks"])
+            except IngestError as e:
+                out.update(status="failed", error=str(e))
+            except Exception as e:
+                out.update(status="failed", error=f"{type(e).__name__}: {e}")
+            out["elapsed_ms"] = round((time.perf_counter() - t0) * 1000)
+            return out
+
+    # Preserve order of first appearance, drop duplicates so one URL isn't ingested twice concurrently.
+    unique = list(dict.fromkeys(urls))
+    tasks = [asyncio.create_task(one(u)) for u in unique]
+    counts = {"success": 0, "unchanged": 0, "failed": 0}
+    try:
+        for fut in asyncio.as_completed(tasks):
+            r = await fut
+            counts[r["status"]] += 1
+            yield r
+    finally:
+        # Client went away (generator closed) -> stop outstanding work.
+        for t in tasks:
+            t.cancel()
+    yield {
+        "event": "summary",
+        "total": len(unique),
+        "succeeded": counts["success"],
+        "unchanged": counts["unchanged"],
+        "failed": counts["failed"],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000),
+    }
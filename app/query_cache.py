@@ -0,0 +1,64 @@
+# app/query_cache.py — query-side caches for /query, /report and newsletter RAG.
+# Query embeddings: TTL+LRU keyed on (embed model, text), separate from the chunk embedding cache so
+# large ingests don't evict them. Search results: TTL+LRU keyed on the corpus generation (a Postgres
+# sequence bumped after ingest), so new chunks invalidate results in every process.
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import LRUCache
+from .embeddings import embed_texts
+from .settings import settings
+
+log = logging.getLogger(__name__)
+
+_embeddings = LRUCache(settings.query_embed_cache_size, ttl=settings.query_embed_cache_ttl)
+_results = LRUCache(settings.query_result_cache_size, ttl=settings.query_result_cache_ttl)
+
+
+async def embed_query(query: str) -> list[float]:
+    key = (settings.openai_embed_model, query)
+    vec = _embeddings.get(key)
+    if vec is None:
+        # Not through the chunk embedding cache: ad-hoc queries would fill its table and LRU.
+        vec = (await embed_texts([query], use_cache=False))[0]
+        _embeddings.set(key, vec)
+    return vec
+
+
+async def corpus_generation(session: AsyncSession) -> int:
+    # A fresh sequence reports last_value 1 before its first nextval too: count that as generation 0.
+    return (await session.execute(text(
+        "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM corpus_generation"
+    ))).scalar_one()
+
+
+async def bump_corpus_generation(session: AsyncSession) -> None:
+    """Call after committing new chunks. nextval is non-transactional, so no commit is needed."""
+    try:
+        await session.execute(text("SELECT nextval('corpus_generation')"))
+    except Exception:
+        # Cached results still expire after QUERY_RESULT_CACHE_TTL.
+        log.exception("corpus generation bump failed")
+
+
+def get_results(key: tuple) -> list[dict] | None:
+    if not settings.query_result_cache_enabled:
+        return None
+    rows = _results.get(key)
+    # Copies, so callers can't mutate the cached rows.
+    return [dict(r) for r in rows] if rows is not None else None
+
+
+def put_results(key: tuple, rows: list[dict]) -> None:
+    if settings.query_result_cache_enabled:
+        _results.set(key, [dict(r) for r in rows])
+
+
+def stats() -> dict:
+    return {
+        "model": settings.openai_embed_model,
+        "query_embeddings": _embeddings.stats(),
+        "results": {"enabled": settings.query_result_cache_enabled, **_results.stats()},
+    }
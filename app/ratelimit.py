@@ -0,0 +1,41 @@
+# app/ratelimit.py — asyncio token bucket (per process).
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, bursting up to `capacity`. acquire(n) waits until n tokens are
+    available; callers are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, amount: float, burst: float | None = None) -> "TokenBucket":
+        return cls(amount / 60.0, burst if burst is not None else max(1.0, amount / 60.0))
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, n: float = 1.0) -> None:
+        # Requests larger than the bucket would never fit; let them through once it is full.
+        n = min(n, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < n:
+                await asyncio.sleep((n - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= n
+
+    def consume(self, n: float) -> None:
+        """Take n tokens without waiting (negative n gives them back); the balance may go below zero."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - n)
@@ -1,18 +1,17 @@
-from openai import OpenAI
+from typing import AsyncIterator
+
+from . import openai_gateway
+from .context import build_context
 from .settings import settings
 
-_client = OpenAI(api_key=settings.openai_api_key)
 
-def build_quarterly_report_markdown(quarter_label: str, context_snippets: list[dict]) -> str:
-    """
-    Generates a quarterly report using ONLY your stored snippets (deterministic + auditable).
-    """
-    context = "\n\n".join(
-        f"- URL: {s['url']}\n  score: {s.get('score','')}\n  excerpt: {s['content']}"
-        for s in context_snippets
-    )
+def _report_prompt(quarter_label: str, context_snippets: list[dict], stats: dict | None) -> str:
+    # Deduplicated, merged and token-budgeted (context.build_context); stats, if given, receives its report.
+    context, context_stats = build_context(context_snippets)
+    if stats is not None:
+        stats.update(context_stats)
 
-    prompt = f"""
+    return f"""
 Create a quarterly report for {quarter_label}.
 
 Use ONLY the provided excerpts. Structure:
@@ -26,8 +25,28 @@ EXCERPTS:
 {context}
 """.strip()
 
-    resp = _client.responses.create(
+
+async def build_quarterly_report_markdown(
+    quarter_label: str,
+    context_snippets: list[dict],
+    stats: dict | None = None,
+) -> str:
+    """
+    Generates a quarterly report using ONLY your stored snippets (deterministic + auditable).
+    """
+    prompt = _report_prompt(quarter_label, context_snippets, stats)
+    resp = await openai_gateway.create_response("report", model=settings.openai_model, input=prompt)
+    return getattr(resp, "output_text", "")
+
+
+def stream_quarterly_report_markdown(
+    quarter_label: str,
+    context_snippets: list[dict],
+    stats: dict | None = None,
+) -> AsyncIterator[str]:
+    """Same report as build_quarterly_report_markdown, streamed as text deltas."""
+    return openai_gateway.stream_output_text(
+        "report",
         model=settings.openai_model,
-        input=prompt,
+        input=_report_prompt(quarter_label, context_snippets, stats),
     )
-    return getattr(resp, "output_text", "")
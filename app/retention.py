@@ -0,0 +1,138 @@
+# app/retention.py — garbage collection of superseded document versions (documents.is_latest = FALSE).
+# Superseded chunks are already out of search (chunks.is_current, partial HNSW index); once a version has
+# been superseded for RETENTION_DAYS its chunks and embeddings are deleted, optionally the version row too
+# (RETENTION_DELETE_DOCUMENTS), then content_blocks no version references. Every step runs in batches of
+# RETENTION_BATCH_SIZE rows, one short transaction each, so ingest and search never wait on a long lock.
+# Reported bytes are stored column sizes (heap + TOAST, not index entries); autovacuum makes them reusable.
+# Runs as the "retention" job (POST /retention/run) or: python -m app.retention [--days 30] [--dry-run]
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+
+from .content_store import gc_blocks
+from .db import SessionLocal
+from .settings import settings
+
+# Superseded before the cutoff (:age seconds ago); idx_documents_superseded / idx_chunks_superseded.
+_EXPIRED = "NOT d.is_latest AND d.superseded_at < NOW() - make_interval(secs => :age)"
+
+_CHUNK_BYTES = (
+    "pg_column_size(c.content) + COALESCE(pg_column_size(c.embedding), 0)"
+    " + COALESCE(pg_column_size(c.embedding_half), 0) + COALESCE(pg_column_size(c.content_tsv), 0)"
+)
+_DOCUMENT_BYTES = "COALESCE(pg_column_size(d.content_markdown), 0) + COALESCE(pg_column_size(d.content_blocks), 0)"
+
+
+async def _batch(sql: str, params: dict) -> tuple[int, int]:
+    async with SessionLocal() as session:
+        sizes = (await session.execute(text(sql), params)).scalars().all()
+        await session.commit()
+    return len(sizes), sum(sizes)
+
+
+async def _preview(age: float, delete_documents: bool) -> dict:
+    async with SessionLocal() as session:
+        chunks, chunk_bytes = (await session.execute(text(f"""
+          SELECT count(*), COALESCE(sum({_CHUNK_BYTES}), 0)
+          FROM documents d JOIN chunks c ON c.document_id = d.id AND NOT c.is_current
+          WHERE {_EXPIRED}
+        """), {"age": age})).one()
+        documents, document_bytes = (await session.execute(text(f"""
+          SELECT count(*), COALESCE(sum({_DOCUMENT_BYTES}), 0) FROM documents d WHERE {_EXPIRED}
+        """), {"age": age})).one() if delete_documents else (0, 0)
+    return {
+        "chunks_deleted": chunks, "chunk_bytes": chunk_bytes,
+        "documents_deleted": documents, "document_bytes": document_bytes,
+    }
+
+
+async def run_retention(
+    *,
+    days: float | None = None,
+    delete_documents: bool | None = None,
+    batch_size: int | None = None,
+    dry_run: bool = False,
+    progress: Callable[[dict], Awaitable[None]] | None = None,
+) -> dict:
+    """
+    Collect superseded versions older than `days` (default RETENTION_DAYS). Returns rows and bytes reclaimed
+    per table; dry_run only counts what would go (blocks freed by deleted versions aren't predicted).
+    """
+    started = time.perf_counter()
+    days = settings.retention_days if days is None else days
+    delete_documents = settings.retention_delete_documents if delete_documents is None else delete_documents
+    batch_size = batch_size or settings.retention_batch_size
+    age = days * 86400.0
+    report = {"days": days, "delete_documents": delete_documents, "dry_run": dry_run}
+
+    if dry_run:
+        report.update(await _preview(age, delete_documents), blocks_deleted=0, block_bytes=0)
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+        return report
+
+    counts = {"chunks_deleted": 0, "chunk_bytes": 0, "documents_deleted": 0, "document_bytes": 0,
+              "blocks_deleted": 0, "block_bytes": 0}
+
+    async def step(stage: str, rows_key: str, bytes_key: str, sql: str) -> None:
+        while True:
+            n, size = await _batch(sql, {"age": age, "batch": batch_size})
+            counts[rows_key] += n
+            counts[bytes_key] += size
+            if progress is not None:
+                await progress({"stage": stage, **counts})
+            if n < batch_size:
+                return
+
+    await step("chunks", "chunks_deleted", "chunk_bytes", f"""
+      DELETE FROM chunks c WHERE c.id IN (
+        SELECT c.id FROM documents d JOIN chunks c ON c.document_id = d.id AND NOT c.is_current
+        WHERE {_EXPIRED}
+        LIMIT :batch
+      )
+      RETURNING {_CHUNK_BYTES}
+    """)
+    if delete_documents:
+        # Chunks are gone by now (ON DELETE CASCADE would catch stragglers, but in one unbounded statement).
+        await step("documents", "documents_deleted", "document_bytes", f"""
+          DELETE FROM documents d WHERE d.id IN (
+            SELECT d.id FROM documents d
+            WHERE {_EXPIRED} AND NOT EXISTS (SELECT 1 FROM chunks c WHERE c.document_id = d.id)
+            LIMIT :batch
+          )
+          RETURNING {_DOCUMENT_BYTES}
+        """)
+
+    # Blocks are orphaned by deleted versions and by versions that became latest again (unarchived).
+    cursor: bytes | None = b""
+    while cursor is not None:
+        async with SessionLocal() as session:
+            cursor, n, size = await gc_blocks(session, cursor, batch_size)
+        counts["blocks_deleted"] += n
+        counts["block_bytes"] += size
+    if progress is not None:
+        await progress({"stage": "blocks", **counts})
+
+    report.update(counts)
+    report["bytes_reclaimed"] = counts["chunk_bytes"] + counts["document_bytes"] + counts["block_bytes"]
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=float, help="retention for superseded versions (default RETENTION_DAYS)")
+    ap.add_argument("--delete-documents", action="store_true", help="also delete the superseded version rows")
+    ap.add_argument("--batch", type=int, help="rows per transaction (default RETENTION_BATCH_SIZE)")
+    ap.add_argument("--dry-run", action="store_true", help="count what would be deleted")
+    args = ap.parse_args()
+    result = asyncio.run(run_retention(
+        days=args.days,
+        delete_documents=args.delete_documents or None,
+        batch_size=args.batch,
+        dry_run=args.dry_run,
+    ))
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,68 @@
+# app/run_artifacts.py — per-stage artifacts of newsletter runs, for incremental regeneration.
+# Generating a run stores each stage's output with a fingerprint of its inputs (newsletter_run_artifacts):
+#   crawl       per extra URL: status, document id and when it was crawled
+#   retrieval   ranked chunk ids and scores (inputs: query, filters, mode, embed model, corpus generation)
+#   web_search  answer markdown and raw Responses payload (inputs: query, instructions, model)
+#   prompt      the assembled instructions and input
+#   report      the prompt fingerprint report_markdown was generated from
+# A regenerate reuses every stage whose fingerprint is unchanged, so editing only the feedback re-runs just
+# prompt assembly and the model call. Crawl and web search results also expire after NEWSLETTER_STAGE_TTL.
+import hashlib
+import json
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def fingerprint(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+async def load(session: AsyncSession, run_id: int) -> dict[str, dict]:
+    """{stage: {"fingerprint", "data", "age" (seconds since stored)}} for the run."""
+    rows = (await session.execute(text("""
+        SELECT stage, fingerprint, data, EXTRACT(EPOCH FROM NOW() - created_at) AS age
+        FROM newsletter_run_artifacts WHERE run_id = :id
+    """), {"id": run_id})).mappings().all()
+    return {
+        r["stage"]: {
+            "fingerprint": r["fingerprint"],
+            "data": json.loads(r["data"]) if isinstance(r["data"], str) else r["data"],
+            "age": float(r["age"]),
+        }
+        for r in rows
+    }
+
+
+def fresh(artifact: dict | None, fp: str, ttl: float | None = None) -> dict | None:
+    """The artifact's data if it was stored for inputs `fp` (and, given ttl, less than ttl seconds ago)."""
+    if artifact is None or artifact["fingerprint"] != fp:
+        return None
+    if ttl is not None and artifact["age"] >= ttl:
+        return None
+    return artifact["data"]
+
+
+async def save(session: AsyncSession, run_id: int, stage: str, fp: str, data: dict) -> None:
+    """Replace the run's artifact for `stage`. Caller commits."""
+    await session.execute(text("""
+        INSERT INTO newsletter_run_artifacts(run_id, stage, fingerprint, data)
+        VALUES (:id, :stage, :fp, CAST(:data AS JSONB))
+        ON CONFLICT (run_id, stage) DO UPDATE
+        SET fingerprint = EXCLUDED.fingerprint, data = EXCLUDED.data, created_at = NOW()
+    """), {"id": run_id, "stage": stage, "fp": fp, "data": json.dumps(data, default=str)})
+
+
+async def load_matches(session: AsyncSession, hits: list[dict]) -> list[dict] | None:
+    """
+    Ranked matches (as search_chunks returns them) for stored [{id, score}] retrieval hits, or None if any
+    chunk was deleted or superseded since (retrieval has to run again).
+    """
+    ids = [h["id"] for h in hits]
+    rows = (await session.execute(text("""
+        SELECT id, document_id, url, chunk_index, content FROM chunks WHERE id = ANY(:ids) AND is_current
+    """), {"ids": ids})).mappings().all()
+    by_id = {r["id"]: dict(r) for r in rows}
+    if len(by_id) < len(set(ids)):
+        return None
+    return [{**by_id[h["id"]], "score": h.get("score")} for h in hits]
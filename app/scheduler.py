@@ -0,0 +1,259 @@
+# app/scheduler.py — periodic incremental refresh of enabled sources.
+# A heap ordered by next_crawl_at picks due sources; each is claimed atomically in the DB (safe with
+# several schedulers), URLs under base_url are discovered from sitemap.xml, RSS/Atom feeds and in-page
+# links, and only new or changed URLs are enqueued as crawl jobs.
+import asyncio
+import heapq
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from urllib.parse import urljoin, urldefrag, urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+from sqlalchemy import text
+
+from .db import SessionLocal
+from .http_client import get_client
+from .jobs import enqueue
+from .ratelimit import TokenBucket
+from .settings import settings
+
+log = logging.getLogger(__name__)
+
+_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; scraper-aggregator/1.0)"}
+_FEED_TYPES = ("application/rss+xml", "application/atom+xml")
+
+
+def _under(url: str, base_url: str) -> bool:
+    """Same host as base_url and inside its path prefix."""
+    u, b = urlparse(url), urlparse(base_url)
+    if u.scheme not in ("http", "https") or (u.hostname or "").lower() != (b.hostname or "").lower():
+        return False
+    # ".../insights" and ".../insights/" scope to that directory; ".../index.html" to its parent.
+    last = b.path.rsplit("/", 1)[-1]
+    prefix = (b.path.rsplit("/", 1)[0] if "." in last else b.path).rstrip("/")
+    # On a path boundary: "/insights" covers "/insights/x" but not "/insightsfoo".
+    return not prefix or u.path == prefix or u.path.startswith(prefix + "/")
+
+
+async def _get(url: str) -> httpx.Response | None:
+    try:
+        resp = await get_client().get(url, headers=_HEADERS, follow_redirects=True, timeout=30.0)
+    except httpx.HTTPError:
+        return None
+    return resp if resp.status_code == 200 else None
+
+
+def _parse_sitemap(xml: str) -> tuple[list[tuple[str, str | None]], list[str]]:
+    """Returns ([(loc, lastmod)], [child sitemap URLs])."""
+    soup = BeautifulSoup(xml, "xml")
+    children = [loc.get_text(strip=True) for sm in soup.find_all("sitemap") if (loc := sm.find("loc"))]
+    urls = []
+    for u in soup.find_all("url"):
+        loc = u.find("loc")
+        if loc:
+            lastmod = u.find("lastmod")
+            urls.append((loc.get_text(strip=True), lastmod.get_text(strip=True) if lastmod else None))
+    return urls, children
+
+
+def _parse_feed(xml: str) -> list[tuple[str, str | None]]:
+    soup = BeautifulSoup(xml, "xml")
+    out = []
+    for item in soup.find_all(["item", "entry"]):
+        link = item.find("link")
+        href = (link.get("href") or link.get_text(strip=True)) if link else None
+        date = item.find(["pubDate", "updated", "published"])
+        if href:
+            out.append((href, date.get_text(strip=True) if date else None))
+    return out
+
+
+async def _from_sitemaps(base_url: str) -> list[tuple[str, str | None]]:
+    origin = f"{urlparse(base_url).scheme}://{urlparse(base_url).netloc}"
+    candidates = [urljoin(origin, "/sitemap.xml")]
+    robots = await _get(urljoin(origin, "/robots.txt"))
+    if robots is not None:
+        for line in robots.text.splitlines():
+            if line.lower().startswith("sitemap:"):
+                candidates.append(line.split(":", 1)[1].strip())
+    found: list[tuple[str, str | None]] = []
+    seen: set[str] = set()
+    # Sitemap indexes are followed one level deep.
+    for depth in range(2):
+        next_level = []
+        for sm_url in candidates:
+            if sm_url in seen:
+                continue
+            seen.add(sm_url)
+            resp = await _get(sm_url)
+            if resp is None:
+                continue
+            urls, children = _parse_sitemap(resp.text)
+            found.extend(urls)
+            next_level.extend(children)
+            if len(found) >= settings.scheduler_max_discovered:
+                return found
+        candidates = next_level if depth == 0 else []
+    return found
+
+
+async def _from_page(base_url: str) -> list[tuple[str, str | None]]:
+    """In-page links from base_url, or feed items if base_url (or a linked alternate) is RSS/Atom."""
+    resp = await _get(base_url)
+    if resp is None:
+        return []
+    ctype = resp.headers.get("content-type", "")
+    if "xml" in ctype or resp.text.lstrip().startswith("<?xml"):
+        return _parse_feed(resp.text)
+    soup = BeautifulSoup(resp.text, "lxml")
+    found: list[tuple[str, str | None]] = []
+    for link in soup.find_all("link", rel="alternate"):
+        if link.get("type") in _FEED_TYPES and link.get("href"):
+            feed = await _get(urljoin(str(resp.url), link["href"]))
+            if feed is not None:
+                found.extend(_parse_feed(feed.text))
+    for a in soup.find_all("a", href=True):
+        found.append((urljoin(str(resp.url), a["href"]), None))
+    return found
+
+
+async def discover_urls(base_url: str) -> dict[str, str | None]:
+    """Candidate URLs under base_url -> advertised lastmod (None when unknown)."""
+    out: dict[str, str | None] = {base_url: None}
+    for batch in await asyncio.gather(_from_sitemaps(base_url), _from_page(base_url)):
+        for url, lastmod in batch:
+            url = urldefrag(url.strip())[0]
+            if _under(url, base_url) and (url not in out or lastmod):
+                out[url] = lastmod
+            if len(out) >= settings.scheduler_max_discovered:
+                return out
+    return out
+
+
+async def refresh_source(source: dict, url_budget: TokenBucket) -> dict:
+    """
+    Discover URLs for one source and enqueue crawl jobs for those that are new, still pending
+    (cut off by max_urls_per_run last time), advertise a different lastmod than when last enqueued, or
+    advertise none (base_url, in-page links, undated feed items) and were last enqueued an interval ago.
+    Re-crawls are conditional requests, so unchanged pages cost a 304 / content hash match.
+    """
+    discovered = await discover_urls(source["base_url"])
+    async with SessionLocal() as session:
+        # Undated URLs are re-crawled about once per refresh: due after half the interval, since jitter
+        # (and waiting on the URL budget) can bring two refreshes closer together than the interval.
+        known = {r.url: r for r in (await session.execute(text("""
+            SELECT url, lastmod, last_enqueued_at,
+                   last_enqueued_at < NOW() - make_interval(secs => :half_interval) AS expired
+            FROM source_urls WHERE source_id = :sid AND url = ANY(:urls)
+        """), {"sid": source["id"], "urls": list(discovered), "half_interval": source["crawl_interval_seconds"] / 2})).all()}
+
+        def priority(u: str, lastmod: str | None) -> int | None:
+            k = known.get(u)
+            if k is None or k.last_enqueued_at is None:
+                return 0
+            if lastmod and lastmod != k.lastmod:
+                return 1
+            if not lastmod and k.expired:
+                return 2
+            return None
+
+        # New and changed URLs first, so max_urls_per_run doesn't starve them behind periodic re-crawls.
+        ranked = [(p, u) for u, lastmod in discovered.items() if (p := priority(u, lastmod)) is not None]
+        todo = [u for _, u in sorted(ranked, key=lambda x: x[0])][: source["max_urls_per_run"]]
+        if discovered:
+            await session.execute(text("""
+                INSERT INTO source_urls(source_id, url)
+                VALUES (:sid, :url)
+                ON CONFLICT (source_id, url) DO UPDATE SET last_seen_at = NOW()
+            """), [{"sid": source["id"], "url": u} for u in discovered])
+            await session.commit()
+
+    for url in todo:
+        await url_budget.acquire()
+        await enqueue("crawl", {"url": url, "source_id": source["id"]})
+        async with SessionLocal() as session:
+            # lastmod is recorded at enqueue time, so a later change in the sitemap re-triggers the URL.
+            await session.execute(text("""
+                UPDATE source_urls SET last_enqueued_at = NOW(), lastmod = :lastmod
+                WHERE source_id = :sid AND url = :url
+            """), {"sid": source["id"], "url": url, "lastmod": discovered[url]})
+            await session.commit()
+    return {"source_id": source["id"], "discovered": len(discovered), "enqueued": len(todo)}
+
+
+async def _claim(source_id: int) -> dict | None:
+    """Atomically move a due source's next_crawl_at forward (interval +/- jitter); None if not due."""
+    jitter = 1 + random.uniform(-settings.scheduler_jitter, settings.scheduler_jitter)
+    async with SessionLocal() as session:
+        row = (await session.execute(text("""
+            UPDATE sources
+            SET next_crawl_at = NOW() + make_interval(secs => crawl_interval_seconds * :jitter),
+                last_crawled_at = NOW()
+            WHERE id = :id AND enabled AND next_crawl_at <= NOW()
+            RETURNING id, base_url, crawl_interval_seconds, max_urls_per_run, next_crawl_at
+        """), {"id": source_id, "jitter": jitter})).mappings().first()
+        await session.commit()
+    return dict(row) if row else None
+
+
+async def _load_heap() -> list[tuple[float, int]]:
+    async with SessionLocal() as session:
+        rows = (await session.execute(text("""
+            SELECT id, next_crawl_at FROM sources WHERE enabled ORDER BY next_crawl_at
+        """))).all()
+    heap = [(r.next_crawl_at.timestamp(), r.id) for r in rows]
+    heapq.heapify(heap)
+    return heap
+
+
+async def run_scheduler(stop: asyncio.Event) -> None:
+    """Refresh due sources until `stop` is set. Source refreshes and URL enqueues share rate budgets."""
+    refresh_budget = TokenBucket.per_minute(settings.scheduler_refreshes_per_minute)
+    url_budget = TokenBucket.per_minute(settings.scheduler_urls_per_minute, burst=settings.scheduler_urls_per_minute / 6)
+    inflight = asyncio.Semaphore(settings.scheduler_concurrency)
+    tasks: set[asyncio.Task] = set()
+    heap: list[tuple[float, int]] = []
+    reload_at = 0.0
+
+    async def run(source: dict) -> None:
+        async with inflight:
+            try:
+                r = await refresh_source(source, url_budget)
+                log.info("source %s refreshed: %s", source["id"], r)
+            except Exception:
+                log.exception("source %s refresh failed", source["id"])
+
+    log.info("source scheduler started")
+    while not stop.is_set():
+        try:
+            if time.monotonic() >= reload_at:
+                # Periodic reload picks up new, edited and disabled sources.
+                heap = await _load_heap()
+                reload_at = time.monotonic() + settings.scheduler_reload_interval
+            now = datetime.now(timezone.utc).timestamp()
+            while heap and heap[0][0] <= now and len(tasks) < settings.scheduler_concurrency * 4:
+                _, source_id = heapq.heappop(heap)
+                await refresh_budget.acquire()
+                source = await _claim(source_id)
+                if source is None:
+                    continue  # another scheduler got it, or it was rescheduled/disabled
+                heapq.heappush(heap, (source["next_crawl_at"].timestamp(), source_id))
+                t = asyncio.create_task(run(source))
+                tasks.add(t)
+                t.add_done_callback(tasks.discard)
+            next_due = heap[0][0] - datetime.now(timezone.utc).timestamp() if heap else settings.scheduler_reload_interval
+            sleep_for = max(1.0, min(next_due, reload_at - time.monotonic()))
+        except Exception:
+            log.exception("source scheduler tick failed")
+            sleep_for = settings.scheduler_reload_interval
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=sleep_for)
+        except asyncio.TimeoutError:
+            pass
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    log.info("source scheduler stopped")
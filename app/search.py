@@ -1,22 +1,270 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
+from . import query_cache
+from .metrics import stage
+from .settings import settings
+
+SEARCH_MODES = ("vector", "hybrid", "lexical")
+
+
+@dataclass
+class SearchFilters:
+    """
+    Restricts retrieval to matching chunks; set fields are ANDed, list fields match any element.
+    Applied inside the ranking query (denormalised chunk columns), not as a post-filter.
+    """
+    created_after: datetime | None = None  # documents.created_at >= (inclusive)
+    created_before: datetime | None = None  # documents.created_at < (exclusive)
+    source_ids: list[int] | None = None
+    url_prefixes: list[str] | None = None
+    document_ids: list[int] | None = None
+
+    @classmethod
+    def from_dict(cls, d: dict | None) -> "SearchFilters | None":
+        """From a JSON-ish dict (ISO date strings allowed); None when nothing is set."""
+        if not d:
+            return None
+        kw = {k: d.get(k) for k in ("created_after", "created_before", "source_ids", "url_prefixes", "document_ids")}
+        for k in ("created_after", "created_before"):
+            if isinstance(kw[k], str):
+                kw[k] = datetime.fromisoformat(kw[k])
+        f = cls(**kw)
+        return f if f.where()[0] else None
+
+    def where(self) -> tuple[str, dict]:
+        """(SQL conditions starting with ' AND ...' or '', bind params)."""
+        parts, params = [], {}
+        if self.created_after is not None:
+            parts.append("document_created_at >= :f_after")
+            params["f_after"] = _utc(self.created_after)
+        if self.created_before is not None:
+            parts.append("document_created_at < :f_before")
+            params["f_before"] = _utc(self.created_before)
+        if self.source_ids is not None:
+            parts.append("source_id = ANY(:f_sources)")
+            params["f_sources"] = list(self.source_ids)
+        if self.document_ids is not None:
+            parts.append("document_id = ANY(:f_docs)")
+            params["f_docs"] = list(self.document_ids)
+        if self.url_prefixes is not None:
+            # One LIKE per prefix (ORed) so each can use idx_chunks_url_pattern; LIKE ANY(array) can't.
+            likes = []
+            for i, prefix in enumerate(self.url_prefixes):
+                likes.append(f"url LIKE :f_url{i}")
+                params[f"f_url{i}"] = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            parts.append("(" + " OR ".join(likes) + ")" if likes else "FALSE")
+        return "".join(f" AND {p}" for p in parts), params
+
+
+def _utc(dt: datetime) -> datetime:
+    # Naive datetimes (e.g. "2025-10-01" from the API) are taken as UTC.
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+# :qvec is always bound as vector (binary codec in db.py); the halfvec operand is cast server-side.
+# Every query keeps to is_current chunks (latest version of each URL); the HNSW index is partial on it.
+
+# Exact scan over full-precision vectors (no index; use for ground truth / small corpora).
+_EXACT_SQL = """
+    SELECT
+      id,
+      document_id,
+      url,
+      chunk_index,
+      content,
+      1 - (embedding <=> CAST(:qvec AS vector)) AS score
+    FROM chunks
+    WHERE embedding IS NOT NULL AND is_current{where}
+    ORDER BY embedding <=> CAST(:qvec AS vector)
+    LIMIT :limit
+"""
+
+# HNSW over halfvec picks candidates; full vectors re-rank them so scores match the exact path.
+_ANN_SQL = """
+    WITH candidates AS (
+      SELECT id, document_id, url, chunk_index, content, embedding
+      FROM chunks
+      WHERE embedding_half IS NOT NULL AND is_current{where}
+      ORDER BY embedding_half <=> CAST(CAST(:qvec AS vector) AS halfvec)
+      LIMIT :candidates
+    )
+    SELECT
+      id,
+      document_id,
+      url,
+      chunk_index,
+      content,
+      1 - (embedding <=> CAST(:qvec AS vector)) AS score
+    FROM candidates
+    ORDER BY embedding <=> CAST(:qvec AS vector)
+    LIMIT :limit
+"""
+
+# Full-text (GIN on content_tsv): stemmed words, ranked by cover density.
+_FTS_SQL = """
+    SELECT id, document_id, url, chunk_index, content, ts_rank_cd(content_tsv, q) AS score
+    FROM chunks, websearch_to_tsquery('english', :q) AS q
+    WHERE content_tsv @@ q AND is_current{where}
+    ORDER BY score DESC
+    LIMIT :limit
+"""
+
+# Trigram word similarity (GIN gin_trgm_ops): exact-ish tokens full-text mangles ("S&P 500", "10.6%").
+_TRGM_SQL = """
+    SELECT id, document_id, url, chunk_index, content, word_similarity(:q, content) AS score
+    FROM chunks
+    WHERE :q <% content AND is_current{where}
+    ORDER BY score DESC
+    LIMIT :limit
+"""
+
+
+@lru_cache(maxsize=256)
+def _sql(template: str, where: str):
+    return text(template.format(where=where))
+
+
+def _where(filters: SearchFilters | None) -> tuple[str, dict]:
+    return filters.where() if filters else ("", {})
+
+
 async def similarity_search(
     session: AsyncSession,
     query_embedding: list[float],
     limit: int = 10,
+    *,
+    exact: bool | None = None,
+    filters: SearchFilters | None = None,
 ):
-    vec_literal = "[" + ",".join(str(x) for x in query_embedding) + "]"
-    sql = text("""
-        SELECT
-          url,
-          chunk_index,
-          content,
-          1 - (embedding <=> CAST(:qvec AS vector)) AS score
-        FROM chunks
-        WHERE embedding IS NOT NULL
-        ORDER BY embedding <=> CAST(:qvec AS vector)
-        LIMIT :limit
-    """)
-    rows = (await session.execute(sql, {"qvec": vec_literal, "limit": limit})).mappings().all()
+    where, params = _where(filters)
+    if exact is None:
+        # An explicit document list is a small, btree-indexed set: scan it exactly.
+        exact = settings.search_exact or bool(filters and filters.document_ids is not None)
+    if exact:
+        rows = (await session.execute(
+            _sql(_EXACT_SQL, where), {"qvec": query_embedding, "limit": limit, **params}
+        )).mappings().all()
+        return list(rows)
+
+    # HNSW returns at most ef_search rows, so it must cover the candidate pool (pgvector caps it at 1000).
+    candidates = min(max(limit * settings.ann_rerank_factor, limit), 1000)
+    ef_search = min(max(settings.ann_ef_search, candidates), 1000)
+    await session.execute(text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(ef_search)})
+    if where:
+        # Filtered ANN: keep walking the graph until enough rows pass the filter (pgvector >= 0.8)
+        # rather than filtering one ef_search-sized batch down to a handful. Re-ranking restores order.
+        await session.execute(text("""
+            SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true),
+                   set_config('hnsw.max_scan_tuples', :max_scan, true)
+        """), {"max_scan": str(settings.ann_max_scan_tuples)})
+    rows = (await session.execute(_sql(_ANN_SQL, where), {
+        "qvec": query_embedding,
+        "candidates": candidates,
+        "limit": limit,
+        **params,
+    })).mappings().all()
     return list(rows)
+
+
+async def lexical_search(
+    session: AsyncSession,
+    query: str,
+    limit: int = 10,
+    *,
+    filters: SearchFilters | None = None,
+) -> list[dict]:
+    """Full-text and trigram rankings fused with RRF. No embedding call."""
+    n = max(limit, settings.hybrid_candidates)
+    return _rrf([await _fts(session, query, n, filters), await _trgm(session, query, n, filters)], limit)
+
+
+async def hybrid_search(
+    session: AsyncSession,
+    query: str,
+    query_embedding: list[float],
+    limit: int = 10,
+    *,
+    filters: SearchFilters | None = None,
+) -> list[dict]:
+    """Vector, full-text and trigram rankings fused with reciprocal rank fusion."""
+    n = max(limit, settings.hybrid_candidates)
+    vector = await similarity_search(session, query_embedding, limit=n, filters=filters)
+    return _rrf([vector, await _fts(session, query, n, filters), await _trgm(session, query, n, filters)], limit)
+
+
+async def search_chunks(
+    session: AsyncSession,
+    query: str,
+    limit: int = 10,
+    *,
+    mode: str | None = None,
+    filters: SearchFilters | None = None,
+) -> list[dict]:
+    """
+    Retrieve chunks for a text query. mode: "vector" (embedding similarity), "hybrid"
+    (vector + lexical via RRF) or "lexical" (full-text + trigram only; skips embed_texts).
+    filters: optional SearchFilters (date window, sources, URL prefixes, document ids).
+    Query embeddings and results are cached (query_cache); results until the corpus generation moves.
+    """
+    mode = mode or settings.search_mode
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {mode}")
+    key = None
+    if settings.query_result_cache_enabled:
+        generation = await query_cache.corpus_generation(session)
+        key = (settings.openai_embed_model, generation, mode, query, limit, repr(filters))
+        cached = query_cache.get_results(key)
+        if cached is not None:
+            return cached
+
+    # Timed as search_<mode> (cache hits above are counted by the query cache, not timed).
+    with stage(f"search_{mode}"):
+        if mode == "lexical":
+            rows = await lexical_search(session, query, limit, filters=filters)
+        else:
+            qvec = await query_cache.embed_query(query)
+            if mode == "hybrid":
+                rows = await hybrid_search(session, query, qvec, limit, filters=filters)
+            else:
+                rows = [dict(r) for r in await similarity_search(session, qvec, limit=limit, filters=filters)]
+    if key is not None:
+        query_cache.put_results(key, rows)
+    return rows
+
+
+async def _fts(session: AsyncSession, query: str, limit: int, filters: SearchFilters | None) -> list:
+    where, params = _where(filters)
+    return list((await session.execute(_sql(_FTS_SQL, where), {"q": query, "limit": limit, **params})).mappings().all())
+
+
+async def _trgm(session: AsyncSession, query: str, limit: int, filters: SearchFilters | None) -> list:
+    where, params = _where(filters)
+    await session.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :t, true)"),
+        {"t": str(settings.trgm_threshold)},
+    )
+    return list((await session.execute(_sql(_TRGM_SQL, where), {"q": query, "limit": limit, **params})).mappings().all())
+
+
+def _rrf(rankings: list[list], limit: int) -> list[dict]:
+    """Reciprocal rank fusion: score = sum over rankings of 1 / (RRF_K + rank)."""
+    fused: dict[int, dict] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            hit = fused.get(row["id"])
+            if hit is None:
+                hit = fused[row["id"]] = {
+                    "id": row["id"],
+                    "document_id": row["document_id"],
+                    "url": row["url"],
+                    "chunk_index": row["chunk_index"],
+                    "content": row["content"],
+                    "score": 0.0,
+                }
+            hit["score"] += 1.0 / (settings.rrf_k + rank)
+    return sorted(fused.values(), key=lambda h: h["score"], reverse=True)[:limit]
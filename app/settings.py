@@ -11,7 +11,105 @@ class Settings(BaseSettings):
     # Crawl4AI Docker container base URL (e.g. http://crawl4ai:11235 in compose)
     crawl4ai_base_url: str = "http://localhost:11235"
 
-    chunk_size: int = 1200
-    chunk_overlap: int = 150
+    # Shared outbound HTTP pool (Crawl4AI + PDF hosts); keep-alive connections are reused per host.
+    http2: bool = True
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 40
+    http_keepalive_expiry: float = 60.0
+
+    # PDF extraction: process pool size and per-document guards (download bytes, pages, seconds).
+    pdf_workers: int = 2
+    pdf_max_bytes: int = 100 * 1024 * 1024
+    pdf_max_pages: int = 1500
+    pdf_timeout: float = 180.0
+
+    # Batch crawl (/crawl/batch): global fetch concurrency and per-host politeness.
+    crawl_concurrency: int = 8
+    crawl_per_host_concurrency: int = 2
+    crawl_per_host_delay: float = 1.0
+    crawl_batch_max_urls: int = 1000
+
+    # Bulk uploads (POST /ingest/upload): parsed documents buffered ahead of the workers (backpressure bound),
+    # documents ingested concurrently, and the largest accepted document (markdown or PDF bytes).
+    upload_queue_size: int = 8
+    upload_concurrency: int = 4
+    upload_max_document_bytes: int = 50 * 1024 * 1024
+
+    # Background jobs (jobs table): workers inside the API process; add `python -m app.worker` to scale out.
+    jobs_inprocess_workers: int = 1
+    jobs_poll_interval: float = 2.0
+    jobs_max_attempts: int = 3
+    jobs_heartbeat_interval: float = 30.0
+    jobs_lock_timeout: float = 300.0
+
+    # Source scheduler (app/scheduler.py): runs in the API process when enabled; claims are atomic, so
+    # extra schedulers (python -m app.worker --scheduler) are safe but share no rate budget.
+    scheduler_enabled: bool = True
+    scheduler_reload_interval: float = 60.0
+    scheduler_concurrency: int = 4
+    scheduler_jitter: float = 0.1
+    scheduler_refreshes_per_minute: float = 30.0
+    scheduler_urls_per_minute: float = 120.0
+    scheduler_max_discovered: int = 5000
+
+    # OpenAI gateway (openai_gateway.py): one pooled client for every call, per-process request/token per-minute
+    # budgets (0 = unlimited), max requests in flight across all operations, and retries on 429/5xx.
+    openai_max_connections: int = 50
+    openai_timeout: float = 600.0
+    openai_rpm: float = 0
+    openai_tpm: float = 0
+    openai_concurrency: int = 16
+    openai_max_retries: int = 5
+
+    # Embedding requests: per-request token/input budgets, max requests in flight, retries on 429/5xx.
+    embed_batch_max_tokens: int = 100_000
+    embed_batch_max_inputs: int = 512
+    embed_concurrency: int = 4
+    embed_max_retries: int = 5
+    # Content-addressed embedding cache (Postgres embedding_cache + in-process LRU of this many vectors).
+    embed_cache_enabled: bool = True
+    embed_cache_size: int = 4096
+
+    # Retention (retention.py): superseded document versions stay stored (out of search) this many days,
+    # then their chunks/embeddings are deleted in batches; optionally the version rows as well.
+    retention_days: float = 30.0
+    retention_delete_documents: bool = False
+    retention_batch_size: int = 500
+
+    # Chunking (ingest.py): token budget per chunk (embed model tokenizer), overlap carried as whole
+    # blocks, and the heading level at which packing restarts (keeps unchanged sections' chunks stable).
+    chunk_max_tokens: int = 350
+    chunk_overlap_tokens: int = 40
+    chunk_heading_level: int = 3
+
+    # Vector search: HNSW over chunks.embedding_half, top limit*factor candidates re-ranked on full vectors.
+    search_exact: bool = False
+    ann_rerank_factor: int = 4
+    ann_ef_search: int = 100
+    # Filtered ANN (pgvector iterative scan): max index tuples visited looking for rows that pass the filter.
+    ann_max_scan_tuples: int = 20000
+    # Retrieval mode for /query, /report and newsletters: vector | hybrid | lexical (no embedding call).
+    search_mode: str = "vector"
+    hybrid_candidates: int = 50
+    rrf_k: int = 60
+    trgm_threshold: float = 0.5
+    # RAG prompt context (context.py): token budget (generation model tokenizer) and the shingle
+    # containment above which a lower-ranked snippet counts as a near-duplicate.
+    context_max_tokens: int = 12000
+    context_dedup_threshold: float = 0.8
+    # Query-side caches (query_cache.py): query embeddings, and top-k results until new chunks are ingested.
+    query_embed_cache_size: int = 1024
+    query_embed_cache_ttl: float = 86400.0
+    query_result_cache_enabled: bool = True
+    query_result_cache_size: int = 512
+    query_result_cache_ttl: float = 600.0
+
+    # Newsletter runs (newsletter.py): a regenerate reuses the run's stored crawl results and web search answer
+    # for this many seconds (other stages are reused for as long as their inputs are unchanged).
+    newsletter_stage_ttl: float = 86400.0
+
+    # Tracing: OpenTelemetry spans per pipeline stage (metrics.py) when opentelemetry-api is installed.
+    # Exporters are configured by the SDK / opentelemetry-instrument from the standard OTEL_* variables.
+    otel_enabled: bool = False
 
 settings = Settings()
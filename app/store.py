@@ -0,0 +1,186 @@
+# app/store.py — shared ingest writer: documents (one latest version per URL; older ones archived by
+# content_store), chunks (bulk COPY, binary vectors) and crawl_runs audit rows.
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .content_store import archive_superseded, unarchive
+from .embeddings import embed_texts
+from .ingest import chunk_text
+from .metrics import count_crawl, stage
+
+_CHUNK_COLUMNS = ["document_id", "url", "chunk_index", "content", "embedding"]
+
+
+async def record_crawl_run(
+    session: AsyncSession,
+    *,
+    source_id: int | None,
+    url: str,
+    status: str,
+    error: str | None = None,
+    http_status: int | None = None,
+) -> None:
+    count_crawl(status)
+    await session.execute(text("""
+      INSERT INTO crawl_runs(source_id, url, status, http_status, error)
+      VALUES (:sid, :url, :status, :hs, :err)
+    """), {"sid": source_id, "url": url, "status": status, "hs": http_status, "err": error})
+
+
+async def get_url_validators(session: AsyncSession, url: str) -> dict | None:
+    """ETag / Last-Modified / content_hash / document_id remembered from the last crawl of url."""
+    row = (await session.execute(text("""
+      SELECT etag, last_modified, content_hash, document_id FROM url_validators WHERE url = :url
+    """), {"url": url})).mappings().first()
+    return dict(row) if row else None
+
+
+async def save_url_validators(
+    session: AsyncSession,
+    url: str,
+    *,
+    etag: str | None,
+    last_modified: str | None,
+    content_hash: str | None,
+    document_id: int | None,
+    changed: bool,
+) -> None:
+    await session.execute(text("""
+      INSERT INTO url_validators(url, etag, last_modified, content_hash, document_id, checked_at, changed_at)
+      VALUES (:url, :etag, :lm, :h, :did, NOW(), NOW())
+      ON CONFLICT (url) DO UPDATE SET
+        -- New content: exactly the validators it came with (a dropped ETag must not keep matching the old
+        -- body). Unchanged (304 / same hash): keep the stored ones where the response didn't repeat them.
+        etag = CASE WHEN :changed THEN EXCLUDED.etag ELSE COALESCE(EXCLUDED.etag, url_validators.etag) END,
+        last_modified = CASE WHEN :changed THEN EXCLUDED.last_modified
+                             ELSE COALESCE(EXCLUDED.last_modified, url_validators.last_modified) END,
+        content_hash = COALESCE(EXCLUDED.content_hash, url_validators.content_hash),
+        document_id = COALESCE(EXCLUDED.document_id, url_validators.document_id),
+        checked_at = NOW(),
+        changed_at = CASE WHEN :changed THEN NOW() ELSE url_validators.changed_at END
+    """), {"url": url, "etag": etag, "lm": last_modified, "h": content_hash, "did": document_id, "changed": changed})
+
+
+async def upsert_document(
+    session: AsyncSession,
+    *,
+    source_id: int | None,
+    url: str,
+    title: str | None,
+    markdown: str,
+    content_hash: str,
+) -> int:
+    """
+    Insert a document version, or return the id of the existing (url, content_hash) row.
+    Either way it becomes the URL's latest version (mark_latest).
+    """
+    doc_id = (await session.execute(text("""
+      INSERT INTO documents(source_id, url, title, content_markdown, content_hash, is_latest)
+      VALUES (:sid, :url, :title, :md, :h, FALSE)
+      ON CONFLICT (url, content_hash) DO NOTHING
+      RETURNING id
+    """), {"sid": source_id, "url": url, "title": title, "md": markdown, "h": content_hash})).scalar_one_or_none()
+    if doc_id is None:
+        doc_id = (await session.execute(
+            text("SELECT id FROM documents WHERE url=:url AND content_hash=:h ORDER BY id DESC LIMIT 1"),
+            {"url": url, "h": content_hash},
+        )).scalar_one()
+    await mark_latest(session, url, doc_id)
+    return doc_id
+
+
+async def mark_latest(session: AsyncSession, url: str, document_id: int) -> None:
+    """
+    Make document_id the searchable version of url: the previous latest version and its chunks are flagged
+    superseded (retention.py collects them later) and its text archived as compressed blocks. Also used
+    when a URL reverts to an older stored version. Caller commits.
+    """
+    # Serialises writers of one URL until commit; idx_documents_latest_url allows a single latest row.
+    await session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:url))"), {"url": url})
+    demoted = (await session.execute(text("""
+      UPDATE documents SET is_latest = FALSE, superseded_at = NOW()
+      WHERE url = :url AND is_latest AND id <> :id
+      RETURNING id
+    """), {"url": url, "id": document_id})).scalars().all()
+    if demoted:
+        await session.execute(text("""
+          UPDATE chunks SET is_current = FALSE WHERE document_id = ANY(:ids) AND is_current
+        """), {"ids": list(demoted)})
+    promoted = (await session.execute(text("""
+      UPDATE documents SET is_latest = TRUE, superseded_at = NULL WHERE id = :id AND NOT is_latest
+      RETURNING content_markdown IS NULL
+    """), {"id": document_id})).scalar_one_or_none()
+    if promoted is not None:
+        await session.execute(text("""
+          UPDATE chunks SET is_current = TRUE WHERE document_id = :id AND NOT is_current
+        """), {"id": document_id})
+        if promoted:
+            await unarchive(session, document_id)
+    if demoted:
+        await archive_superseded(session, url, document_id)
+
+
+async def insert_chunks(
+    session: AsyncSession,
+    document_id: int,
+    url: str,
+    chunks: list[str],
+    vectors: list[list[float]],
+) -> int:
+    """
+    Write all chunks of a document in one COPY (binary vectors) into a session-local staging
+    table, then move them into chunks with ON CONFLICT DO NOTHING so re-ingesting an existing
+    document stays idempotent. source_id / document_created_at / is_current are copied from the
+    document for filtered search. Runs inside the session's transaction; returns rows inserted.
+    """
+    if not chunks:
+        return 0
+    await session.execute(text("""
+      CREATE TEMP TABLE IF NOT EXISTS chunks_stage (
+        document_id BIGINT, url TEXT, chunk_index INT, content TEXT, embedding vector
+      ) ON COMMIT DELETE ROWS
+    """))
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "chunks_stage",
+        records=[(document_id, url, i, ch, vec) for i, (ch, vec) in enumerate(zip(chunks, vectors))],
+        columns=_CHUNK_COLUMNS,
+    )
+    result = await session.execute(text("""
+      INSERT INTO chunks(
+        document_id, url, chunk_index, content, embedding, source_id, document_created_at, is_current
+      )
+      SELECT s.document_id, s.url, s.chunk_index, s.content, s.embedding, d.source_id, d.created_at, d.is_latest
+      FROM chunks_stage s
+      JOIN documents d ON d.id = s.document_id
+      ON CONFLICT (document_id, chunk_index) DO NOTHING
+    """))
+    await session.execute(text("TRUNCATE chunks_stage"))
+    return result.rowcount
+
+
+async def ingest_crawled(session: AsyncSession, data: dict, source_id: int | None = None) -> dict:
+    """
+    Store a crawl_url() result: document row, chunks and embeddings. Caller commits.
+    Embeds before touching the DB so the session holds no pooled connection while OpenAI works.
+    Returns {document_id, chunks}.
+    """
+    md = data["markdown"]
+    # Tokenising a large document is CPU work; keep it off the event loop.
+    with stage("chunk"):
+        chunks = chunk_text(md) if len(md) < 50_000 else await asyncio.to_thread(chunk_text, md)
+    vectors = await embed_texts(chunks)
+    with stage("store"):
+        doc_id = await upsert_document(
+            session,
+            source_id=source_id,
+            url=data["url"],
+            title=data["title"],
+            markdown=data["markdown"],
+            content_hash=data["content_hash"],
+        )
+        await insert_chunks(session, doc_id, data["url"], chunks, vectors)
+    return {"document_id": doc_id, "chunks": len(chunks)}
@@ -0,0 +1,333 @@
+# app/upload.py — bulk ingestion of uploaded documents (POST /ingest/upload), NDJSON or multipart.
+# The body is parsed as it streams in: markdown is kept in memory, PDFs are spooled to temp files and
+# extracted in the PDF process pool. Parsed documents wait in a queue of UPLOAD_QUEUE_SIZE for
+# UPLOAD_CONCURRENCY workers running pipeline.ingest_content (chunk -> embed -> store). When the workers fall
+# behind, the reader stops pulling the request body, so memory stays bounded whatever the upload size.
+import asyncio
+import base64
+import binascii
+import json
+import os
+import re
+import tempfile
+import time
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from .db import SessionLocal
+from .pdf import PdfRejected, extract_pdf
+from .pipeline import IngestError, ingest_content
+from .settings import settings
+
+_HEADING = re.compile(r"^#{1,6}\s+(.+)$", re.MULTILINE)
+
+
+class UploadError(Exception):
+    """Malformed upload; message is safe to return to the client."""
+
+
+@dataclass
+class UploadedDocument:
+    url: str
+    title: str | None = None
+    markdown: str | None = None
+    pdf_path: str | None = None  # temp file, removed once extracted
+    error: str | None = None  # rejected while parsing; reported as a failed result
+
+    def discard(self) -> None:
+        if self.pdf_path:
+            try:
+                os.unlink(self.pdf_path)
+            except OSError:
+                pass
+            self.pdf_path = None
+
+
+def _title_from(markdown: str, fallback: str | None) -> str | None:
+    m = _HEADING.search(markdown[:10_000])
+    return m.group(1).strip() if m else fallback
+
+
+def _spool_pdf(data: bytes) -> str:
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+    return f.name
+
+
+def _pdf_limit() -> int:
+    return min(settings.pdf_max_bytes, settings.upload_max_document_bytes)
+
+
+# --- NDJSON: one {"url", "title"?, "markdown"} or {"url", "title"?, "pdf_base64"} object per line ---
+
+async def _lines(stream: AsyncIterator[bytes], limit: int) -> AsyncIterator[bytes | None]:
+    """Lines of a byte stream; None stands in for a line longer than limit (its bytes are dropped)."""
+    buf = bytearray()
+    oversized = False
+    async for chunk in stream:
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            end = len(chunk) if nl < 0 else nl
+            if not oversized:
+                buf += chunk[start:end]
+                if len(buf) > limit:
+                    oversized = True
+                    buf.clear()
+            if nl < 0:
+                break
+            yield None if oversized else bytes(buf)
+            buf.clear()
+            oversized = False
+            start = nl + 1
+    if oversized:
+        yield None
+    elif buf.strip():
+        yield bytes(buf)
+
+
+async def _ndjson_document(obj: dict, line_no: int, url_prefix: str) -> UploadedDocument:
+    url = obj.get("url") or (url_prefix + obj["filename"] if obj.get("filename") else None)
+    if not url:
+        return UploadedDocument(url=f"line:{line_no}", error="Missing url (or filename).")
+    title = obj.get("title")
+    if obj.get("pdf_base64"):
+        try:
+            data = await asyncio.to_thread(base64.b64decode, obj["pdf_base64"], validate=True)
+        except (binascii.Error, ValueError):
+            return UploadedDocument(url=url, error="pdf_base64 is not valid base64.")
+        if len(data) > _pdf_limit():
+            return UploadedDocument(url=url, error=f"PDF exceeds {_pdf_limit()} bytes")
+        return UploadedDocument(url=url, title=title, pdf_path=await asyncio.to_thread(_spool_pdf, data))
+    if not isinstance(obj.get("markdown"), str):
+        return UploadedDocument(url=url, error="Each line needs markdown or pdf_base64.")
+    if len(obj["markdown"]) > settings.upload_max_document_bytes:
+        return UploadedDocument(url=url, error=f"Document exceeds {settings.upload_max_document_bytes} bytes")
+    return UploadedDocument(url=url, title=title or _title_from(obj["markdown"], None), markdown=obj["markdown"])
+
+
+async def iter_ndjson(stream: AsyncIterator[bytes], url_prefix: str) -> AsyncIterator[UploadedDocument]:
+    # Base64 PDFs are a third larger than the bytes they carry.
+    limit = settings.upload_max_document_bytes * 4 // 3 + 4096
+    line_no = 0
+    async for line in _lines(stream, limit):
+        line_no += 1
+        if line is None:
+            yield UploadedDocument(url=f"line:{line_no}", error=f"Line exceeds {limit} bytes.")
+            continue
+        if not line.strip():
+            continue
+        try:
+            # Large lines are parsed off the event loop.
+            obj = json.loads(line) if len(line) < 1 << 20 else await asyncio.to_thread(json.loads, line)
+        except ValueError as e:
+            yield UploadedDocument(url=f"line:{line_no}", error=f"Invalid JSON: {e}")
+            continue
+        if not isinstance(obj, dict):
+            yield UploadedDocument(url=f"line:{line_no}", error="Each line must be a JSON object.")
+            continue
+        yield await _ndjson_document(obj, line_no, url_prefix)
+
+
+# --- multipart/form-data: one document per file part; a "url" field names the file part after it ---
+
+def multipart_boundary(content_type: str) -> bytes:
+    _, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise UploadError("multipart/form-data upload without a boundary.")
+    return boundary
+
+
+class _Parts:
+    """python-multipart callbacks -> completed UploadedDocuments (file parts written as they arrive)."""
+
+    def __init__(self, url_prefix: str):
+        self.url_prefix = url_prefix
+        self.done: deque[UploadedDocument] = deque()
+        self._next_url: str | None = None
+        self._file = None
+        self._field = b""
+        self._value = b""
+        self._headers: dict[bytes, bytes] = {}
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._name = self._filename = None
+        self._file = None
+        self._buf = bytearray()
+        self._size = 0
+        self._error: str | None = None
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        self._filename = filename.decode("utf-8", "replace") if filename is not None else None
+        content_type = self._headers.get(b"content-type", b"").split(b";")[0].strip().lower()
+        if self._filename is not None and (content_type == b"application/pdf" or self._filename.lower().endswith(".pdf")):
+            self._file = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._error:
+            return
+        self._size += end - start
+        limit = _pdf_limit() if self._file else settings.upload_max_document_bytes
+        if self._size > limit:
+            self._error = f"{'PDF' if self._file else 'Document'} exceeds {limit} bytes"
+            self._buf.clear()
+            return
+        if self._file:
+            self._file.write(data[start:end])
+        else:
+            self._buf += data[start:end]
+
+    def on_part_end(self) -> None:
+        if self._filename is None:
+            # Plain form field: only "url" is meaningful, for the next file part.
+            if self._name == "url":
+                self._next_url = self._buf.decode("utf-8", "replace").strip() or None
+            return
+        url = self._next_url or self.url_prefix + self._filename
+        self._next_url = None
+        doc = UploadedDocument(url=url, error=self._error)
+        if self._file:
+            self._file.close()
+            doc.pdf_path = self._file.name
+            if self._error:
+                doc.discard()
+        elif not self._error:
+            doc.markdown = self._buf.decode("utf-8", "replace")
+            doc.title = _title_from(doc.markdown, self._filename)
+        self.done.append(doc)
+
+    def close(self) -> None:
+        # Abandoned mid-part (client disconnected or malformed body): drop the partial temp file.
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+            UploadedDocument(url="", pdf_path=self._file.name).discard()
+
+
+async def iter_multipart(
+    stream: AsyncIterator[bytes],
+    content_type: str,
+    url_prefix: str,
+) -> AsyncIterator[UploadedDocument]:
+    parts = _Parts(url_prefix)
+    callbacks = {name: getattr(parts, name) for name in (
+        "on_part_begin", "on_header_field", "on_header_value", "on_header_end", "on_headers_finished",
+        "on_part_data", "on_part_end",
+    )}
+    parser = MultipartParser(multipart_boundary(content_type), callbacks)
+    try:
+        async for chunk in stream:
+            try:
+                parser.write(chunk)
+            except Exception as e:
+                raise UploadError(f"Malformed multipart body: {e}") from e
+            while parts.done:
+                yield parts.done.popleft()
+        parser.finalize()
+    finally:
+        parts.close()
+        while parts.done:
+            parts.done.popleft().discard()
+
+
+# --- Workers ---
+
+async def _ingest_one(doc: UploadedDocument, source_id: int | None) -> dict:
+    t0 = time.perf_counter()
+    out = {"event": "result", "url": doc.url}
+    try:
+        if doc.error:
+            raise IngestError(doc.error)
+        markdown, title = doc.markdown or "", doc.title
+        if doc.pdf_path:
+            try:
+                extracted = await extract_pdf(doc.pdf_path)
+            finally:
+                doc.discard()
+            markdown, title = extracted["markdown"], title or extracted["title"]
+        async with SessionLocal() as session:
+            r = await ingest_content(session, doc.url, title=title, markdown=markdown, source_id=source_id)
+        out.update(status=r["status"], document_id=r["document_id"], chunks=r["chunks"])
+    except (IngestError, PdfRejected) as e:
+        out.update(status="failed", error=str(e))
+    except Exception as e:
+        out.update(status="failed", error=f"{type(e).__name__}: {e}")
+    out["elapsed_ms"] = round((time.perf_counter() - t0) * 1000)
+    return out
+
+
+async def ingest_uploads(docs: AsyncIterator[UploadedDocument], source_id: int | None = None) -> AsyncIterator[dict]:
+    """
+    Ingest parsed uploads with UPLOAD_CONCURRENCY workers, yielding one result per document as it finishes,
+    then a summary. A body that stops parsing (malformed, client gone) yields an error event; documents
+    already parsed are still ingested.
+    """
+    started = time.perf_counter()
+    queue: asyncio.Queue[UploadedDocument | None] = asyncio.Queue(maxsize=settings.upload_queue_size)
+    # Unbounded but tiny: workers must never wait on a client that is slow to read results.
+    results: asyncio.Queue[dict | None] = asyncio.Queue()
+    n_workers = max(1, settings.upload_concurrency)
+
+    async def read() -> None:
+        try:
+            # aclosing: if this task is cancelled, the parser's temp-file cleanup still runs.
+            async with aclosing(docs):
+                async for doc in docs:
+                    await queue.put(doc)
+        except Exception as e:
+            detail = str(e) if isinstance(e, UploadError) else f"{type(e).__name__}: {e}"
+            await results.put({"event": "error", "detail": detail})
+        for _ in range(n_workers):
+            await queue.put(None)
+
+    async def work() -> None:
+        while (doc := await queue.get()) is not None:
+            await results.put(await _ingest_one(doc, source_id))
+        await results.put(None)
+
+    tasks = [asyncio.create_task(read())] + [asyncio.create_task(work()) for _ in range(n_workers)]
+    counts = {"success": 0, "unchanged": 0, "failed": 0}
+    try:
+        finished = 0
+        while finished < n_workers:
+            r = await results.get()
+            if r is None:
+                finished += 1
+                continue
+            if r["event"] == "result":
+                counts[r["status"]] += 1
+            yield r
+    finally:
+        # Consumer went away: stop reading and ingesting, drop spooled PDFs still queued.
+        for t in tasks:
+            t.cancel()
+        while not queue.empty():
+            doc = queue.get_nowait()
+            if doc is not None:
+                doc.discard()
+    yield {
+        "event": "summary",
+        "total": sum(counts.values()),
+        "succeeded": counts["success"],
+        "unchanged": counts["unchanged"],
+        "failed": counts["failed"],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000),
+    }
@@ -0,0 +1,39 @@
+# app/worker.py — standalone job worker process: python -m app.worker [--concurrency N] [--scheduler] [--metrics-port P]
+import argparse
+import asyncio
+import logging
+import signal
+
+from prometheus_client import start_http_server
+
+from . import http_client, openai_gateway, pdf
+from .jobs import run_worker
+from .scheduler import run_scheduler
+
+
+async def main(concurrency: int, scheduler: bool) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    tasks = [run_worker(str(i), stop) for i in range(concurrency)]
+    if scheduler:
+        tasks.append(run_scheduler(stop))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        await http_client.shutdown()
+        await openai_gateway.shutdown()
+        pdf.shutdown()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=2, help="jobs run in parallel by this process")
+    ap.add_argument("--scheduler", action="store_true", help="also run the source refresh scheduler")
+    ap.add_argument("--metrics-port", type=int, help="serve Prometheus /metrics for this process on this port")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    asyncio.run(main(args.concurrency, args.scheduler))
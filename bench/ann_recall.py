@@ -0,0 +1,83 @@
+# bench/ann_recall.py — recall@k vs latency of the HNSW/halfvec search path against the exact scan.
+# Run against a populated DB (uses DATABASE_URL from .env): python -m bench.ann_recall --queries 50 --k 10
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.db import SessionLocal
+from app.search import similarity_search
+from app.settings import settings
+
+
+async def _sample_queries(n: int) -> list[list[float]]:
+    # Existing chunk embeddings (plus a little noise) are realistic query vectors.
+    async with SessionLocal() as session:
+        rows = (await session.execute(text("""
+            SELECT embedding FROM chunks TABLESAMPLE SYSTEM (10)
+            WHERE embedding IS NOT NULL LIMIT :n
+        """), {"n": n})).scalars().all()
+        if len(rows) < n:
+            rows = (await session.execute(text("""
+                SELECT embedding FROM chunks WHERE embedding IS NOT NULL ORDER BY random() LIMIT :n
+            """), {"n": n})).scalars().all()
+    rng = random.Random(0)
+    return [[x + rng.gauss(0, 0.01) for x in r] for r in rows]
+
+
+def _key(row) -> tuple:
+    return (row["url"], row["chunk_index"])
+
+
+async def _run(queries: list[list[float]], k: int, exact: bool) -> tuple[list[list[tuple]], list[float]]:
+    results, latencies = [], []
+    async with SessionLocal() as session:
+        for q in queries:
+            t0 = time.perf_counter()
+            rows = await similarity_search(session, q, limit=k, exact=exact)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            results.append([_key(r) for r in rows])
+        await session.rollback()
+    return results, latencies
+
+
+def _summary(latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(ordered[max(0, int(len(ordered) * 0.95) - 1)], 2),
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--factors", default="1,2,4,8")
+    ap.add_argument("--ef", default="40,100,200")
+    args = ap.parse_args()
+
+    queries = await _sample_queries(args.queries)
+    if not queries:
+        raise SystemExit("No embedded chunks found; crawl some documents first.")
+    truth, exact_lat = await _run(queries, args.k, exact=True)
+    report = {"queries": len(queries), "k": args.k, "exact": _summary(exact_lat), "ann": []}
+
+    for factor in (int(x) for x in args.factors.split(",")):
+        for ef in (int(x) for x in args.ef.split(",")):
+            settings.ann_rerank_factor, settings.ann_ef_search = factor, ef
+            found, lat = await _run(queries, args.k, exact=False)
+            recall = statistics.mean(
+                len(set(f) & set(t)) / max(1, len(t)) for f, t in zip(found, truth)
+            )
+            report["ann"].append({"rerank_factor": factor, "ef_search": ef, "recall": round(recall, 4), **_summary(lat)})
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
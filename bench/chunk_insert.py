@@ -0,0 +1,61 @@
+# bench/chunk_insert.py — rows/second for chunk writes: legacy per-row text INSERT vs store.insert_chunks (COPY, binary).
+# Every run happens in a rolled-back transaction against a scratch document, so the DB is left unchanged.
+# python -m bench.chunk_insert --rows 300
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from sqlalchemy import text
+
+from app.db import SessionLocal
+from app.store import insert_chunks, upsert_document
+
+DIMS = 3072  # chunks.embedding is vector(3072)
+
+
+async def _legacy(session, doc_id: int, url: str, chunks: list[str], vectors: list[list[float]]) -> None:
+    # The pre-store.py path: one round trip per chunk, vectors as decimal text parsed by CAST.
+    for idx, (ch, vec) in enumerate(zip(chunks, vectors)):
+        vec_literal = "[" + ",".join(str(x) for x in vec) + "]"
+        await session.execute(text("""
+          INSERT INTO chunks(document_id, url, chunk_index, content, embedding)
+          VALUES (:did, :url, :i, :c, CAST(CAST(:e AS text) AS vector))
+          ON CONFLICT (document_id, chunk_index) DO NOTHING
+        """), {"did": doc_id, "url": url, "i": idx, "c": ch, "e": vec_literal})
+
+
+async def _time(writer, chunks: list[str], vectors: list[list[float]]) -> float:
+    url = f"bench://chunk-insert/{random.random()}"
+    async with SessionLocal() as session:
+        doc_id = await upsert_document(
+            session, source_id=None, url=url, title=None, markdown="bench", content_hash=url
+        )
+        t0 = time.perf_counter()
+        await writer(session, doc_id, url, chunks, vectors)
+        elapsed = time.perf_counter() - t0
+        await session.rollback()
+    return elapsed
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=300)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    chunks = [f"bench chunk {i} " + "lorem ipsum " * 100 for i in range(args.rows)]
+    vectors = [[rng.uniform(-1, 1) for _ in range(DIMS)] for _ in range(args.rows)]
+
+    report = {"rows": args.rows, "dims": DIMS}
+    for name, writer in (("legacy_per_row", _legacy), ("copy_binary", insert_chunks)):
+        best = min([await _time(writer, chunks, vectors) for _ in range(args.repeat)])
+        report[name] = {"seconds": round(best, 3), "rows_per_s": round(args.rows / best, 1)}
+    report["speedup"] = round(report["copy_binary"]["rows_per_s"] / report["legacy_per_row"]["rows_per_s"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,173 @@
+# bench/corpus.py — deterministic fixture corpus for the offline bench suite: market-commentary style
+# documents rendered as HTML pages (served to the fake Crawl4AI) and as text PDFs (fetched and parsed by
+# the local pypdf path). Same --seed, same corpus; `nonce` only changes one line per document so a fresh
+# suite run misses the embedding cache without changing document sizes.
+# python -m bench.corpus --docs 200 --pdf-ratio 0.2 --out /tmp/corpus   (writes the files for inspection)
+import argparse
+import html
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+WORDS = (
+    "equities bonds yields inflation earnings guidance revenue margin spread duration credit liquidity "
+    "central bank policy rate growth value momentum volatility dividend allocation region sector outlook"
+).split()
+_NAMES = ["Aurora", "Bluefin", "Cedar", "Delta", "Ember", "Falcon", "Granite", "Harbor", "Iris", "Juniper"]
+_KINDS = ["Growth", "Income", "Value", "Global", "Tech", "Bond"]
+
+
+@dataclass
+class Doc:
+    path: str  # URL path on the fake origin, e.g. /corpus/12.html
+    title: str
+    markdown: str
+    fund: str
+    ticker: str
+
+    @property
+    def is_pdf(self) -> bool:
+        return self.path.endswith(".pdf")
+
+
+def _paragraph(rng: random.Random) -> str:
+    sentences = (
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        for _ in range(rng.randint(2, 7))
+    )
+    return " ".join(sentences)
+
+
+def _markdown(rng: random.Random, title: str, fund: str, ticker: str, nonce: str) -> str:
+    parts = [f"# {title}", f"Fixture run {nonce}." if nonce else "Fixture document."]
+    parts.append(f"{fund} ({ticker}) returned {rng.uniform(-15, 25):.1f}% in Q{rng.randint(1, 4)} {rng.choice([2024, 2025])}.")
+    for s in range(rng.randint(2, 6)):
+        parts.append(f"## {rng.choice(WORDS).title()} review {s}")
+        parts.extend(_paragraph(rng) for _ in range(rng.randint(1, 5)))
+        if rng.random() < 0.3:
+            rows = "\n".join(f"| {rng.choice(WORDS)} | {rng.uniform(-10, 20):.1f}% |" for _ in range(rng.randint(3, 15)))
+            parts.append("| Asset | Return |\n|---|---|\n" + rows)
+    return "\n\n".join(parts)
+
+
+def generate(n_docs: int, *, pdf_ratio: float = 0.2, seed: int = 0, nonce: str = "") -> list[Doc]:
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n_docs):
+        fund = f"{rng.choice(_NAMES)} {rng.choice(_KINDS)} Fund {i}"
+        ticker = "".join(rng.choice("ABCDEFGHKLMNPRSTVWXZ") for _ in range(4)) + str(i % 10)
+        title = f"{fund} quarterly commentary"
+        ext = "pdf" if rng.random() < pdf_ratio else "html"
+        docs.append(Doc(f"/corpus/{i}.{ext}", title, _markdown(rng, title, fund, ticker, nonce), fund, ticker))
+    return docs
+
+
+def queries(docs: list[Doc], n: int, seed: int = 0) -> list[str]:
+    """Query mix: fund names, tickers and topical phrases drawn from the corpus."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        d = rng.choice(docs)
+        kind = rng.random()
+        if kind < 0.4:
+            out.append(f"{d.fund} performance")
+        elif kind < 0.6:
+            out.append(f"{d.ticker} returns")
+        else:
+            out.append(" ".join(rng.sample(WORDS, 4)))
+    return out
+
+
+def to_html(doc: Doc) -> bytes:
+    body = []
+    for block in doc.markdown.split("\n\n"):
+        if block.startswith("#"):
+            level = len(block) - len(block.lstrip("#"))
+            body.append(f"<h{level}>{html.escape(block.lstrip('# '))}</h{level}>")
+        elif block.startswith("|"):
+            rows = [r.strip("|").split("|") for r in block.split("\n") if not r.startswith("|---")]
+            body.append("<table>" + "".join(
+                "<tr>" + "".join(f"<td>{html.escape(c.strip())}</td>" for c in r) + "</tr>" for r in rows
+            ) + "</table>")
+        else:
+            body.append(f"<p>{html.escape(block)}</p>")
+    return (
+        f"<!doctype html><html><head><title>{html.escape(doc.title)}</title></head>"
+        f"<body>{''.join(body)}</body></html>"
+    ).encode()
+
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int = 90) -> list[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def to_pdf(doc: Doc, lines_per_page: int = 50) -> bytes:
+    """Minimal PDF 1.4 (Helvetica text, one content stream per page) that pypdf extracts line by line."""
+    lines: list[str] = []
+    for block in doc.markdown.split("\n\n"):
+        for raw in block.split("\n"):
+            lines.extend(_wrap(raw) or [""])
+        lines.append("")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[""]]
+
+    objects: list[bytes] = []  # object n is objects[n - 1]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(b"")  # Pages, filled in once page object numbers are known
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    info = len(objects) + 1
+    objects.append(f"<< /Title ({_pdf_escape(doc.title)}) >>".encode("latin-1", "replace"))
+    kids = []
+    for page in pages:
+        text_ops = " ".join(f"({_pdf_escape(line)}) '" for line in page)
+        stream = f"BT /F1 10 Tf 13 TL 50 800 Td {text_ops} ET".encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {content} 0 R "
+            f"/Resources << /Font << /F1 3 0 R >> >> >>".encode()
+        )
+        kids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (n, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, info, xref)
+    return bytes(out)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--pdf-ratio", type=float, default=0.2)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+
+    out = Path(args.out)
+    (out / "corpus").mkdir(parents=True, exist_ok=True)
+    for d in generate(args.docs, pdf_ratio=args.pdf_ratio, seed=args.seed):
+        (out / d.path.lstrip("/")).write_bytes(to_pdf(d) if d.is_pdf else to_html(d))
+    print(f"wrote {args.docs} documents to {out / 'corpus'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# bench/fakes.py — local stand-ins for OpenAI and Crawl4AI so the bench suite runs offline and reproducibly.
+# FakeOpenAI: /v1/embeddings (deterministic hashed bag-of-words vectors, float or base64) and /v1/responses
+# (canned markdown, plain or streamed as Responses API events) with configurable latency and usage.
+# FakeCrawl4AI: POST /crawl renders fixture documents to markdown, and /corpus/* serves the same documents
+# as origin HTML/PDF with ETags (conditional requests answer 304). Both count requests per endpoint.
+# python -m bench.fakes --docs 200   (serve both; point OPENAI_BASE_URL / CRAWL4AI_BASE_URL at the printed URLs)
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from bench import corpus
+
+DIMS = 3072  # chunks.embedding is vector(3072)
+
+
+def embedding(text: str, dims: int = DIMS) -> list[float]:
+    # Hashed bag of stemmed-ish words; like real embedding models it is weak on exact figures and codes.
+    vec = [0.0] * dims
+    for w in re.findall(r"[a-z]{3,}", text.lower()):
+        h = int.from_bytes(hashlib.blake2b(w[:6].encode(), digest_size=4).digest(), "big")
+        vec[h % dims] += 1.0
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _input_text(value) -> str:
+    """Responses API input: a string or a list of message items."""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+class FakeOpenAI:
+    """
+    latency: seconds added to every request; token_interval: seconds between streamed deltas;
+    output_tokens: words in each generated answer.
+    """
+
+    def __init__(self, latency: float = 0.05, token_interval: float = 0.005, output_tokens: int = 400):
+        self.latency = latency
+        self.token_interval = token_interval
+        self.output_tokens = output_tokens
+        self.requests: Counter = Counter()
+        self.app = FastAPI()
+        self.app.post("/v1/embeddings")(self._embeddings)
+        self.app.post("/v1/responses")(self._responses)
+
+    async def _embeddings(self, request: Request):
+        self.requests["embeddings"] += 1
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(self.latency)
+        data = []
+        for i, text in enumerate(inputs):
+            vec = embedding(text)
+            if body.get("encoding_format") == "base64":
+                vec = base64.b64encode(array("f", vec).tobytes()).decode()
+            data.append({"object": "embedding", "index": i, "embedding": vec})
+        n = sum(_tokens(t) for t in inputs)
+        return {"object": "list", "data": data, "model": body["model"], "usage": {"prompt_tokens": n, "total_tokens": n}}
+
+    def _answer(self, prompt: str) -> list[str]:
+        # Word deltas, deterministic in the prompt; cites fixture URLs found in it like a real answer would.
+        rng = random.Random(hashlib.sha256(prompt.encode()).digest())
+        urls = re.findall(r"https?://\S+", prompt)[:5]
+        words = [rng.choice(corpus.WORDS) for _ in range(self.output_tokens)]
+        return ["## Summary\n\n"] + [w + " " for w in words] + [f"\n- Source: {u}" for u in urls]
+
+    def _response(self, body: dict, status: str, text: str, usage: dict | None) -> dict:
+        content = [{"type": "output_text", "text": text, "annotations": []}] if status == "completed" else []
+        return {
+            "id": "resp_bench", "object": "response", "created_at": int(time.time()), "status": status,
+            "model": body["model"], "error": None, "incomplete_details": None,
+            "instructions": body.get("instructions"), "tools": body.get("tools", []), "tool_choice": "auto",
+            "parallel_tool_calls": True, "metadata": {}, "temperature": 1.0, "top_p": 1.0,
+            "output": [{
+                "type": "message", "id": "msg_bench", "role": "assistant", "status": status, "content": content,
+            }] if status == "completed" else [],
+            "usage": usage,
+        }
+
+    async def _responses(self, request: Request):
+        body = await request.json()
+        web_search = any(t.get("type") == "web_search" for t in body.get("tools") or [])
+        self.requests["web_search" if web_search else "responses"] += 1
+        prompt = (body.get("instructions") or "") + _input_text(body.get("input"))
+        deltas = self._answer(prompt)
+        text = "".join(deltas)
+        usage = {
+            "input_tokens": _tokens(prompt), "output_tokens": len(deltas),
+            "total_tokens": _tokens(prompt) + len(deltas),
+            "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0},
+        }
+        await asyncio.sleep(self.latency)
+        if not body.get("stream"):
+            # Non-streaming callers wait for the whole answer.
+            await asyncio.sleep(self.token_interval * len(deltas))
+            return self._response(body, "completed", text, usage)
+
+        async def events():
+            seq = 0
+
+            def event(type_: str, **data) -> str:
+                nonlocal seq
+                seq += 1
+                return f"event: {type_}\ndata: {json.dumps({'type': type_, 'sequence_number': seq, **data})}\n\n"
+
+            yield event("response.created", response=self._response(body, "in_progress", "", None))
+            item = {"type": "message", "id": "msg_bench", "role": "assistant", "status": "in_progress", "content": []}
+            yield event("response.output_item.added", output_index=0, item=item)
+            part = {"type": "output_text", "text": "", "annotations": []}
+            yield event("response.content_part.added", item_id="msg_bench", output_index=0, content_index=0, part=part)
+            for d in deltas:
+                await asyncio.sleep(self.token_interval)
+                yield event("response.output_text.delta", item_id="msg_bench", output_index=0, content_index=0,
+                            delta=d, logprobs=[])
+            yield event("response.output_text.done", item_id="msg_bench", output_index=0, content_index=0,
+                        text=text, logprobs=[])
+            yield event("response.completed", response=self._response(body, "completed", text, usage))
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+
+class FakeCrawl4AI:
+    """Crawl4AI /crawl plus the origin it crawls. latency: seconds per /crawl render (browser time)."""
+
+    def __init__(self, docs: list[corpus.Doc], latency: float = 0.2):
+        self.latency = latency
+        self.requests: Counter = Counter()
+        self._docs = {d.path: d for d in docs}
+        self._bodies: dict[str, bytes] = {}
+        self.app = FastAPI()
+        self.app.post("/crawl")(self._crawl)
+        self.app.get("/corpus/{name}")(self._origin)
+
+    def _body(self, doc: corpus.Doc) -> bytes:
+        if doc.path not in self._bodies:
+            self._bodies[doc.path] = corpus.to_pdf(doc) if doc.is_pdf else corpus.to_html(doc)
+        return self._bodies[doc.path]
+
+    async def _origin(self, name: str, request: Request):
+        self.requests["origin"] += 1
+        doc = self._docs.get(f"/corpus/{name}")
+        if doc is None:
+            return Response(status_code=404)
+        body = self._body(doc)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if request.headers.get("if-none-match") == etag:
+            self.requests["origin_304"] += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        media_type = "application/pdf" if doc.is_pdf else "text/html"
+        return Response(body, media_type=media_type, headers={"ETag": etag})
+
+    async def _crawl(self, request: Request):
+        self.requests["crawl"] += 1
+        body = await request.json()
+        await asyncio.sleep(self.latency)
+        results = []
+        for url in body.get("urls") or []:
+            path = "/" + url.split("/", 3)[-1] if url.count("/") >= 3 else url
+            doc = self._docs.get(path)
+            if doc is None:
+                results.append({"url": url, "success": False, "status_code": 404, "markdown": ""})
+                continue
+            etag = '"' + hashlib.sha256(self._body(doc)).hexdigest()[:16] + '"'
+            results.append({
+                "url": url, "success": True, "status_code": 200, "title": doc.title,
+                "markdown": {"raw_markdown": doc.markdown},
+                "response_headers": {"etag": etag},
+            })
+        return JSONResponse({"success": True, "results": results})
+
+
+class BackgroundServer:
+    """uvicorn serving `app` on 127.0.0.1 from a daemon thread (its own event loop, off the caller's)."""
+
+    def __init__(self, app, port: int = 0):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("fake server failed to start")
+            time.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--pdf-ratio", type=float, default=0.2)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--openai-port", type=int, default=8101)
+    ap.add_argument("--crawl4ai-port", type=int, default=8102)
+    ap.add_argument("--openai-latency-ms", type=float, default=50.0)
+    ap.add_argument("--crawl-latency-ms", type=float, default=200.0)
+    args = ap.parse_args()
+
+    docs = corpus.generate(args.docs, pdf_ratio=args.pdf_ratio, seed=args.seed)
+    openai_server = BackgroundServer(FakeOpenAI(args.openai_latency_ms / 1000).app, args.openai_port)
+    crawl_server = BackgroundServer(FakeCrawl4AI(docs, args.crawl_latency_ms / 1000).app, args.crawl4ai_port)
+    openai_url, crawl_url = openai_server.start(), crawl_server.start()
+    print(f"OPENAI_BASE_URL={openai_url}/v1")
+    print(f"CRAWL4AI_BASE_URL={crawl_url}")
+    print(f"corpus: {crawl_url}/corpus/0.{'pdf' if docs[0].is_pdf else 'html'} .. ({len(docs)} documents)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        openai_server.stop()
+        crawl_server.stop()
+
+
+if __name__ == "__main__":
+    main()
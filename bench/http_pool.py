@@ -0,0 +1,107 @@
+# bench/http_pool.py — fresh httpx.AsyncClient per request (old crawl path) vs the shared pooled client.
+# Runs a local stub HTTP server (no DB / OpenAI needed) and counts the TCP connections each mode opens.
+# python -m bench.http_pool --requests 500 --concurrency 16 --connect-delay-ms 20
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from app import http_client
+
+_BODY = b'{"results": [{"url": "http://stub/", "markdown": "hello"}]}'
+
+
+class StubServer:
+    """Keep-alive HTTP/1.1 server; optional delay per new connection stands in for TCP+TLS handshake RTTs."""
+
+    def __init__(self, connect_delay: float):
+        self.connect_delay = connect_delay
+        self.connections = 0
+        self.server: asyncio.AbstractServer | None = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        await asyncio.sleep(self.connect_delay)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(_BODY)).encode() + b"\r\n\r\n" + _BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _fresh(url: str) -> None:
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        (await client.post(url, json={"urls": ["http://example.com"]})).raise_for_status()
+
+
+async def _pooled(url: str) -> None:
+    (await http_client.get_client().post(url, json={"urls": ["http://example.com"]})).raise_for_status()
+
+
+async def _run(mode, url: str, n: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            await mode(url)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "requests_per_s": round(n / wall, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[max(0, int(len(latencies) * 0.99) - 1)], 2),
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=500)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--connect-delay-ms", type=float, default=20.0)
+    args = ap.parse_args()
+
+    report = {"requests": args.requests, "concurrency": args.concurrency, "connect_delay_ms": args.connect_delay_ms}
+    for name, mode in (("fresh_client_per_call", _fresh), ("shared_pool", _pooled)):
+        stub = StubServer(args.connect_delay_ms / 1000)
+        port = await stub.start()
+        try:
+            report[name] = await _run(mode, f"http://127.0.0.1:{port}/crawl", args.requests, args.concurrency)
+            report[name]["connections_opened"] = stub.connections
+        finally:
+            await http_client.shutdown()
+            await stub.stop()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
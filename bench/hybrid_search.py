@@ -0,0 +1,139 @@
+# bench/hybrid_search.py — latency and quality (recall@k, MRR) of vector vs hybrid vs lexical retrieval.
+# Loads a synthetic fixture corpus (fund names, tickers, figures, themes) into the DB inside one transaction,
+# runs labelled queries through search.search_chunks in each mode, then rolls the corpus back.
+# python -m bench.hybrid_search --docs 400 --k 10            (deterministic stand-in embedder, no OpenAI)
+# python -m bench.hybrid_search --docs 400 --real-embeddings (OPENAI_API_KEY; uses the embedding cache)
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app import query_cache, search
+from app.db import SessionLocal
+from app.embeddings import embed_texts
+from app.settings import settings
+from bench.fakes import embedding
+
+_THEMES = [
+    ("rising bond yields pressured long duration growth stocks", "higher interest rates hurt tech valuations"),
+    ("energy producers benefited from tighter crude oil supply", "oil price rally lifted energy companies"),
+    ("credit spreads widened as default expectations increased", "corporate bond risk premiums grew"),
+    ("emerging market currencies weakened against the dollar", "strong dollar hit developing economies"),
+    ("small caps lagged amid tighter lending conditions", "smaller companies underperformed as credit tightened"),
+    ("inflation cooled faster than consensus expected", "price growth slowed more than forecast"),
+    ("semiconductor demand rebounded on data centre spending", "chip makers recovered thanks to AI infrastructure"),
+    ("real estate trusts fell on refinancing concerns", "property funds dropped over debt rollover worries"),
+]
+_NAMES = ["Aurora", "Bluefin", "Cedar", "Delta", "Ember", "Falcon", "Granite", "Harbor", "Iris", "Juniper"]
+_KINDS = ["Growth", "Income", "Value", "Global", "Tech", "Bond"]
+_FILLER = (
+    "Portfolio managers noted that positioning remained balanced across sectors. "
+    "The committee reviewed allocation limits and liquidity buffers during the period. "
+)
+
+
+def _fixture(n_docs: int, seed: int) -> tuple[list[dict], list[dict]]:
+    """Returns (docs, queries). Each query lists the (url, chunk_index) keys that answer it."""
+    rng = random.Random(seed)
+    docs, queries = [], []
+    for i in range(n_docs):
+        fund = f"{rng.choice(_NAMES)} {rng.choice(_KINDS)} Fund {i}"
+        ticker = "".join(rng.choice("ABCDEFGHKLMNPRSTVWXZ") for _ in range(4)) + str(i % 10)
+        pct = f"{rng.uniform(-15, 25):.1f}%"
+        q = f"Q{rng.randint(1, 4)} {rng.choice([2023, 2024, 2025])}"
+        theme, paraphrase = rng.choice(_THEMES)
+        url = f"https://fixture.bench/{i}"
+        chunks = [
+            f"{fund} ({ticker}) returned {pct} in {q}. Over the quarter {theme}. " + _FILLER,
+            f"Outlook for {fund}: " + _FILLER * 2,
+        ]
+        docs.append({"url": url, "chunks": chunks})
+        queries.append({"kind": "ticker", "q": f"{ticker} performance", "relevant": [(url, 0)]})
+        queries.append({"kind": "figure", "q": f"fund that returned {pct} in {q}", "relevant": [(url, 0)]})
+    for theme, paraphrase in _THEMES:
+        relevant = [(d["url"], 0) for d in docs if theme in d["chunks"][0]]
+        queries.append({"kind": "semantic", "q": paraphrase, "relevant": relevant})
+    return docs, queries
+
+
+async def _fake_embed_texts(texts: list[str], **_) -> list[list[float]]:
+    return [embedding(t) for t in texts]
+
+
+async def _load(session, docs: list[dict], embed) -> None:
+    for d in docs:
+        doc_id = (await session.execute(text("""
+            INSERT INTO documents(url, title, content_markdown, content_hash)
+            VALUES (:url, 'fixture', :md, :h) RETURNING id
+        """), {"url": d["url"], "md": "\n\n".join(d["chunks"]), "h": hashlib.sha256(d["url"].encode()).hexdigest()})).scalar_one()
+        vectors = await embed(d["chunks"])
+        await session.execute(text("""
+            INSERT INTO chunks(document_id, url, chunk_index, content, embedding)
+            VALUES (:doc, :url, :i, :c, CAST(:e AS vector))
+        """), [
+            {"doc": doc_id, "url": d["url"], "i": i, "c": c, "e": v}
+            for i, (c, v) in enumerate(zip(d["chunks"], vectors))
+        ])
+
+
+def _quality(rows: list, relevant: list[tuple], k: int) -> tuple[float, float]:
+    relevant_set = set(relevant)
+    keys = [(r["url"], r["chunk_index"]) for r in rows[:k]]
+    hits = [i for i, key in enumerate(keys) if key in relevant_set]
+    recall = len(hits) / max(1, min(len(relevant), k))
+    mrr = 1.0 / (hits[0] + 1) if hits else 0.0
+    return recall, mrr
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=400)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--real-embeddings", action="store_true")
+    args = ap.parse_args()
+
+    embed = embed_texts if args.real_embeddings else _fake_embed_texts
+    query_cache.embed_texts = embed  # search_chunks embeds the query through this name
+    settings.query_result_cache_enabled = False  # measure retrieval, not the result cache
+    docs, queries = _fixture(args.docs, args.seed)
+    report = {"docs": args.docs, "queries": len(queries), "k": args.k,
+              "embeddings": "openai" if args.real_embeddings else "fake", "modes": {}}
+
+    async with SessionLocal() as session:
+        await _load(session, docs, embed)
+        # Exact vector scan: the uncommitted fixture rows aren't worth an HNSW tuning pass.
+        settings.search_exact = True
+        try:
+            for mode in search.SEARCH_MODES:
+                latencies, by_kind = [], {}
+                for q in queries:
+                    t0 = time.perf_counter()
+                    rows = await search.search_chunks(session, q["q"], limit=args.k, mode=mode)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                    by_kind.setdefault(q["kind"], []).append(_quality(rows, q["relevant"], args.k))
+                latencies.sort()
+                report["modes"][mode] = {
+                    "p50_ms": round(statistics.median(latencies), 2),
+                    "p95_ms": round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 2),
+                    **{
+                        kind: {
+                            "recall": round(statistics.mean(r for r, _ in scores), 4),
+                            "mrr": round(statistics.mean(m for _, m in scores), 4),
+                        }
+                        for kind, scores in by_kind.items()
+                    },
+                }
+        finally:
+            await session.rollback()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
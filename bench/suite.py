@@ -0,0 +1,293 @@
+# bench/suite.py — offline end-to-end benchmark: the API runs as a uvicorn subprocess against local fakes
+# (bench/fakes.py: OpenAI + Crawl4AI with configurable latency) and a generated corpus (bench/corpus.py).
+# Scenarios: ingest (batch crawl -> chunk -> embed -> store, then an all-unchanged re-crawl), query
+# (/query p50/p95/p99 at N concurrent clients per search mode) and newsletter (generate latency, per-stage
+# timings, streamed time to first token). Needs Postgres (DATABASE_URL, ideally a scratch database);
+# no OpenAI key or Crawl4AI. Fixture rows are deleted afterwards unless --keep.
+# Prints one JSON document (commit, config, results) and writes it to --out, for comparing across commits.
+# python -m bench.suite --docs 200 --clients 16 --queries 400 --out bench-$(git rev-parse --short HEAD).json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+
+from bench import corpus
+from bench.fakes import BackgroundServer, FakeCrawl4AI, FakeOpenAI
+
+SCENARIOS = ("ingest", "query", "newsletter")
+
+
+def _percentiles(latencies_ms: list[float]) -> dict:
+    if not latencies_ms:
+        return {}
+    s = sorted(latencies_ms)
+
+    def pct(p: float) -> float:
+        return round(s[min(len(s) - 1, max(0, int(len(s) * p) - 1))], 2)
+
+    return {"p50_ms": round(statistics.median(s), 2), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": round(s[-1], 2)}
+
+
+def _commit() -> dict:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+        return {"sha": sha, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"sha": None, "dirty": None}
+
+
+def _start_api(port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+
+
+async def _wait_healthy(client: httpx.AsyncClient, api: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if api.poll() is not None:
+            raise RuntimeError(f"API exited with status {api.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("API did not become healthy")
+
+
+async def _crawl_all(client: httpx.AsyncClient, urls: list[str], batch: int) -> dict:
+    statuses: dict[str, int] = {}
+    chunks = 0
+    t0 = time.perf_counter()
+    for i in range(0, len(urls), batch):
+        async with client.stream("POST", "/crawl/batch", json={"urls": urls[i:i + batch]}) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                r = json.loads(line) if line else {}
+                if "status" in r:
+                    statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+                    chunks += r.get("chunks") or 0
+    seconds = time.perf_counter() - t0
+    return {
+        "seconds": round(seconds, 3),
+        "docs_per_s": round(len(urls) / seconds, 2),
+        "chunks": chunks,
+        "chunks_per_s": round(chunks / seconds, 2),
+        "statuses": statuses,
+    }
+
+
+async def _ingest(client: httpx.AsyncClient, urls: list[str], fakes: dict, batch: int) -> dict:
+    report = {}
+    # The second pass re-crawls the same URLs: conditional requests and content hashes should skip
+    # chunking and embedding (see the fake request counts).
+    for name in ("first_crawl", "recrawl"):
+        before = {fake: Counter(f.requests) for fake, f in fakes.items()}
+        report[name] = await _crawl_all(client, urls, batch)
+        report[name]["requests"] = {fake: dict(f.requests - before[fake]) for fake, f in fakes.items()}
+    return report
+
+
+async def _query(client: httpx.AsyncClient, queries: list[str], mode: str, clients: int, top_k: int) -> dict:
+    pending = iter(queries)
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for q in pending:
+            t0 = time.perf_counter()
+            try:
+                (await client.post("/query", json={"query": q, "top_k": top_k, "mode": mode})).raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    seconds = time.perf_counter() - t0
+    return {"requests": len(queries), "errors": errors, "requests_per_s": round(len(queries) / seconds, 2),
+            **_percentiles(latencies)}
+
+
+async def _newsletter(client: httpx.AsyncClient, runs: int, web_search: bool) -> tuple[dict, int]:
+    template = (await client.post("/newsletter-templates", json={
+        "name": f"bench-{uuid.uuid4().hex[:8]}",
+        "system_prompt": "You write a concise quarterly market newsletter from the provided sources.",
+        "use_web_search": web_search,
+    })).raise_for_status().json()
+    run = (await client.post(f"/newsletter-templates/{template['id']}/runs", json={"label": "Q1 2026"})).raise_for_status().json()
+
+    latencies, stage_timings = [], {}
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = (await client.post(f"/newsletter-runs/{run['id']}/generate")).raise_for_status().json()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        for stage, ms in (result.get("timings_ms") or {}).items():
+            stage_timings.setdefault(stage, []).append(ms)
+
+    first_token, streamed = [], []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        got_delta = False
+        async with client.stream("POST", f"/newsletter-runs/{run['id']}/generate/stream") as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if line == "event: delta" and not got_delta:
+                    got_delta = True
+                    first_token.append((time.perf_counter() - t0) * 1000)
+                elif line == "event: error":
+                    raise RuntimeError("newsletter stream reported an error")
+        streamed.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        "runs": runs,
+        "generate": _percentiles(latencies),
+        "stages_median_ms": {k: statistics.median(v) for k, v in stage_timings.items()},
+        "stream_first_token": _percentiles(first_token),
+        "stream_total": _percentiles(streamed),
+    }, template["id"]
+
+
+async def _stage_metrics(client: httpx.AsyncClient) -> dict:
+    """Mean latency per stage from the API's /metrics (successful calls)."""
+    from prometheus_client.parser import text_string_to_metric_families
+
+    sums, counts = {}, {}
+    for family in text_string_to_metric_families((await client.get("/metrics")).text):
+        if family.name != "scraper_stage_seconds":
+            continue
+        for s in family.samples:
+            if s.labels.get("outcome") != "ok":
+                continue
+            if s.name.endswith("_sum"):
+                sums[s.labels["stage"]] = s.value
+            elif s.name.endswith("_count"):
+                counts[s.labels["stage"]] = s.value
+    return {
+        stage: {"count": int(n), "mean_ms": round(sums.get(stage, 0) / n * 1000, 2)}
+        for stage, n in sorted(counts.items()) if n
+    }
+
+
+async def _cleanup(url_prefix: str) -> None:
+    from sqlalchemy import text
+
+    from app.db import SessionLocal
+    from app.query_cache import bump_corpus_generation
+
+    async with SessionLocal() as session:
+        params = {"p": url_prefix + "%"}
+        for table in ("documents", "url_validators", "crawl_runs"):
+            await session.execute(text(f"DELETE FROM {table} WHERE url LIKE :p"), params)
+        await session.commit()
+        await bump_corpus_generation(session)
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--pdf-ratio", type=float, default=0.2)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--batch", type=int, default=500, help="URLs per /crawl/batch request")
+    ap.add_argument("--clients", type=int, default=16, help="concurrent /query clients")
+    ap.add_argument("--queries", type=int, default=400, help="/query requests per search mode")
+    ap.add_argument("--modes", default="vector,hybrid,lexical")
+    ap.add_argument("--top-k", type=int, default=10)
+    ap.add_argument("--newsletter-runs", type=int, default=3)
+    ap.add_argument("--no-web-search", action="store_true")
+    ap.add_argument("--openai-latency-ms", type=float, default=50.0)
+    ap.add_argument("--openai-token-interval-ms", type=float, default=5.0)
+    ap.add_argument("--crawl-latency-ms", type=float, default=200.0)
+    ap.add_argument("--api-port", type=int, default=8199)
+    ap.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra API setting, repeatable")
+    ap.add_argument("--keep", action="store_true", help="leave fixture documents in the database")
+    ap.add_argument("--out")
+    args = ap.parse_args()
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    if unknown := set(scenarios) - set(SCENARIOS):
+        ap.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # A fresh nonce per run: the first crawl measures embedding, not embedding cache hits.
+    docs = corpus.generate(args.docs, pdf_ratio=args.pdf_ratio, seed=args.seed, nonce=uuid.uuid4().hex[:8])
+    fake_openai = FakeOpenAI(args.openai_latency_ms / 1000, args.openai_token_interval_ms / 1000)
+    fake_crawl = FakeCrawl4AI(docs, args.crawl_latency_ms / 1000)
+    servers = [BackgroundServer(fake_openai.app), BackgroundServer(fake_crawl.app)]
+    openai_url, crawl_url = (s.start() for s in servers)
+
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "bench",
+        "OPENAI_BASE_URL": f"{openai_url}/v1",
+        "CRAWL4AI_BASE_URL": crawl_url,
+        # Nothing but the scenarios should be using the API's resources.
+        "SCHEDULER_ENABLED": "false",
+        "JOBS_INPROCESS_WORKERS": "0",
+        **dict(kv.split("=", 1) for kv in args.env),
+    }
+    report = {
+        "suite": "bench.suite",
+        "commit": _commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {**vars(args), "scenarios": scenarios},
+        "results": {},
+    }
+    api = _start_api(args.api_port, env)
+    template_id = None
+    try:
+        limits = httpx.Limits(max_connections=args.clients + 4, max_keepalive_connections=args.clients + 4)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.api_port}", timeout=600.0, limits=limits) as client:
+            await _wait_healthy(client, api)
+            urls = [crawl_url + d.path for d in docs]
+            if "ingest" in scenarios:
+                fakes = {"openai": fake_openai, "crawl4ai": fake_crawl}
+                report["results"]["ingest"] = await _ingest(client, urls, fakes, args.batch)
+            if "query" in scenarios:
+                queries = corpus.queries(docs, args.queries, seed=args.seed)
+                report["results"]["query"] = {
+                    mode: await _query(client, queries, mode, args.clients, args.top_k)
+                    for mode in args.modes.split(",") if mode
+                }
+            if "newsletter" in scenarios:
+                report["results"]["newsletter"], template_id = await _newsletter(
+                    client, args.newsletter_runs, not args.no_web_search,
+                )
+            report["results"]["stages"] = await _stage_metrics(client)
+            if template_id is not None and not args.keep:
+                await client.delete(f"/newsletter-templates/{template_id}")
+    finally:
+        api.terminate()
+        api.wait(timeout=30)
+        for s in servers:
+            s.stop()
+        if not args.keep:
+            await _cleanup(crawl_url + "/corpus/")
+
+    report["fake_requests"] = {"openai": dict(fake_openai.requests), "crawl4ai": dict(fake_crawl.requests)}
+    out = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+    print(out)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,14 @@
+-- ANN search path for chunks. HNSW/IVFFlat can't index vector(3072) (2000-dim limit), but halfvec indexes up to 4000 dims.
+-- embedding_half is generated from embedding, so inserts need no change; ADD COLUMN backfills existing rows.
+-- Existing databases: `make migrate` re-applies these idempotent scripts (raise maintenance_work_mem for large corpora).
+ALTER EXTENSION vector UPDATE;
+
+ALTER TABLE chunks
+  ADD COLUMN IF NOT EXISTS embedding_half halfvec(3072)
+  GENERATED ALWAYS AS (embedding::halfvec(3072)) STORED;
+
+SET maintenance_work_mem = '1GB';
+
+CREATE INDEX IF NOT EXISTS idx_chunks_embedding_half_hnsw
+  ON chunks USING hnsw (embedding_half halfvec_cosine_ops)
+  WITH (m = 16, ef_construction = 64);
@@ -0,0 +1,16 @@
+-- Content-addressed embedding cache: (embed model, sha256 hex of chunk text) -> vector; see app/embed_cache.py.
+-- Unconstrained vector type so a different OPENAI_EMBED_MODEL (other dims) can share the table.
+CREATE TABLE IF NOT EXISTS embedding_cache (
+  model TEXT NOT NULL,
+  text_hash TEXT NOT NULL,
+  embedding vector NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (model, text_hash)
+);
+
+-- Seed from chunks already embedded (all stored with the default 3072-dim text-embedding-3-large).
+INSERT INTO embedding_cache(model, text_hash, embedding)
+SELECT 'text-embedding-3-large', encode(sha256(convert_to(content, 'UTF8')), 'hex'), embedding
+FROM chunks
+WHERE embedding IS NOT NULL
+ON CONFLICT (model, text_hash) DO NOTHING;
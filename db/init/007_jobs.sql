@@ -0,0 +1,23 @@
+-- Durable background jobs (crawl, newsletter generation); see app/jobs.py.
+-- status: queued -> running -> succeeded | failed (failed attempts re-queue with backoff until max_attempts).
+CREATE TABLE IF NOT EXISTS jobs (
+  id BIGSERIAL PRIMARY KEY,
+  kind TEXT NOT NULL,
+  payload JSONB NOT NULL DEFAULT '{}',
+  status TEXT NOT NULL DEFAULT 'queued',
+  progress JSONB,
+  result JSONB,
+  error TEXT,
+  attempts INT NOT NULL DEFAULT 0,
+  max_attempts INT NOT NULL DEFAULT 3,
+  run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  locked_by TEXT,
+  locked_at TIMESTAMPTZ,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  finished_at TIMESTAMPTZ
+);
+
+-- Claim path (SKIP LOCKED) and stale-lock sweep only ever touch these small partial indexes.
+CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs (run_after, id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs (locked_at) WHERE status = 'running';
@@ -0,0 +1,17 @@
+-- Per-URL HTTP validators and last content hash for conditional re-crawls; see pipeline.ingest_url.
+CREATE TABLE IF NOT EXISTS url_validators (
+  url TEXT PRIMARY KEY,
+  etag TEXT,
+  last_modified TEXT,
+  content_hash TEXT,
+  document_id BIGINT REFERENCES documents(id) ON DELETE SET NULL,
+  checked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  changed_at TIMESTAMPTZ
+);
+
+-- Seed with the latest stored version of every URL so the first re-crawl can already short-circuit on hash.
+INSERT INTO url_validators(url, content_hash, document_id, checked_at, changed_at)
+SELECT DISTINCT ON (url) url, content_hash, id, created_at, created_at
+FROM documents
+ORDER BY url, id DESC
+ON CONFLICT (url) DO NOTHING;
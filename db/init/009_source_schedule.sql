@@ -0,0 +1,19 @@
+-- Scheduled incremental crawling of sources; see app/scheduler.py.
+ALTER TABLE sources ADD COLUMN IF NOT EXISTS crawl_interval_seconds INT NOT NULL DEFAULT 86400;
+ALTER TABLE sources ADD COLUMN IF NOT EXISTS next_crawl_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+ALTER TABLE sources ADD COLUMN IF NOT EXISTS last_crawled_at TIMESTAMPTZ;
+ALTER TABLE sources ADD COLUMN IF NOT EXISTS max_urls_per_run INT NOT NULL DEFAULT 50;
+
+CREATE INDEX IF NOT EXISTS idx_sources_next_crawl_at ON sources (next_crawl_at) WHERE enabled;
+
+-- URLs discovered under a source's base_url (sitemap / RSS / in-page links).
+-- lastmod is the advertised value when the URL was last enqueued; last_enqueued_at NULL = still pending.
+CREATE TABLE IF NOT EXISTS source_urls (
+  source_id BIGINT NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+  url TEXT NOT NULL,
+  lastmod TEXT,
+  first_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  last_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  last_enqueued_at TIMESTAMPTZ,
+  PRIMARY KEY (source_id, url)
+);
@@ -0,0 +1,8 @@
+-- Lexical retrieval for hybrid search (app/search.py): full-text over a generated tsvector plus
+-- trigram matching (pg_trgm, installed in 001) for tickers, fund names and figures like "10.6%".
+ALTER TABLE chunks
+  ADD COLUMN IF NOT EXISTS content_tsv tsvector
+  GENERATED ALWAYS AS (to_tsvector('english', content)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_chunks_content_tsv ON chunks USING gin (content_tsv);
+CREATE INDEX IF NOT EXISTS idx_chunks_content_trgm ON chunks USING gin (content gin_trgm_ops);
@@ -0,0 +1,19 @@
+-- Metadata filters for retrieval (search.SearchFilters). source_id and the document's created_at are
+-- denormalised onto chunks so filters apply in the same scan as the vector/lexical ranking
+-- (with hnsw.iterative_scan for the ANN path) instead of joining documents and post-filtering.
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS source_id BIGINT REFERENCES sources(id) ON DELETE SET NULL;
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS document_created_at TIMESTAMPTZ;
+
+UPDATE chunks c
+SET source_id = d.source_id, document_created_at = d.created_at
+FROM documents d
+WHERE d.id = c.document_id AND c.document_created_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_chunks_document_created_at ON chunks (document_created_at);
+CREATE INDEX IF NOT EXISTS idx_chunks_source_created ON chunks (source_id, document_created_at);
+-- LIKE 'prefix%' (url_prefixes) needs pattern ops under a non-C collation.
+CREATE INDEX IF NOT EXISTS idx_chunks_url_pattern ON chunks (url text_pattern_ops);
+
+-- Per-run retrieval window/filters for newsletter generation (same keys as SearchFilters, plus
+-- template_sources_only to restrict to the template's source_urls and the run's extra URLs).
+ALTER TABLE newsletter_runs ADD COLUMN IF NOT EXISTS rag_filters JSONB NOT NULL DEFAULT '{}';
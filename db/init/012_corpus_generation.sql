@@ -0,0 +1,4 @@
+-- Corpus generation counter: bumped after each ingest that stores new chunks, so cached search
+-- results (app/query_cache.py) keyed on the generation go stale in every API/worker process at once.
+-- A sequence (not a counter row) so concurrent ingests never contend on a lock.
+CREATE SEQUENCE IF NOT EXISTS corpus_generation;
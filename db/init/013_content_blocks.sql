@@ -0,0 +1,20 @@
+-- Compressed, deduplicated storage of superseded document versions; see app/content_store.py.
+-- The latest version of a URL keeps content_markdown; older versions keep only content_blocks, the ordered
+-- sha256 hashes of their zlib-compressed blocks, each stored once however many versions/URLs share it.
+-- Existing superseded rows are converted by `python -m app.content_store compact` (batched, resumable).
+CREATE TABLE IF NOT EXISTS content_blocks (
+  hash BYTEA PRIMARY KEY,
+  data BYTEA NOT NULL,
+  raw_bytes INT NOT NULL
+);
+-- Already compressed: keep TOAST from trying again.
+ALTER TABLE content_blocks ALTER COLUMN data SET STORAGE EXTERNAL;
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_blocks BYTEA[];
+ALTER TABLE documents ALTER COLUMN content_markdown DROP NOT NULL;
+ALTER TABLE documents DROP CONSTRAINT IF EXISTS documents_content_stored;
+ALTER TABLE documents ADD CONSTRAINT documents_content_stored
+  CHECK (content_markdown IS NOT NULL OR content_blocks IS NOT NULL);
+-- lz4 TOAST compression for the full latest versions (faster than the pglz default, similar ratio on text);
+-- applies to values written from now on.
+ALTER TABLE documents ALTER COLUMN content_markdown SET COMPRESSION lz4;
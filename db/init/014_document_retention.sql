@@ -0,0 +1,44 @@
+-- Latest version per URL and retention of superseded versions; see store.mark_latest and app/retention.py.
+-- documents.is_latest marks the one current version of each URL (enforced by a partial unique index);
+-- chunks.is_current mirrors it so search excludes superseded chunks without joining documents.
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS is_latest BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS superseded_at TIMESTAMPTZ;
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS is_current BOOLEAN NOT NULL DEFAULT TRUE;
+
+-- Backfill: every version but the newest of its URL is superseded (as of now, so retention starts counting).
+-- Only URLs with no demoted version yet: `make migrate` re-runs this file, and store.mark_latest may since have
+-- made an older version latest again (content reverted), which must not be undone here.
+UPDATE documents d SET is_latest = FALSE, superseded_at = COALESCE(d.superseded_at, NOW())
+WHERE d.is_latest AND EXISTS (SELECT 1 FROM documents n WHERE n.url = d.url AND n.id > d.id)
+  AND NOT EXISTS (SELECT 1 FROM documents o WHERE o.url = d.url AND NOT o.is_latest);
+
+UPDATE chunks c SET is_current = FALSE
+FROM documents d
+WHERE d.id = c.document_id AND NOT d.is_latest AND c.is_current;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_latest_url ON documents (url) WHERE is_latest;
+-- Retention scans only ever touch superseded rows.
+CREATE INDEX IF NOT EXISTS idx_documents_superseded ON documents (superseded_at) WHERE NOT is_latest;
+CREATE INDEX IF NOT EXISTS idx_chunks_superseded ON chunks (document_id) WHERE NOT is_current;
+-- Orphaned content_blocks lookup (which archived versions still reference a block).
+CREATE INDEX IF NOT EXISTS idx_documents_content_blocks ON documents USING gin (content_blocks);
+
+-- HNSW over current chunks only: superseded vectors are never visited by ANN search (queries filter
+-- on is_current). Keeps the name 005 creates, so re-running 005 finds it and does nothing; the full
+-- index from 005 is replaced once (searches fall back to a sequential scan while this builds).
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM pg_indexes
+    WHERE indexname = 'idx_chunks_embedding_half_hnsw' AND indexdef NOT LIKE '%WHERE%'
+  ) THEN
+    DROP INDEX idx_chunks_embedding_half_hnsw;
+  END IF;
+END $$;
+
+SET maintenance_work_mem = '1GB';
+
+CREATE INDEX IF NOT EXISTS idx_chunks_embedding_half_hnsw
+  ON chunks USING hnsw (embedding_half halfvec_cosine_ops)
+  WITH (m = 16, ef_construction = 64)
+  WHERE is_current;
@@ -0,0 +1,4 @@
+-- Keyset pagination of the newsletter list endpoints (see app/paging.py): each page is a range scan that
+-- starts after the previous page's last (sort key, id), however many templates/runs have accumulated.
+CREATE INDEX IF NOT EXISTS idx_newsletter_templates_created ON newsletter_templates (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_newsletter_runs_template_updated ON newsletter_runs (template_id, updated_at DESC, id DESC);
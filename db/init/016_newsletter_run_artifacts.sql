@@ -0,0 +1,10 @@
+-- Per-stage artifacts of newsletter runs (crawl, retrieval, web_search, prompt, report); see app/run_artifacts.py.
+-- One row per run and stage, replaced when the stage is recomputed; fingerprint hashes the stage's inputs.
+CREATE TABLE IF NOT EXISTS newsletter_run_artifacts (
+  run_id BIGINT NOT NULL REFERENCES newsletter_runs(id) ON DELETE CASCADE,
+  stage TEXT NOT NULL,
+  fingerprint TEXT NOT NULL,
+  data JSONB NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (run_id, stage)
+);
@@ -21,9 +21,18 @@ async function request<T>(path: string, options?: RequestInit): Promise<T> {
   return JSON.parse(text) as T;
 }
 
+function query(params: Record<string, string | null | undefined>): string {
+  const q = new URLSearchParams();
+  for (const [k, v] of Object.entries(params)) if (v) q.set(k, v);
+  const s = q.toString();
+  return s ? `?${s}` : '';
+}
+
 export const api = {
   health: () => request<{ ok: boolean }>('/health'),
-  listTemplates: () => request<{ templates: NewsletterTemplate[] }>('/newsletter-templates'),
+  // Lists return summary rows a page at a time; pass the previous page's next_cursor for the next one.
+  listTemplates: (cursor?: string | null) =>
+    request<Page<'templates', NewsletterTemplateSummary>>(`/newsletter-templates${query({ cursor })}`),
   createTemplate: (body: NewsletterTemplateIn) =>
     request<NewsletterTemplate>('/newsletter-templates', { method: 'POST', body: JSON.stringify(body) }),
   getTemplate: (id: number) => request<NewsletterTemplate>(`/newsletter-templates/${id}`),
@@ -31,19 +40,63 @@ export const api = {
     request<NewsletterTemplate>(`/newsletter-templates/${id}`, { method: 'PUT', body: JSON.stringify(body) }),
   deleteTemplate: (id: number) =>
     request<{ deleted: boolean; id: number }>(`/newsletter-templates/${id}`, { method: 'DELETE' }),
-  listRuns: (templateId: number) =>
-    request<{ runs: NewsletterRun[] }>(`/newsletter-templates/${templateId}/runs`),
+  listRuns: (templateId: number, cursor?: string | null) =>
+    request<Page<'runs', NewsletterRunSummary>>(`/newsletter-templates/${templateId}/runs${query({ cursor })}`),
   createRun: (templateId: number, body: NewsletterRunIn) =>
     request<NewsletterRun>(`/newsletter-templates/${templateId}/runs`, { method: 'POST', body: JSON.stringify(body) }),
   getRun: (runId: number) => request<NewsletterRunDetail>(`/newsletter-runs/${runId}`),
+  // Only the given fields (plus id), e.g. to skip the template's prompt and example content.
+  getRunFields: <K extends keyof NewsletterRunDetail>(runId: number, fields: K[]) =>
+    request<Pick<NewsletterRunDetail, K | 'id'>>(`/newsletter-runs/${runId}${query({ fields: fields.join(',') })}`),
   updateRun: (runId: number, body: NewsletterRunUpdate) =>
     request<NewsletterRunDetail>(`/newsletter-runs/${runId}`, { method: 'PUT', body: JSON.stringify(body) }),
   deleteRun: (runId: number) =>
     request<{ deleted: boolean; id: number }>(`/newsletter-runs/${runId}`, { method: 'DELETE' }),
-  generateRun: (runId: number) =>
-    request<{ report_markdown: string }>(`/newsletter-runs/${runId}/generate`, { method: 'POST' }),
+  // Stages whose inputs are unchanged since the last generate are reused; force recomputes them all.
+  generateRun: (runId: number, force = false) =>
+    request<{ report_markdown: string }>(`/newsletter-runs/${runId}/generate${force ? '?force=true' : ''}`, { method: 'POST' }),
+  generateRunStream: (runId: number, onEvent: (e: GenerateEvent) => void, signal?: AbortSignal, force = false) =>
+    streamEvents(`/newsletter-runs/${runId}/generate/stream${force ? '?force=true' : ''}`, onEvent, signal),
 };
 
+// POST an SSE endpoint and call onEvent per event; resolves when the stream ends.
+// Abort the signal to stop (the server then cancels generation and saves nothing).
+async function streamEvents<E extends { event: string }>(
+  path: string,
+  onEvent: (e: E) => void,
+  signal?: AbortSignal,
+): Promise<void> {
+  const res = await fetch(`${BASE}${path}`, { method: 'POST', signal, headers: { Accept: 'text/event-stream' } });
+  if (!res.ok || !res.body) {
+    throw new Error((await res.text()) || `${res.status} ${res.statusText}`);
+  }
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buf = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += value;
+    let sep: number;
+    while ((sep = buf.indexOf('\n\n')) >= 0) {
+      const block = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (data) onEvent({ event, ...JSON.parse(data) } as E);
+    }
+  }
+}
+
+export type GenerateEvent =
+  | { event: 'stage'; stage: string; done?: number; total?: number; url?: string }
+  | { event: 'delta'; text: string }
+  | { event: 'done'; report_markdown: string; timings_ms: Record<string, number>; cache: Record<string, 'hit' | 'partial' | 'miss'> }
+  | { event: 'error'; detail: string };
+
 export interface NewsletterTemplate {
   id: number;
   name: string;
@@ -54,6 +107,12 @@ export interface NewsletterTemplate {
   created_at: string;
 }
 
+export type NewsletterTemplateSummary = Pick<NewsletterTemplate, 'id' | 'name' | 'use_web_search' | 'created_at'> & {
+  source_url_count: number;
+};
+
+export type Page<K extends string, T> = { [key in K]: T[] } & { next_cursor: string | null };
+
 export interface NewsletterTemplateIn {
   name: string;
   system_prompt: string;
@@ -74,6 +133,8 @@ export interface NewsletterRun {
   updated_at: string;
 }
 
+export type NewsletterRunSummary = Pick<NewsletterRun, 'id' | 'template_id' | 'label' | 'has_report' | 'created_at' | 'updated_at'>;
+
 export interface NewsletterRunIn {
   label: string;
   prompt_override?: string | null;
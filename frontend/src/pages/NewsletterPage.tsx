@@ -1,13 +1,19 @@
 // frontend/src/pages/NewsletterPage.tsx — Single compact page: templates with edit/expand, runs with CRUD + feedback.
 import { useEffect, useState } from 'react'
 import ReactMarkdown from 'react-markdown'
-import { api, type NewsletterTemplate, type NewsletterTemplateIn, type NewsletterRun, type NewsletterRunIn, type NewsletterRunUpdate, type NewsletterRunDetail } from '../api'
+import { api, type NewsletterTemplate, type NewsletterTemplateIn, type NewsletterTemplateSummary, type NewsletterRunSummary, type NewsletterRunIn, type NewsletterRunUpdate, type NewsletterRunDetail } from '../api'
 import { Modal } from '../components/Modal'
 
+// Runs are fetched with just what each view needs (lists are summaries; see api.getRunFields).
+type RunPanel = Pick<NewsletterRunDetail, 'id' | 'report_markdown' | 'feedback'>
+type RunEdit = Pick<NewsletterRunDetail, 'id' | 'label' | 'prompt_override' | 'extra_source_urls'>
+
 export function NewsletterPage() {
-  const [templates, setTemplates] = useState<NewsletterTemplate[]>([])
-  const [runsByTemplate, setRunsByTemplate] = useState<Record<number, NewsletterRun[]>>({})
-  const [runDetails, setRunDetails] = useState<Record<number, NewsletterRunDetail>>({})
+  const [templates, setTemplates] = useState<NewsletterTemplateSummary[]>([])
+  const [templatesCursor, setTemplatesCursor] = useState<string | null>(null)
+  const [runsByTemplate, setRunsByTemplate] = useState<Record<number, NewsletterRunSummary[]>>({})
+  const [runsCursor, setRunsCursor] = useState<Record<number, string | null>>({})
+  const [runDetails, setRunDetails] = useState<Record<number, RunPanel>>({})
   const [expandedTemplateId, setExpandedTemplateId] = useState<number | null>(null)
   const [expandedRunId, setExpandedRunId] = useState<number | null>(null)
   const [loading, setLoading] = useState(true)
@@ -15,7 +21,7 @@ export function NewsletterPage() {
 
   // Modals
   const [templateModal, setTemplateModal] = useState<{ open: boolean; edit: NewsletterTemplate | null }>({ open: false, edit: null })
-  const [runModal, setRunModal] = useState<{ open: boolean; templateId: number; edit: NewsletterRun | null }>({ open: false, templateId: 0, edit: null })
+  const [runModal, setRunModal] = useState<{ open: boolean; templateId: number; edit: RunEdit | null }>({ open: false, templateId: 0, edit: null })
   const [generatingRunId, setGeneratingRunId] = useState<number | null>(null)
   const [feedbackDirty, setFeedbackDirty] = useState<Record<number, string>>({})
   const [reportViewMode, setReportViewMode] = useState<'markdown' | 'raw'>('markdown')
@@ -23,19 +29,33 @@ export function NewsletterPage() {
 
   const loadTemplates = () => {
     api.listTemplates()
-      .then((r) => setTemplates(r.templates))
+      .then((r) => { setTemplates(r.templates); setTemplatesCursor(r.next_cursor) })
       .catch((e) => setError(e.message))
       .finally(() => setLoading(false))
   }
 
+  const loadMoreTemplates = () => {
+    api.listTemplates(templatesCursor)
+      .then((r) => { setTemplates((prev) => [...prev, ...r.templates]); setTemplatesCursor(r.next_cursor) })
+      .catch((e) => setError(e.message))
+  }
+
   useEffect(() => {
     loadTemplates()
   }, [])
 
   const loadRuns = (templateId: number) => {
-    api.listRuns(templateId).then((r) =>
+    api.listRuns(templateId).then((r) => {
       setRunsByTemplate((prev) => ({ ...prev, [templateId]: r.runs }))
-    )
+      setRunsCursor((prev) => ({ ...prev, [templateId]: r.next_cursor }))
+    })
+  }
+
+  const loadMoreRuns = (templateId: number) => {
+    api.listRuns(templateId, runsCursor[templateId]).then((r) => {
+      setRunsByTemplate((prev) => ({ ...prev, [templateId]: [...(prev[templateId] || []), ...r.runs] }))
+      setRunsCursor((prev) => ({ ...prev, [templateId]: r.next_cursor }))
+    })
   }
 
   const toggleTemplate = (id: number) => {
@@ -44,7 +64,7 @@ export function NewsletterPage() {
   }
 
   const loadRunDetail = (runId: number) => {
-    api.getRun(runId).then((d) =>
+    api.getRunFields(runId, ['report_markdown', 'feedback']).then((d) =>
       setRunDetails((prev) => ({ ...prev, [runId]: d }))
     )
   }
@@ -54,6 +74,17 @@ export function NewsletterPage() {
     if (!runDetails[runId]) loadRunDetail(runId)
   }
 
+  // Edit forms need the full rows, which the list summaries leave out.
+  const editTemplate = (id: number) => {
+    api.getTemplate(id).then((t) => setTemplateModal({ open: true, edit: t }))
+  }
+
+  const editRun = (templateId: number, runId: number) => {
+    api.getRunFields(runId, ['label', 'prompt_override', 'extra_source_urls']).then((r) =>
+      setRunModal({ open: true, templateId, edit: r })
+    )
+  }
+
   // Template CRUD
   const saveTemplate = (payload: NewsletterTemplateIn, id?: number) => {
     if (id) {
@@ -131,7 +162,7 @@ export function NewsletterPage() {
           <li key={t.id}>
             <div className="template-row">
               <span className="name">{t.name}</span>
-              <button type="button" className="btn-sm" onClick={() => setTemplateModal({ open: true, edit: t })}>Edit</button>
+              <button type="button" className="btn-sm" onClick={() => editTemplate(t.id)}>Edit</button>
               <button type="button" className="btn-sm" onClick={() => deleteTemplate(t.id)}>Delete</button>
               <button type="button" className="btn-sm" onClick={() => toggleTemplate(t.id)}>
                 {expandedTemplateId === t.id ? '▲' : '▼'} Runs
@@ -147,7 +178,7 @@ export function NewsletterPage() {
                     <div className="run-row">
                       <span className="label">{r.label}</span>
                       <span>{r.has_report ? '✓' : '—'}</span>
-                      <button type="button" className="btn-sm" onClick={() => setRunModal({ open: true, templateId: t.id, edit: r })}>Edit</button>
+                      <button type="button" className="btn-sm" onClick={() => editRun(t.id, r.id)}>Edit</button>
                       <button type="button" className="btn-sm" onClick={() => deleteRun(t.id, r.id)}>Delete</button>
                       <button type="button" className="btn-sm" disabled={generatingRunId === r.id} onClick={() => generateRun(r.id)}>
                         {generatingRunId === r.id ? '…' : 'Generate'}
@@ -196,11 +227,15 @@ export function NewsletterPage() {
                     )}
                   </div>
                 ))}
+                {runsCursor[t.id] && (
+                  <button type="button" className="btn-sm" onClick={() => loadMoreRuns(t.id)}>Load more runs</button>
+                )}
               </div>
             )}
           </li>
         ))}
       </ul>
+      {templatesCursor && <button type="button" onClick={loadMoreTemplates}>Load more</button>}
 
       {/* Template create/edit modal */}
       <Modal open={templateModal.open} onClose={() => setTemplateModal({ open: false, edit: null })} title={templateModal.edit ? 'Edit template' : 'New template'}>
@@ -262,7 +297,7 @@ function RunForm({
   onCancel,
 }: {
   templateId: number
-  initial: NewsletterRun | null
+  initial: RunEdit | null
   onSave: (p: NewsletterRunIn) => void
   onCancel: () => void
 }) {
@@ -1,20 +1,27 @@
 // frontend/src/pages/RunDetail.tsx
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { Link, useParams } from 'react-router-dom'
 import { api, type NewsletterRunDetail } from '../api'
 
+// What this page shows; the template's prompt and example content aren't needed here.
+const FIELDS = ['label', 'template_id', 'template_name', 'report_markdown'] as const
+type RunView = Pick<NewsletterRunDetail, (typeof FIELDS)[number] | 'id'>
+
 export function RunDetail() {
   const { runId } = useParams<{ runId: string }>()
   const id = runId ? parseInt(runId, 10) : NaN
-  const [run, setRun] = useState<NewsletterRunDetail | null>(null)
+  const [run, setRun] = useState<RunView | null>(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [generating, setGenerating] = useState(false)
   const [genError, setGenError] = useState<string | null>(null)
+  const [stage, setStage] = useState<string | null>(null)
+  const [force, setForce] = useState(false)
+  const abortRef = useRef<AbortController | null>(null)
 
   const load = () => {
     if (Number.isNaN(id)) return
-    api.getRun(id)
+    api.getRunFields(id, [...FIELDS])
       .then(setRun)
       .catch((e) => setError(e.message))
       .finally(() => setLoading(false))
@@ -24,16 +31,37 @@ export function RunDetail() {
     load()
   }, [id])
 
+  // Leaving the page stops an in-flight generation.
+  useEffect(() => () => abortRef.current?.abort(), [])
+
   const handleGenerate = () => {
     if (Number.isNaN(id)) return
     setGenError(null)
     setGenerating(true)
-    api.generateRun(id)
-      .then((r) => {
-        setRun((prev) => prev ? { ...prev, report_markdown: r.report_markdown } : null)
+    setStage(null)
+    const ctrl = new AbortController()
+    abortRef.current = ctrl
+    let text = ''
+    // Tokens are streamed into the report as they arrive; the server saves it when done.
+    api.generateRunStream(id, (e) => {
+      if (e.event === 'stage') {
+        setStage(e.total ? `${e.stage} ${e.done}/${e.total}` : e.stage)
+      } else if (e.event === 'delta') {
+        text += e.text
+        setRun((prev) => prev ? { ...prev, report_markdown: text } : null)
+      } else if (e.event === 'done') {
+        setRun((prev) => prev ? { ...prev, report_markdown: e.report_markdown } : null)
+      } else if (e.event === 'error') {
+        setGenError(e.detail)
+      }
+    }, ctrl.signal, force)
+      .catch((e) => {
+        if (e.name !== 'AbortError') setGenError(e.message)
+      })
+      .finally(() => {
+        setGenerating(false)
+        setStage(null)
       })
-      .catch((e) => setGenError(e.message))
-      .finally(() => setGenerating(false))
   }
 
   if (Number.isNaN(id) || loading) return <p>Loading…</p>
@@ -45,8 +73,12 @@ export function RunDetail() {
       <p><Link to={`/templates/${run.template_id}`}>← {run.template_name}</Link></p>
       <p className="muted">Run of template; optional prompt override and extra URLs applied when generating.</p>
       <button onClick={handleGenerate} disabled={generating}>
-        {generating ? 'Generating…' : 'Generate newsletter'}
+        {generating ? `Generating…${stage ? ` (${stage})` : ''}` : 'Generate newsletter'}
       </button>
+      <label>
+        <input type="checkbox" checked={force} onChange={(e) => setForce(e.target.checked)} disabled={generating} />
+        {' '}Redo every stage (re-crawl, re-search, new report)
+      </label>
       {genError && <p className="error">{genError}</p>}
       {run.report_markdown && (
         <div className="report">
@@ -1,13 +1,14 @@
 // frontend/src/pages/RunList.tsx
 import { useEffect, useState } from 'react'
 import { Link, useParams } from 'react-router-dom'
-import { api, type NewsletterTemplate, type NewsletterRun } from '../api'
+import { api, type NewsletterTemplate, type NewsletterRunSummary } from '../api'
 
 export function RunList() {
   const { templateId } = useParams<{ templateId: string }>()
   const id = templateId ? parseInt(templateId, 10) : NaN
   const [template, setTemplate] = useState<NewsletterTemplate | null>(null)
-  const [runs, setRuns] = useState<NewsletterRun[]>([])
+  const [runs, setRuns] = useState<NewsletterRunSummary[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
 
@@ -17,11 +18,21 @@ export function RunList() {
       .then(([t, r]) => {
         setTemplate(t)
         setRuns(r.runs)
+        setNextCursor(r.next_cursor)
       })
       .catch((e) => setError(e.message))
       .finally(() => setLoading(false))
   }, [id])
 
+  const loadMore = () => {
+    api.listRuns(id, nextCursor)
+      .then((r) => {
+        setRuns((prev) => [...prev, ...r.runs])
+        setNextCursor(r.next_cursor)
+      })
+      .catch((e) => setError(e.message))
+  }
+
   if (Number.isNaN(id) || loading) return <p>Loading…</p>
   if (error || !template) return <p className="error">Error: {error || 'Template not found'}</p>
 
@@ -38,6 +49,7 @@ export function RunList() {
           </li>
         ))}
       </ul>
+      {nextCursor && <button type="button" onClick={loadMore}>Load more</button>}
       {runs.length === 0 && <p>No runs yet. Create one (e.g. label: Q4 2025) then generate.</p>}
     </div>
   )
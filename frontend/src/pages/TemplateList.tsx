@@ -1,20 +1,33 @@
 // frontend/src/pages/TemplateList.tsx
 import { useEffect, useState } from 'react'
 import { Link } from 'react-router-dom'
-import { api, type NewsletterTemplate } from '../api'
+import { api, type NewsletterTemplateSummary } from '../api'
 
 export function TemplateList() {
-  const [templates, setTemplates] = useState<NewsletterTemplate[]>([])
+  const [templates, setTemplates] = useState<NewsletterTemplateSummary[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
 
   useEffect(() => {
     api.listTemplates()
-      .then((r) => setTemplates(r.templates))
+      .then((r) => {
+        setTemplates(r.templates)
+        setNextCursor(r.next_cursor)
+      })
       .catch((e) => setError(e.message))
       .finally(() => setLoading(false))
   }, [])
 
+  const loadMore = () => {
+    api.listTemplates(nextCursor)
+      .then((r) => {
+        setTemplates((prev) => [...prev, ...r.templates])
+        setNextCursor(r.next_cursor)
+      })
+      .catch((e) => setError(e.message))
+  }
+
   if (loading) return <p>Loading templates…</p>
   if (error) return <p className="error">Error: {error}</p>
 
@@ -30,6 +43,7 @@ export function TemplateList() {
           </li>
         ))}
       </ul>
+      {nextCursor && <button type="button" onClick={loadMore}>Load more</button>}
       {templates.length === 0 && <p>No templates yet. Create one to get started.</p>}
     </div>
   )